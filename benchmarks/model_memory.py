@@ -0,0 +1,133 @@
+"""
+Porównuje pamięć i czas budowania i zapisu słownika tłumaczeń przygody: ze słowników oczyszczanych przez
+postprocess_transifex_dict i zapisywanych json.dump (jak przed model.py) oraz z obiektów modelu (model.py,
+__slots__) zapisywanych wprost przez write_transifex_dict.
+
+Dla każdego sposobu mierzy (tracemalloc) pamięć zajętą przez zbudowane drzewo, szczyt pamięci przy budowaniu
+i przy zapisie oraz najlepszy czas, a także sprawdza, że oba dają bajt w bajt ten sam JSON.
+Domyślnie używa największego zrzuconego pakietu przygody (pack_adventure/*/output/*.json); jeśli go nie ma,
+generuje syntetyczną przygodę o liczbie aktorów, dzienników, stron i scen największej przygody z lang/en.
+
+Uruchomienie z katalogu repozytorium:
+    python -m benchmarks.model_memory [pakiet.json] [--repeat 5] [--items 20]
+"""
+import argparse
+import glob
+import io
+import json
+import os
+import random
+import time
+import tracemalloc
+
+import main
+from benchmarks import synthetic
+from benchmarks.synthetic import build_adventure_dict
+from translations import EN_DIR, read_translation
+
+
+def is_adventure_pack(path):
+    with open(path, 'r', encoding='utf-8') as json_file:
+        documents = json.load(json_file)
+    return bool(documents) and isinstance(documents, list) and 'caption' in documents[0]
+
+
+def largest_adventure_pack():
+    packs = sorted(glob.glob('pack_adventure/*/output/*.json'), key=os.path.getsize, reverse=True)
+    return next((path for path in packs if not path.endswith('_folders.json') and is_adventure_pack(path)), None)
+
+
+def shipped_adventure_shape(items):
+    """
+    Parametry syntetycznej przygody (jak w benchmarks.synthetic) o kształcie największej przygody z lang/en.
+    """
+    sizes = {path: os.path.getsize(path) for path in glob.glob(os.path.join(EN_DIR, '*.json'))}
+    path = max(sizes, key=sizes.get)
+    entries = [entry for entry in read_translation(path)["entries"].values() if isinstance(entry, dict)]
+    journals = sum(len(entry.get("journals", {})) for entry in entries)
+    pages = sum(len(journal.get("pages", {})) for entry in entries for journal in entry.get("journals", {}).values())
+    shape = argparse.Namespace(
+        actors=sum(len(entry.get("actors", {})) for entry in entries), items=items, journals=journals,
+        pages=pages // max(journals, 1), scenes=sum(len(entry.get("scenes", {})) for entry in entries), notes=5,
+        tables=sum(len(entry.get("tables", {})) for entry in entries), results=20,
+        playlists=sum(len(entry.get("playlists", {})) for entry in entries), sounds=10, words=60)
+    return path, shape
+
+
+def write_cleaned_dict(tree, outfile):
+    json.dump(main.postprocess_transifex_dict(tree), outfile, ensure_ascii=False, indent=4)
+
+
+def best_times(data, modes, repeat):
+    """
+    Najlepszy czas budowania i zapisu drzewa dla każdego sposobu; sposoby są mierzone na przemian, żeby zmiany
+    obciążenia maszyny nie faworyzowały żadnego z nich.
+    """
+    best = {}
+    with open(os.devnull, 'w', encoding='utf-8') as null_file:
+        for _ in range(repeat):
+            for name, models, write in modes:
+                start = time.perf_counter()
+                write(build_adventure_dict(data, models), null_file)
+                elapsed = time.perf_counter() - start
+                best[name] = min(best.get(name, elapsed), elapsed)
+    return best
+
+
+def measure_memory(data, models, write):
+    with open(os.devnull, 'w', encoding='utf-8') as null_file:
+        tracemalloc.start()
+        baseline = tracemalloc.get_traced_memory()[0]
+        tree = build_adventure_dict(data, models)
+        retained, build_peak = tracemalloc.get_traced_memory()
+        tracemalloc.reset_peak()
+        write(tree, null_file)
+        write_peak = tracemalloc.get_traced_memory()[1]
+        tracemalloc.stop()
+    output = io.StringIO()
+    write(tree, output)
+    return {
+        "retained_mb": (retained - baseline) / 1024 / 1024,
+        "build_peak_mb": (build_peak - baseline) / 1024 / 1024,
+        "write_peak_mb": (write_peak - baseline) / 1024 / 1024,
+    }, output.getvalue()
+
+
+def main_cli():
+    parser = argparse.ArgumentParser(description='Pamięć słownika tłumaczeń: słowniki a model z __slots__.')
+    parser.add_argument('pack', nargs='?', help='Plik JSON pakietu przygody (domyślnie największy zrzucony)')
+    parser.add_argument('--repeat', type=int, default=5)
+    parser.add_argument('--items', type=int, default=20,
+                        help='Liczba przedmiotów na aktora syntetycznej przygody (lang/en ich nie zawiera)')
+    parser.add_argument('--seed', type=int, default=1)
+    args = parser.parse_args()
+
+    pack = args.pack or largest_adventure_pack()
+    if pack:
+        print(f'Pakiet: {pack}')
+        with open(pack, 'r', encoding='utf-8') as json_file:
+            data = json.load(json_file)
+    else:
+        source, shape = shipped_adventure_shape(args.items)
+        print(f'Brak zrzuconych pakietów, syntetyczna przygoda na wzór {source}: {vars(shape)}')
+        data = [synthetic.make_adventure(random.Random(args.seed), shape)]
+
+    modes = (('słowniki', False, write_cleaned_dict), ('model', True, main.write_transifex_dict))
+    results = {}
+    outputs = {}
+    for name, models, write in modes:
+        results[name], outputs[name] = measure_memory(data, models, write)
+    for name, seconds in best_times(data, modes, args.repeat).items():
+        results[name]["seconds"] = seconds
+
+    print(f'{"sposób":<10} {"czas [ms]":>10} {"drzewo [MB]":>12} {"szczyt budowy":>14} {"szczyt zapisu":>14}')
+    for name, result in results.items():
+        print(f'{name:<10} {result["seconds"] * 1000:>10.1f} {result["retained_mb"]:>12.2f} '
+              f'{result["build_peak_mb"]:>14.2f} {result["write_peak_mb"]:>14.2f}')
+    ratio = results["model"]["retained_mb"] / results["słowniki"]["retained_mb"]
+    print(f'Drzewo modelu zajmuje {ratio:.0%} pamięci drzewa słowników')
+    print('Wynik identyczny' if outputs["model"] == outputs["słowniki"] else 'RÓŻNICE W WYNIKU')
+
+
+if __name__ == '__main__':
+    main_cli()
@@ -0,0 +1,158 @@
+"""
+Porównuje dotychczasowy łańcuch porządkowania słownika tłumaczeń (remove_empty_keys, sort_entries,
+remove_newlines_from_dict, remove_all_braces_from_uuid) z postprocess_transifex_dict. Stare funkcje są tu
+zachowane tylko jako wzorzec do porównania; main.py używa postprocess_transifex_dict.
+
+Oba sposoby dostają surowe (nieuporządkowane) słowniki tłumaczeń przygody, zbudowane tak jak w process_files
+z syntetycznych przygód (benchmarks.synthetic) o kilku kształtach albo z podanych zrzuconych pakietów przygód.
+Dla każdego słownika sprawdza, że oba dają bajt w bajt ten sam JSON, i mierzy czas.
+
+Uruchomienie z katalogu repozytorium:
+    python -m benchmarks.postprocess [--repeat 5] [pack_adventure/.../output/adventures.json ...]
+"""
+import argparse
+import copy
+import json
+import random
+import time
+
+from main import UUID_LABEL_PATTERN, postprocess_transifex_dict, remove_newlines_from_dict
+
+# Kształty syntetycznych przygód (parametry benchmarks.synthetic.make_adventure)
+SHAPES = {
+    'mała przygoda': dict(actors=20, items=5, journals=10, pages=4, scenes=5, notes=3, tables=3, results=6,
+                          playlists=2, sounds=3, words=20),
+    'dzienniki bez stron': dict(actors=10, items=3, journals=20, pages=0, scenes=5, notes=0, tables=2, results=0,
+                                playlists=3, sounds=0, words=10),
+    'duża przygoda': dict(actors=200, items=20, journals=50, pages=10, scenes=30, notes=15, tables=10, results=20,
+                          playlists=5, sounds=10, words=60),
+}
+
+
+def sort_entries(input_dict):
+    if "entries" in input_dict:
+        input_dict["entries"] = dict(sorted(input_dict["entries"].items()))
+
+    for key, value in input_dict.items():
+        if isinstance(value, dict):
+            input_dict[key] = sort_entries(value)
+
+    return input_dict
+
+
+def remove_empty_keys(data_dict):
+    """
+    Usuwa puste klucze w słowniku i usuwa 'name', jeśli 'pages' jest pusty.
+    Proces powtarza się aż do wyeliminowania wszystkich pustych kluczy.
+
+    :param data_dict: Słownik wejściowy
+    :return: Oczyszczony słownik
+    """
+
+    def clean_dict_once(d):
+        """
+        Jednokrotne przejście przez słownik w celu usunięcia pustych kluczy.
+        """
+        cleaned = {}
+        for key, value in d.items():
+            if isinstance(value, dict):  # Jeśli wartość to słownik, oczyść go rekurencyjnie
+                value = clean_dict_once(value)
+            if key == "pages" and not value:  # Jeśli "pages" jest pusty
+                continue  # Usuń klucz "pages"
+            if key == "name" and "pages" in d and not d["pages"]:
+                continue  # Usuń klucz "name", jeśli "pages" jest pusty
+            if value not in (None, {}, [], ""):  # Usuń inne puste wartości
+                cleaned[key] = value
+        return cleaned
+
+    previous = None
+    current = data_dict
+
+    # Iteruj, aż słownik przestanie się zmieniać
+    while previous != current:
+        previous = current
+        current = clean_dict_once(previous)
+
+    return current
+
+
+def remove_all_braces_from_uuid(data):
+    """
+    Szuka w wartościach słownika '@UUID[xxx]{xxx}' i usuwa wszystkie wystąpienia '{xxx}' po każdym '@UUID[xxx]'.
+
+    :param data: Słownik do przeszukania i modyfikacji.
+    """
+    for key, value in data.items():
+        if isinstance(value, str) and "@UUID" in value:
+            # Usuń wszystkie wystąpienia wzorca {xxx} po @UUID[xxx]
+            data[key] = UUID_LABEL_PATTERN.sub(r"\1", value)
+        elif isinstance(value, dict):
+            # Rekurencyjnie przeszukaj zagnieżdżone słowniki
+            remove_all_braces_from_uuid(value)
+
+
+def legacy_postprocess(transifex_dict):
+    transifex_dict = remove_empty_keys(transifex_dict)
+    transifex_dict = sort_entries(transifex_dict)
+    transifex_dict = remove_newlines_from_dict(transifex_dict)
+    remove_all_braces_from_uuid(transifex_dict)
+    return transifex_dict
+
+
+def raw_trees(packs, seed):
+    """
+    Surowe słowniki tłumaczeń (ze słownikami zamiast wpisów modelu, bo stare funkcje znają tylko słowniki).
+
+    :return: Generator par (nazwa, słownik).
+    """
+    # Import tutaj, bo benchmarks.synthetic importuje ten moduł
+    from benchmarks import synthetic
+    for path in packs:
+        with open(path, 'r', encoding='utf-8') as json_file:
+            yield path, synthetic.build_adventure_dict(json.load(json_file), models=False)
+    if not packs:
+        for name, shape in SHAPES.items():
+            data = [synthetic.make_adventure(random.Random(seed), argparse.Namespace(**shape))]
+            yield name, synthetic.build_adventure_dict(data, models=False)
+
+
+def best_time(function, tree, repeat):
+    """
+    Najlepszy czas z kilku powtórzeń; każde dostaje świeżą kopię drzewa, bo stare funkcje je modyfikują.
+    """
+    best = None
+    result = None
+    for _ in range(repeat):
+        source = copy.deepcopy(tree)
+        start = time.perf_counter()
+        result = function(source)
+        elapsed = time.perf_counter() - start
+        best = elapsed if best is None else min(best, elapsed)
+    return best, result
+
+
+def main():
+    parser = argparse.ArgumentParser(description='Porównanie i pomiar porządkowania słownika tłumaczeń.')
+    parser.add_argument('packs', nargs='*', help='Zrzucone pakiety przygód (domyślnie syntetyczne przygody)')
+    parser.add_argument('--repeat', type=int, default=5)
+    parser.add_argument('--seed', type=int, default=1)
+    args = parser.parse_args()
+
+    all_identical = True
+    print(f'{"słownik":<60} {"KB":>7} {"stary [ms]":>11} {"nowy [ms]":>10} {"przysp.":>8}  wynik')
+    for name, tree in raw_trees(args.packs, args.seed):
+        legacy_time, legacy_result = best_time(legacy_postprocess, tree, args.repeat)
+        fused_time, fused_result = best_time(postprocess_transifex_dict, tree, args.repeat)
+
+        legacy_text = json.dumps(legacy_result, ensure_ascii=False, indent=4)
+        identical = legacy_text == json.dumps(fused_result, ensure_ascii=False, indent=4)
+        all_identical &= identical
+        print(f'{name:<60} {len(legacy_text.encode("utf-8")) / 1024:>7.0f} {legacy_time * 1000:>11.1f} '
+              f'{fused_time * 1000:>10.1f} {legacy_time / fused_time:>7.1f}x  {"OK" if identical else "RÓŻNICA"}')
+
+    if not all_identical:
+        raise SystemExit('Wyniki różnią się od dotychczasowego łańcucha funkcji')
+
+
+if __name__ == '__main__':
+    main()
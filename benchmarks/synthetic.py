@@ -0,0 +1,364 @@
+"""
+Benchmark całego przetwarzania na syntetycznych pakietach przygody, bez pobierania modułów Paizo.
+
+Generuje moduł z pakietami LevelDB (plyvel) o zadanej wielkości: przygodę z N aktorami po M przedmiotów,
+dzienniki po K stron, sceny z notatkami, tabele i playlisty, a także pakiet 'rules' ze stronami zapisanymi
+jako osobne dokumenty. Następnie mierzy osobno read_leveldb_to_json, process_files i każdą funkcję
+porządkującą słownik tłumaczeń: czas, przepustowość (dokumenty/s, MB/s) i szczytowe zużycie pamięci.
+Wyniki trafiają do pliku JSON, który można porównać z wynikami z innego commita (--compare).
+
+Uruchomienie z katalogu repozytorium:
+    python -m benchmarks.synthetic --actors 300 --items 25 --output bench_results.json
+    python -m benchmarks.synthetic --compare bench_results_main.json
+"""
+import argparse
+import contextlib
+import copy
+import json
+import os
+import platform
+import random
+import shutil
+import subprocess
+import tempfile
+import time
+import tracemalloc
+
+import plyvel
+
+import main
+from model import Adventure
+from benchmarks.postprocess import legacy_postprocess, remove_all_braces_from_uuid, remove_empty_keys, sort_entries
+from instrumentation import peak_rss_mb
+
+MODULE_ID = 'pf2e-synthetic'
+EXTRACT_FOLDER = 'pack_adventure'
+WORDS = ('Otari', 'kobold', 'goblin', 'trap', 'the', 'heroes', 'door', 'treasure', 'Rusthenge', 'ghost')
+
+
+def random_id(rng):
+    return ''.join(rng.choice('abcdefghijklmnopqrstuvwxyzABCDEFGHIJKLMNOPQRSTUVWXYZ0123456789') for _ in range(16))
+
+
+def random_html(rng, words):
+    text = ' '.join(rng.choice(WORDS) for _ in range(words))
+    return f'<p>{text} @UUID[Compendium.{MODULE_ID}.rules.JournalEntry.{random_id(rng)}]{{Link}}</p>\n<p>{text}</p>'
+
+
+def make_item(rng, index, words):
+    item = {
+        "_id": random_id(rng),
+        "name": f'Item {index}',
+        "type": rng.choice(['weapon', 'equipment', 'action', 'spell']),
+        "system": {
+            "description": {"value": random_html(rng, words), "gm": rng.choice(['', random_html(rng, words // 4)])},
+        },
+        "_stats": {"compendiumSource": rng.choice([None, f'Compendium.pf2e.equipment-srd.Item.{random_id(rng)}'])},
+    }
+    if rng.random() < 0.2:
+        item["system"]["identification"] = {
+            "status": rng.choice(['identified', 'unidentified']),
+            "unidentified": {"name": 'Unusual Object',
+                             "data": {"description": {"value": random_html(rng, words // 2)}}},
+        }
+    return item
+
+
+def make_actor(rng, index, items, words):
+    return {
+        "_id": random_id(rng),
+        "name": f'Actor {index}',
+        "type": 'npc',
+        "prototypeToken": {"name": f'Token {index}'},
+        "system": {"details": {
+            "publicNotes": random_html(rng, words),
+            "privateNotes": rng.choice(['', random_html(rng, words // 2)]),
+            "blurb": rng.choice(['', 'Elite guard']),
+            "languages": {"details": ''},
+        }},
+        "items": [make_item(rng, item_index, words) for item_index in range(items)],
+    }
+
+
+def make_adventure(rng, args):
+    return {
+        "_id": random_id(rng),
+        "name": 'Synthetic Adventure',
+        "caption": 'A generated adventure',
+        "description": random_html(rng, args.words),
+        "folders": [{"name": f'Folder {index}'} for index in range(20)],
+        "journal": [{
+            "name": f'Journal {index}',
+            "pages": [{"name": f'Page {index}.{page}', "text": {"content": random_html(rng, args.words)}}
+                      for page in range(args.pages)],
+        } for index in range(args.journals)],
+        "scenes": [{
+            "name": f'Scene {index}',
+            "notes": [{"text": f'Note {index}.{note}'} for note in range(args.notes)],
+        } for index in range(args.scenes)],
+        "macros": [{"name": f'Macro {index}'} for index in range(5)],
+        "tables": [{
+            "name": f'Table {index}',
+            "description": random_html(rng, args.words // 4),
+            "results": [{"range": [result, result], "text": random_html(rng, 8)}
+                        for result in range(1, args.results + 1)],
+        } for index in range(args.tables)],
+        "items": [make_item(rng, index, args.words) for index in range(args.items)],
+        "playlists": [{
+            "name": f'Playlist {index}',
+            "description": '',
+            "sounds": [{"name": f'Sound {index}.{sound}', "description": ''} for sound in range(args.sounds)],
+        } for index in range(args.playlists)],
+        "actors": [make_actor(rng, index, args.items, args.words) for index in range(args.actors)],
+    }
+
+
+def write_pack(pack_path, documents):
+    """
+    Zapisuje dokumenty do nowej bazy LevelDB. documents to lista par (klucz, dokument).
+
+    :return: Łączna liczba bajtów zapisanych wartości.
+    """
+    os.makedirs(os.path.dirname(pack_path), exist_ok=True)
+    db = plyvel.DB(pack_path, create_if_missing=True, error_if_exists=True)
+    size = 0
+    with db.write_batch() as batch:
+        for key, document in documents:
+            value = json.dumps(document, ensure_ascii=False).encode('utf-8')
+            batch.put(key.encode('utf-8'), value)
+            size += len(value)
+    db.close()
+    return size
+
+
+def generate_module(args):
+    """
+    Tworzy syntetyczny moduł w bieżącym katalogu (pack_adventure/<id>/packs/*).
+
+    :return: Statystyki pakietów: nazwa -> {"documents": ..., "bytes": ...}.
+    """
+    rng = random.Random(args.seed)
+    packs_folder = os.path.join(EXTRACT_FOLDER, MODULE_ID, 'packs')
+    packs = {}
+
+    adventure = make_adventure(rng, args)
+    packs['adventures'] = [(f'!adventures!{adventure["_id"]}', adventure)]
+
+    # Dzienniki LevelDB trzymają strony jako osobne dokumenty, a dziennik tylko ich _id
+    rules = []
+    for index in range(args.journals):
+        journal_id = random_id(rng)
+        page_ids = []
+        for page in range(args.pages):
+            page_id = random_id(rng)
+            page_ids.append(page_id)
+            rules.append((f'!journal.pages!{journal_id}.{page_id}', {
+                "_id": page_id, "name": f'Rule {index}.{page}', "type": 'text',
+                "text": {"content": random_html(rng, args.words)},
+            }))
+        rules.append((f'!journal!{journal_id}', {"_id": journal_id, "name": f'Rules {index}', "pages": page_ids}))
+    packs['rules'] = rules
+
+    actors = [make_actor(rng, index, args.items, args.words) for index in range(args.actors)]
+    packs['actors'] = [(f'!actors!{actor["_id"]}', actor) for actor in actors]
+
+    stats = {}
+    for pack, documents in packs.items():
+        size = write_pack(os.path.join(packs_folder, pack), documents)
+        stats[pack] = {"documents": len(documents), "bytes": size}
+    return stats
+
+
+def count_documents(value):
+    """
+    Liczy dokumenty osadzone w dokumencie przygody (aktorów, przedmioty, strony, notatki...).
+    """
+    if isinstance(value, dict):
+        return sum(count_documents(child) for child in value.values())
+    if isinstance(value, list):
+        return sum(1 + count_documents(child) for child in value if isinstance(child, dict))
+    return 0
+
+
+def build_adventure_dict(data, models=True):
+    """
+    Buduje surowy (nieuporządkowany) słownik tłumaczeń przygody tak jak process_files.
+
+    :param models: False buduje wpisy jako słowniki, jak przed model.py (np. dla starych funkcji porządkowania).
+    """
+    keys = data[0].keys()
+    extract = main.extract_adventure_document if models else extract_adventure_dicts
+    transifex_dict = {"label": 'Adventures', "entries": {}, "mapping": {}}
+    for document in data:
+        name = document["name"].strip()
+        transifex_dict["entries"][name] = Adventure(name=name) if models else {"name": name}
+        extract(document, keys, transifex_dict["entries"][name], transifex_dict["mapping"])
+    return transifex_dict
+
+
+extract_adventure_dicts = main.compile_extraction_schema(main.ADVENTURE_SCHEMA, models=False)
+
+
+def measure(name, function, repeat, prepare=None, documents=0, size=0):
+    """
+    Mierzy najlepszy czas z 'repeat' uruchomień, a w osobnym uruchomieniu szczyt pamięci (tracemalloc),
+    żeby narzut śledzenia alokacji nie zawyżał czasu.
+
+    :param prepare: Funkcja zwracająca argumenty dla 'function', wywoływana poza pomiarem.
+    """
+    def run(with_tracemalloc):
+        arguments = prepare() if prepare else ()
+        with open(os.devnull, 'w') as devnull, contextlib.redirect_stdout(devnull):
+            if with_tracemalloc:
+                tracemalloc.start()
+            start = time.perf_counter()
+            function(*arguments)
+            elapsed = time.perf_counter() - start
+            peak = tracemalloc.get_traced_memory()[1] if with_tracemalloc else None
+            if with_tracemalloc:
+                tracemalloc.stop()
+        return elapsed, peak
+
+    best = min(run(False)[0] for _ in range(repeat))
+    peak = run(True)[1]
+    result = {
+        "stage": name,
+        "seconds": best,
+        "documents": documents,
+        "bytes": size,
+        "documents_per_second": documents / best if best else None,
+        "mb_per_second": size / 1024 / 1024 / best if best else None,
+        "peak_memory_mb": peak / 1024 / 1024,
+    }
+    print(f'{name:<32} {best * 1000:>10.1f} ms {result["documents_per_second"] or 0:>12.0f} dok/s '
+          f'{result["mb_per_second"] or 0:>8.1f} MB/s {result["peak_memory_mb"]:>8.1f} MB')
+    return result
+
+
+def git_revision():
+    try:
+        return subprocess.run(['git', 'rev-parse', '--short', 'HEAD'], capture_output=True, text=True,
+                              cwd=os.path.dirname(os.path.abspath(main.__file__))).stdout.strip() or None
+    except OSError:
+        return None
+
+
+def run_benchmark(args):
+    stats = generate_module(args)
+    leveldb_documents = sum(pack["documents"] for pack in stats.values())
+    leveldb_bytes = sum(pack["bytes"] for pack in stats.values())
+    packs_path = fr'{EXTRACT_FOLDER}\{MODULE_ID}\packs'
+    output_path = fr'{EXTRACT_FOLDER}\{MODULE_ID}\output'
+    output_folder = os.path.join(EXTRACT_FOLDER, MODULE_ID, 'output')
+
+    print(f'Pakiety: {json.dumps(stats)}')
+    print(f'{"etap":<32} {"czas":>13} {"przepustowość":>17} {"":>13} {"pamięć":>11}')
+    # Przy puli procesów tracemalloc widzi tylko proces główny, więc pamięć dotyczy samego koordynatora
+    results = [
+        measure('read_leveldb_to_json', main.read_leveldb_to_json, args.repeat,
+                prepare=lambda: (packs_path, output_path, True, 1), documents=leveldb_documents, size=leveldb_bytes),
+        measure('read_leveldb_to_json (pula)', main.read_leveldb_to_json, args.repeat,
+                prepare=lambda: (packs_path, output_path, True, None), documents=leveldb_documents,
+                size=leveldb_bytes),
+    ]
+
+    output_bytes = sum(os.path.getsize(os.path.join(output_folder, file)) for file in os.listdir(output_folder))
+    results.append(measure('process_files', main.process_files, args.repeat,
+                           prepare=lambda: (output_folder, MODULE_ID), documents=leveldb_documents,
+                           size=output_bytes))
+
+    with open(os.path.join(output_folder, 'adventures.json'), 'r', encoding='utf-8') as json_file:
+        adventure_data = json.load(json_file)
+    adventure_bytes = os.path.getsize(os.path.join(output_folder, 'adventures.json'))
+    adventure_documents = count_documents(adventure_data)
+    raw_dict = build_adventure_dict(adventure_data, models=False)
+    model_dict = build_adventure_dict(adventure_data)
+    cleaned_dict = remove_empty_keys(copy.deepcopy(raw_dict))
+
+    results.append(measure('extract_adventure_document', build_adventure_dict, args.repeat,
+                           prepare=lambda: (adventure_data,), documents=adventure_documents, size=adventure_bytes))
+    results.append(measure('extract (słowniki)', build_adventure_dict, args.repeat,
+                           prepare=lambda: (adventure_data, False), documents=adventure_documents,
+                           size=adventure_bytes))
+    for name, function, source in [
+        ('remove_empty_keys', remove_empty_keys, raw_dict),
+        ('sort_entries', sort_entries, cleaned_dict),
+        ('remove_newlines_from_dict', main.remove_newlines_from_dict, cleaned_dict),
+        ('remove_all_braces_from_uuid', remove_all_braces_from_uuid, cleaned_dict),
+        ('cleanup (4 funkcje)', legacy_postprocess, raw_dict),
+        ('postprocess_transifex_dict', main.postprocess_transifex_dict, model_dict),
+    ]:
+        results.append(measure(name, function, args.repeat, prepare=lambda source=source: (copy.deepcopy(source),),
+                               documents=adventure_documents, size=adventure_bytes))
+    return stats, results
+
+
+def compare(results, previous_path):
+    with open(previous_path, 'r', encoding='utf-8') as json_file:
+        previous = {stage["stage"]: stage for stage in json.load(json_file)["stages"]}
+
+    print()
+    print(f'Porównanie z {previous_path}:')
+    for stage in results:
+        old = previous.get(stage["stage"])
+        if not old:
+            continue
+        ratio = stage["seconds"] / old["seconds"] if old["seconds"] else float('nan')
+        memory = stage["peak_memory_mb"] - old["peak_memory_mb"]
+        flag = '  <-- wolniej' if ratio > 1.1 else ''
+        print(f'{stage["stage"]:<32} czas x{ratio:>5.2f}   pamięć {memory:>+8.1f} MB{flag}')
+
+
+def main_cli():
+    parser = argparse.ArgumentParser(description='Benchmark przetwarzania na syntetycznych pakietach LevelDB.')
+    parser.add_argument('--actors', type=int, default=200, help='Liczba aktorów (N)')
+    parser.add_argument('--items', type=int, default=20, help='Liczba przedmiotów na aktora (M)')
+    parser.add_argument('--journals', type=int, default=50, help='Liczba dzienników')
+    parser.add_argument('--pages', type=int, default=10, help='Liczba stron na dziennik (K)')
+    parser.add_argument('--scenes', type=int, default=30)
+    parser.add_argument('--notes', type=int, default=15, help='Liczba notatek na scenę')
+    parser.add_argument('--tables', type=int, default=10)
+    parser.add_argument('--results', type=int, default=20, help='Liczba wyników na tabelę')
+    parser.add_argument('--playlists', type=int, default=5)
+    parser.add_argument('--sounds', type=int, default=10, help='Liczba dźwięków na playlistę')
+    parser.add_argument('--words', type=int, default=60, help='Długość opisów (w słowach)')
+    parser.add_argument('--seed', type=int, default=1)
+    parser.add_argument('--repeat', type=int, default=3)
+    parser.add_argument('--output', default='bench_results.json', help='Plik z wynikami')
+    parser.add_argument('--compare', help='Plik z wcześniejszymi wynikami do porównania')
+    parser.add_argument('--workdir', help='Katalog roboczy (domyślnie tymczasowy, usuwany po pomiarze)')
+    args = parser.parse_args()
+
+    output = os.path.abspath(args.output)
+    previous = os.path.abspath(args.compare) if args.compare else None
+    workdir = args.workdir or tempfile.mkdtemp(prefix='pf2e-bench-')
+    os.makedirs(workdir, exist_ok=True)
+    cwd = os.getcwd()
+    os.chdir(workdir)
+    try:
+        stats, results = run_benchmark(args)
+    finally:
+        os.chdir(cwd)
+        if not args.workdir:
+            shutil.rmtree(workdir, ignore_errors=True)
+
+    report = {
+        "revision": git_revision(),
+        "python": platform.python_version(),
+        "platform": platform.platform(),
+        "parameters": {key: value for key, value in vars(args).items()
+                       if key not in ('output', 'compare', 'workdir')},
+        "packs": stats,
+        "stages": results,
+        "max_rss_mb": peak_rss_mb(),
+    }
+    with open(output, 'w', encoding='utf-8') as json_file:
+        json.dump(report, json_file, ensure_ascii=False, indent=4)
+    print(f'Wyniki zapisane do {output}')
+
+    if previous:
+        compare(results, previous)
+
+
+if __name__ == '__main__':
+    main_cli()
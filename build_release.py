@@ -0,0 +1,167 @@
+"""
+Buduje zwarte pliki tłumaczeń do paczki modułu.
+
+Babele wczytuje tylko lang/pl (src/translator.js), więc do paczki trafiają wyłącznie pliki polskie:
+bez wcięć i bez tekstów identycznych z angielskimi, bo dla brakujących tekstów Babele i tak zostawia oryginał.
+Odwołania do segmentów (segments.py) są rozwijane, więc Babele dostaje zwykłe pliki.
+Dla każdej przygody wypisywany jest rozmiar i czas parsowania (json.loads) przed i po.
+
+Obok powstaje lang/token-names.json: dla każdej przygody angielska nazwa tokena lub aktora -> polska nazwa,
+z którego src/fix-token-names.js poprawia nazwy tokenów na scenach bez sprawdzania aktorów.
+
+Uruchomienie z katalogu repozytorium:
+    python build_release.py [--output build]
+"""
+import argparse
+import json
+import os
+import time
+
+from segments import expand
+from translations import EN_DIR, PL_DIR, STRUCTURAL_SECTIONS, iter_leaves, read_translation, translation_pairs
+
+BUILD_DIR = 'build'
+TOKEN_NAMES_FILE = 'lang/token-names.json'
+# Klucze najwyższego poziomu, które muszą zostać niezależnie od treści
+KEPT_KEYS = ('label', *STRUCTURAL_SECTIONS)
+
+
+def prune_identical(pl, en):
+    """
+    Kopia tłumaczenia bez liści identycznych z angielskimi i bez słowników, które przez to opustoszały.
+
+    :return: Krotka (drzewo, liczba usuniętych liści).
+    """
+    removed = 0
+
+    def prune(node, source):
+        nonlocal removed
+        pruned = {}
+        for key, value in node.items():
+            original = source.get(key) if isinstance(source, dict) else None
+            if isinstance(value, dict):
+                value = prune(value, original)
+                if not value:
+                    continue
+            elif value == original:
+                removed += 1
+                continue
+            pruned[key] = value
+        return pruned
+
+    tree = {}
+    for key, value in pl.items():
+        if key in KEPT_KEYS:
+            tree[key] = value
+        else:
+            tree.update(prune({key: value}, {key: en.get(key)}))
+    return tree, removed
+
+
+def token_name_table(en, pl):
+    """
+    Tabela nazw tokenów z wpisów aktorów (name i tokenName, które process_files wyciąga z przygody).
+    Najpierw nazwy z prototypeToken, potem nazwy aktorów, bo token bez własnej nazwy nosi nazwę aktora.
+
+    :return: Słownik angielska nazwa -> polska nazwa (tylko nazwy, które są przetłumaczone).
+    """
+    actors = []
+    for adventure_name, adventure in pl.get('entries', {}).items():
+        source_actors = en.get('entries', {}).get(adventure_name, {}).get('actors', {})
+        for actor_name, actor in adventure.get('actors', {}).items():
+            actors.append((actor_name, actor, source_actors.get(actor_name, {})))
+
+    table = {}
+    for _, actor, source in actors:
+        token_name = actor.get('tokenName')
+        source_token_name = source.get('tokenName')
+        if token_name and source_token_name and token_name != source_token_name:
+            table.setdefault(source_token_name, token_name)
+    for actor_name, actor, _ in actors:
+        if actor.get('name') and actor['name'] != actor_name:
+            table.setdefault(actor_name, actor['name'])
+    return table
+
+
+def dump_compact(data):
+    return json.dumps(data, ensure_ascii=False, separators=(',', ':'))
+
+
+def parse_time(text, repeat=3):
+    best = None
+    for _ in range(repeat):
+        start = time.perf_counter()
+        json.loads(text)
+        elapsed = time.perf_counter() - start
+        best = elapsed if best is None else min(best, elapsed)
+    return best
+
+
+def check_build(pl, en, built):
+    """
+    Sprawdza, że po uzupełnieniu angielskim zbudowany plik daje te same teksty co oryginalne tłumaczenie.
+    """
+    en_leaves = dict(iter_leaves(en))
+    built_leaves = dict(iter_leaves(built))
+    for path, value in iter_leaves(pl):
+        if built_leaves.get(path, en_leaves.get(path)) != value:
+            raise ValueError(f'Zbudowany plik zmienia tekst {"/".join(path)}')
+
+
+def build(output_dir=BUILD_DIR, en_dir=EN_DIR, pl_dir=PL_DIR, keep_identical=False):
+    """
+    Zapisuje <output_dir>/lang/pl/*.json i <output_dir>/lang/token-names.json.
+
+    :return: Lista wierszy raportu (nazwa, bajty przed, bajty po, parsowanie przed, parsowanie po, usunięte teksty).
+    """
+    target_dir = os.path.join(output_dir, PL_DIR)
+    os.makedirs(target_dir, exist_ok=True)
+    rows = []
+    token_names = {}
+    for name, en_path, pl_path in translation_pairs(en_dir, pl_dir):
+        if not pl_path:
+            continue
+        with open(pl_path, 'r', encoding='utf-8') as json_file:
+            original = json_file.read()
+        # Powtarzające się teksty zapisane raz w sekcji 'segments' (main.py --dedup) Babele dostaje rozwinięte
+        pl = expand(json.loads(original))
+        en = expand(read_translation(en_path))
+
+        token_names[name.split('.')[0]] = token_name_table(en, pl)
+        built, removed = (pl, 0) if keep_identical else prune_identical(pl, en)
+        check_build(pl, en, built)
+        compact = dump_compact(built)
+        with open(os.path.join(target_dir, name), 'w', encoding='utf-8') as json_file:
+            json_file.write(compact)
+
+        rows.append((name, len(original.encode('utf-8')), len(compact.encode('utf-8')), parse_time(original),
+                     parse_time(compact), removed))
+
+    with open(os.path.join(output_dir, TOKEN_NAMES_FILE), 'w', encoding='utf-8') as json_file:
+        json_file.write(dump_compact(token_names))
+    return rows
+
+
+def main():
+    parser = argparse.ArgumentParser(description='Buduje zwarte pliki tłumaczeń do paczki modułu.')
+    parser.add_argument('--output', default=BUILD_DIR, help='Katalog wynikowy (pliki trafiają do <output>/lang/pl)')
+    parser.add_argument('--en-dir', default=EN_DIR)
+    parser.add_argument('--pl-dir', default=PL_DIR)
+    parser.add_argument('--keep-identical', action='store_true', help='Tylko usuwa wcięcia, bez usuwania tekstów')
+    args = parser.parse_args()
+
+    rows = build(args.output, args.en_dir, args.pl_dir, args.keep_identical)
+    print(f'{"plik":<56} {"KB przed":>9} {"KB po":>7} {"ms przed":>9} {"ms po":>7} {"usunięte":>9}')
+    for name, size_before, size_after, parse_before, parse_after, removed in rows:
+        print(f'{name:<56} {size_before / 1024:>9.0f} {size_after / 1024:>7.0f} {parse_before * 1000:>9.1f} '
+              f'{parse_after * 1000:>7.1f} {removed:>9}')
+    if rows:
+        before = sum(row[1] for row in rows)
+        after = sum(row[2] for row in rows)
+        print(f'{"razem":<56} {before / 1024:>9.0f} {after / 1024:>7.0f} '
+              f'{sum(row[3] for row in rows) * 1000:>9.1f} {sum(row[4] for row in rows) * 1000:>7.1f} '
+              f'{sum(row[5] for row in rows):>9}   ({100 * (1 - after / before):.0f}% mniej)')
+
+
+if __name__ == '__main__':
+    main()
@@ -0,0 +1,4 @@
+"""
+Katalog repozytorium jest katalogiem głównym pytest, więc testy w tests/ importują moduły skryptów (main,
+exchange...) bezpośrednio.
+"""
@@ -0,0 +1,158 @@
+"""
+Raport postępu tłumaczenia: ile tekstów z lang/en jest przetłumaczonych, nieprzetłumaczonych (identycznych
+z angielskim) i brakujących w lang/pl, w podziale na przygody, sekcje (journals, actors, items...) i dokumenty.
+
+Pary plików są liczone równolegle, a wyniki zapamiętywane w .cache według skrótu obu plików, więc
+niezmienione przygody nie są ponownie przeglądane. Plik jest też oznaczany jako nieaktualny, gdy angielski
+był w repozytorium zmieniany później niż polski.
+
+Uruchomienie z katalogu repozytorium:
+    python coverage_report.py [--json coverage.json] [--documents]
+"""
+import argparse
+import json
+import subprocess
+import time
+
+from segments import is_segment_reference
+from translations import (EN_DIR, PL_DIR, STRUCTURAL_SECTIONS, cached_pair_results, iter_leaves, read_translation,
+                          translation_pairs)
+
+CACHE_PATH = '.cache/coverage.json'
+STATES = ('translated', 'untranslated', 'missing')
+
+
+def leaf_location(path):
+    """
+    Sekcja i dokument, do których należy liść. W przygodach teksty dokumentów leżą pod
+    entries/<przygoda>/<sekcja>/<dokument>, a w zwykłych kompendiach pod entries/<dokument>.
+
+    :return: Krotka (sekcja, dokument albo None).
+    """
+    if path[0] != 'entries':
+        return path[0], path[1] if len(path) > 2 else None
+    if len(path) > 3:
+        return path[2], path[3]
+    return 'entries', path[1]
+
+
+def empty_counts():
+    return dict.fromkeys(STATES, 0)
+
+
+def coverage(en_path, pl_path):
+    """
+    Liczy stan każdego tekstu z pliku angielskiego.
+
+    :return: Słownik {"total": liczniki, "sections": {sekcja: {"total": liczniki, "documents": {dokument: liczniki}}}}.
+    """
+    pl_leaves = dict(iter_leaves(read_translation(pl_path))) if pl_path else {}
+    total = empty_counts()
+    sections = {}
+    for path, source in iter_leaves(read_translation(en_path)):
+        # Odwołania do segmentów nie są tekstem, tłumaczy się sam segment
+        if path[0] in STRUCTURAL_SECTIONS or not isinstance(source, str) or not source.strip() or \
+                is_segment_reference(source):
+            continue
+
+        target = pl_leaves.get(path)
+        if target is None:
+            state = 'missing'
+        elif target == source:
+            state = 'untranslated'
+        else:
+            state = 'translated'
+
+        section_name, document_name = leaf_location(path)
+        section = sections.get(section_name)
+        if section is None:
+            section = sections[section_name] = {"total": empty_counts(), "documents": {}}
+        total[state] += 1
+        section["total"][state] += 1
+        if document_name is not None:
+            document = section["documents"].get(document_name)
+            if document is None:
+                document = section["documents"][document_name] = empty_counts()
+            document[state] += 1
+    return {"total": total, "sections": sections}
+
+
+def last_commit_time(path):
+    """
+    Czas ostatniego commita zmieniającego plik (None poza repozytorium git albo dla nowego pliku).
+    """
+    try:
+        output = subprocess.run(['git', 'log', '-1', '--format=%ct', '--', path], capture_output=True, text=True,
+                                check=True).stdout.strip()
+    except (OSError, subprocess.CalledProcessError):
+        return None
+    return int(output) if output else None
+
+
+def staleness(en_path, pl_path):
+    """
+    O ile dni plik angielski był zmieniony później niż tłumaczenie (0, jeśli nie był; None, gdy nie wiadomo).
+    """
+    en_time = last_commit_time(en_path)
+    pl_time = last_commit_time(pl_path) if pl_path else None
+    if en_time is None or pl_time is None:
+        return None
+    return max(0, en_time - pl_time) // 86400
+
+
+def percent(counts):
+    total = sum(counts.values())
+    return 100 * counts['translated'] / total if total else 100.0
+
+
+def build_report(en_dir=EN_DIR, pl_dir=PL_DIR, cache_path=CACHE_PATH, workers=None):
+    """
+    :return: Krotka (raport {plik: wynik coverage() z kluczem "stale_days"}, liczba przeliczonych plików).
+    """
+    pairs = translation_pairs(en_dir, pl_dir)
+    report, scanned = cached_pair_results(pairs, cache_path, coverage, __file__, workers)
+    for name, en_path, pl_path in pairs:
+        report[name]["stale_days"] = staleness(en_path, pl_path)
+    return report, scanned
+
+
+def print_report(report, documents=False):
+    print(f'{"plik / sekcja":<64} {"przetł.":>8} {"nieprzetł.":>10} {"brak":>6} {"%":>6}')
+    for name, result in report.items():
+        counts = result["total"]
+        stale = f'  (angielski nowszy o {result["stale_days"]} dni)' if result.get("stale_days") else ''
+        print(f'{name:<64} {counts["translated"]:>8} {counts["untranslated"]:>10} {counts["missing"]:>6} '
+              f'{percent(counts):>5.1f}%{stale}')
+        for section_name, section in result["sections"].items():
+            counts = section["total"]
+            print(f'    {section_name:<60} {counts["translated"]:>8} {counts["untranslated"]:>10} '
+                  f'{counts["missing"]:>6} {percent(counts):>5.1f}%')
+            if not documents:
+                continue
+            for document_name, counts in section["documents"].items():
+                if counts["translated"] < sum(counts.values()):
+                    print(f'        {document_name[:56]:<56} {counts["translated"]:>8} {counts["untranslated"]:>10} '
+                          f'{counts["missing"]:>6} {percent(counts):>5.1f}%')
+
+
+def main():
+    parser = argparse.ArgumentParser(description='Raport postępu tłumaczenia lang/pl względem lang/en.')
+    parser.add_argument('--en-dir', default=EN_DIR)
+    parser.add_argument('--pl-dir', default=PL_DIR)
+    parser.add_argument('--json', help='Zapisuje pełny raport (z dokumentami) do pliku JSON')
+    parser.add_argument('--documents', action='store_true', help='Pokazuje niedokończone dokumenty')
+    parser.add_argument('--workers', type=int, default=None, help='Liczba procesów (domyślnie liczba rdzeni)')
+    args = parser.parse_args()
+
+    start = time.perf_counter()
+    report, scanned = build_report(args.en_dir, args.pl_dir, workers=args.workers)
+    print_report(report, args.documents)
+    print(f'Przeliczono {scanned} z {len(report)} plików w {time.perf_counter() - start:.2f} s')
+
+    if args.json:
+        with open(args.json, 'w', encoding='utf-8') as json_file:
+            json.dump(report, json_file, ensure_ascii=False, indent=4)
+
+
+if __name__ == '__main__':
+    main()
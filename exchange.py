@@ -0,0 +1,341 @@
+"""
+Eksport plików tłumaczeń Babele do XLIFF 2.0 i gettext PO oraz import z powrotem do JSON.
+
+Każdy tekst to jedna jednostka, której identyfikatorem jest ścieżka kluczy zapisana jako JSON Pointer
+(w PO msgctxt, w XLIFF atrybut name jednostki, bo id musi być NMTOKEN). Wartości, których się nie tłumaczy
+('mapping', liczby, puste teksty, odwołania do segmentów), trafiają do pliku jako metadane z wartością JSON,
+więc import odtwarza plik w tej samej kolejności kluczy, bajt w bajt. Przy imporcie tekst bez tłumaczenia
+dostaje wartość źródłową, jak w Babele.
+
+Zapis i odczyt są strumieniowe: eksport pisze jednostkę po jednostce, a import czyta XLIFF przez iterparse
+i PO linia po linii, nie trzymając drzewa XML ani listy wpisów.
+
+Uruchomienie z katalogu repozytorium:
+    python exchange.py export lang/en/pf2e-rusthenge.adventures.json --target lang/pl/pf2e-rusthenge.adventures.json
+    python exchange.py import pf2e-rusthenge.adventures.xlf --output lang/pl/pf2e-rusthenge.adventures.json
+    python exchange.py verify lang/en/pf2e-season-of-ghosts.adventures.json
+"""
+import argparse
+import hashlib
+import json
+import os
+import re
+import time
+import xml.etree.ElementTree as ElementTree
+
+from segments import is_segment_reference
+from translations import (STRUCTURAL_SECTIONS, dump_translation, iter_leaves, json_pointer, parse_json_pointer,
+                          read_translation, set_path, write_translation)
+
+XLIFF_NAMESPACE = 'urn:oasis:names:tc:xliff:document:2.0'
+METADATA_NAMESPACE = 'urn:oasis:names:tc:xliff:metadata:2.0'
+FORMATS = ('xliff', 'po')
+EXTENSIONS = {'xliff': '.xlf', 'po': '.po'}
+SOURCE_LANGUAGE = 'en'
+TARGET_LANGUAGE = 'pl'
+# Znaki, których nie da się zapisać w XML 1.0 (także jako encje); takie teksty idą jako wartość JSON
+INVALID_XML = re.compile('[^\t\n\r\x20-\ud7ff\ue000-\ufffd\U00010000-\U0010ffff]')
+# Znaki sterujące, których PO nie ma jak zapisać (\t, \n i \r są zapisywane jako sekwencje ucieczki)
+PO_CONTROL = re.compile('[\x00-\x08\x0b\x0c\x0e-\x1f\x7f]')
+PO_ESCAPES = {'\\': '\\\\', '"': '\\"', '\n': '\\n', '\t': '\\t', '\r': '\\r'}
+PO_UNESCAPES = {value[1]: key for key, value in PO_ESCAPES.items()}
+PO_ESCAPE_PATTERN = re.compile(r'[\\"\n\t\r]')
+PO_UNESCAPE_PATTERN = re.compile(r'\\(.)')
+
+
+def iter_units(source, target=None):
+    """
+    Jednostki pliku w kolejności kluczy.
+
+    :param source: Drzewo pliku angielskiego.
+    :param target: Drzewo tłumaczenia o tej samej strukturze (opcjonalnie).
+    :return: Generator krotek (ścieżka kluczy, tekst źródłowy albo wartość, tłumaczenie albo None, czy to tekst).
+    """
+    target_leaves = dict(iter_leaves(target)) if target else {}
+    for path, value in iter_empty_aware_leaves(source):
+        text = is_text(path, value)
+        if not text:
+            # Wartość, której się nie tłumaczy, jest zapisywana z tłumaczenia, żeby import go nie zmieniał
+            yield path, target_leaves.get(path, value), None, False
+            continue
+        translated = target_leaves.get(path)
+        yield path, value, translated if isinstance(translated, str) else None, True
+
+
+def iter_empty_aware_leaves(tree, path=()):
+    # Jak iter_leaves, ale pusty słownik też jest liściem, żeby przetrwał eksport
+    for key, value in tree.items():
+        if isinstance(value, dict) and value:
+            yield from iter_empty_aware_leaves(value, path + (key,))
+        else:
+            yield path + (key,), value
+
+
+def is_text(path, value):
+    return (path[0] not in STRUCTURAL_SECTIONS and isinstance(value, str) and value != ''
+            and not is_segment_reference(value) and not INVALID_XML.search(value) and not PO_CONTROL.search(value))
+
+
+def json_metadata(value):
+    # Znaki niedozwolone w XML mogą być tylko w tekstach JSON, więc można je zapisać jako \uXXXX
+    return INVALID_XML.sub(lambda match: f'\\u{ord(match.group()):04x}', json.dumps(value, ensure_ascii=False))
+
+
+def unit_id(pointer):
+    return 'u' + hashlib.blake2b(pointer.encode('utf-8'), digest_size=8).hexdigest()
+
+
+def xml_escape(text, attribute=False):
+    text = text.replace('&', '&amp;').replace('<', '&lt;').replace('>', '&gt;').replace('\r', '&#13;')
+    if attribute:
+        text = text.replace('"', '&quot;').replace('\n', '&#10;').replace('\t', '&#9;')
+    return text
+
+
+def write_xliff(output, source, target=None, original=''):
+    """
+    Zapisuje plik XLIFF 2.0 jednostka po jednostce.
+
+    :param output: Plik otwarty do zapisu w trybie tekstowym.
+    :return: Liczba jednostek do tłumaczenia.
+    """
+    output.write('<?xml version="1.0" encoding="UTF-8"?>\n'
+                 f'<xliff xmlns="{XLIFF_NAMESPACE}" xmlns:mda="{METADATA_NAMESPACE}" version="2.0" '
+                 f'srcLang="{SOURCE_LANGUAGE}" trgLang="{TARGET_LANGUAGE}">\n'
+                 f' <file id="f1" original="{xml_escape(original, True)}">\n')
+    count = 0
+    for path, value, translated, text in iter_units(source, target):
+        pointer = json_pointer(path)
+        attributes = f'id="{unit_id(pointer)}" name="{xml_escape(pointer, True)}"'
+        if not text:
+            output.write(f'  <unit {attributes} translate="no">\n'
+                         f'   <mda:metadata><mda:metaGroup category="babele">'
+                         f'<mda:meta type="json">{xml_escape(json_metadata(value))}</mda:meta>'
+                         f'</mda:metaGroup></mda:metadata>\n'
+                         f'   <segment><source/></segment>\n'
+                         f'  </unit>\n')
+            continue
+
+        count += 1
+        state = '' if translated is None else ' state="translated"' if translated != value else ' state="initial"'
+        output.write(f'  <unit {attributes}>\n'
+                     f'   <segment{state}>\n'
+                     f'    <source xml:space="preserve">{xml_escape(value)}</source>\n')
+        if translated is not None:
+            output.write(f'    <target xml:space="preserve">{xml_escape(translated)}</target>\n')
+        output.write('   </segment>\n'
+                     '  </unit>\n')
+    output.write(' </file>\n'
+                 '</xliff>\n')
+    return count
+
+
+def read_xliff(path):
+    """
+    Czyta jednostki XLIFF strumieniowo.
+
+    :return: Generator par (ścieżka kluczy, wartość: tłumaczenie, tekst źródłowy albo wartość z metadanych).
+    """
+    unit_tag = f'{{{XLIFF_NAMESPACE}}}unit'
+    meta_tag = f'{{{METADATA_NAMESPACE}}}meta'
+    for _, element in ElementTree.iterparse(path, events=('end',)):
+        if element.tag != unit_tag:
+            continue
+        path_keys = parse_json_pointer(element.get('name'))
+        if element.get('translate') == 'no':
+            meta = element.find(f'.//{meta_tag}[@type="json"]')
+            yield path_keys, json.loads(meta.text or '')
+        else:
+            value = ''.join(segment_text(segment, 'target') if segment.find(f'{{{XLIFF_NAMESPACE}}}target')
+                            is not None else segment_text(segment, 'source')
+                            for segment in element.iter(f'{{{XLIFF_NAMESPACE}}}segment'))
+            yield path_keys, value
+        element.clear()
+
+
+def segment_text(segment, tag):
+    return segment.find(f'{{{XLIFF_NAMESPACE}}}{tag}').text or ''
+
+
+def po_string(text):
+    lines = text.split('\n')
+    if len(lines) == 1:
+        return f'"{po_escape(text)}"'
+    # Wieloliniowe teksty jak w xgettext: pusty pierwszy wiersz, potem wiersz na każdą linię
+    parts = [po_escape(line) + '\\n' for line in lines[:-1]] + ([po_escape(lines[-1])] if lines[-1] else [])
+    return '""\n' + '\n'.join(f'"{part}"' for part in parts)
+
+
+def po_escape(text):
+    return PO_ESCAPE_PATTERN.sub(lambda match: PO_ESCAPES[match.group()], text)
+
+
+def write_po(output, source, target=None, original=''):
+    """
+    Zapisuje plik gettext PO wpis po wpisie.
+
+    :param output: Plik otwarty do zapisu w trybie tekstowym.
+    :return: Liczba wpisów do tłumaczenia.
+    """
+    output.write('msgid ""\n'
+                 'msgstr ""\n'
+                 '"Content-Type: text/plain; charset=UTF-8\\n"\n'
+                 f'"Language: {TARGET_LANGUAGE}\\n"\n'
+                 f'"X-Source-File: {po_escape(original)}\\n"\n')
+    count = 0
+    for path, value, translated, text in iter_units(source, target):
+        output.write('\n')
+        if not text:
+            # Wartość, której się nie tłumaczy, jako JSON w msgid z flagą babele-json
+            output.write(f'#, babele-json\nmsgctxt {po_string(json_pointer(path))}\n'
+                         f'msgid {po_string(json.dumps(value, ensure_ascii=False))}\nmsgstr ""\n')
+            continue
+        count += 1
+        # Tłumaczenie identyczne z tekstem źródłowym zapisujemy jako brak tłumaczenia
+        msgstr = translated if translated is not None and translated != value else ''
+        output.write(f'msgctxt {po_string(json_pointer(path))}\nmsgid {po_string(value)}\nmsgstr {po_string(msgstr)}\n')
+    return count
+
+
+def po_unescape(text):
+    return PO_UNESCAPE_PATTERN.sub(lambda match: PO_UNESCAPES.get(match.group(1), match.group()), text)
+
+
+def read_po(path):
+    """
+    Czyta wpisy PO linia po linii.
+
+    :return: Generator par (ścieżka kluczy, wartość: tłumaczenie, tekst źródłowy albo wartość z flagi babele-json).
+    """
+    def finish(entry):
+        # Nagłówek (msgid "" bez msgctxt) i wpisy spoza eksportu nie mają ścieżki
+        if entry.get('msgctxt') is None:
+            return None
+        if 'babele-json' in entry['flags']:
+            return parse_json_pointer(entry['msgctxt']), json.loads(entry['msgid'])
+        return parse_json_pointer(entry['msgctxt']), entry.get('msgstr') or entry['msgid']
+
+    entry = {'flags': set()}
+    field = None
+    with open(path, 'r', encoding='utf-8') as po_file:
+        for line in po_file:
+            line = line.strip()
+            if not line:
+                continue
+            if line.startswith('"'):
+                entry[field] += po_unescape(line[1:-1])
+                continue
+            # Komentarz albo msgctxt/msgid po msgstr zaczyna następny wpis
+            if 'msgstr' in entry and not line.startswith('msgstr'):
+                result = finish(entry)
+                if result:
+                    yield result
+                entry = {'flags': set()}
+            if line.startswith('#,'):
+                entry['flags'].update(flag.strip() for flag in line[2:].split(','))
+            elif not line.startswith('#'):
+                field, _, value = line.partition(' ')
+                entry[field] = po_unescape(value[1:-1])
+    result = finish(entry)
+    if result:
+        yield result
+
+
+def rebuild(units):
+    """
+    Składa drzewo pliku z par (ścieżka kluczy, wartość) w kolejności pliku.
+    """
+    tree = {}
+    for path, value in units:
+        set_path(tree, path, value)
+    return tree
+
+
+def export_file(source_path, output_path, target_path=None, file_format='xliff'):
+    """
+    :return: Liczba jednostek do tłumaczenia.
+    """
+    source = read_translation(source_path)
+    target = read_translation(target_path) if target_path else None
+    writer = write_xliff if file_format == 'xliff' else write_po
+    with open(output_path, 'w', encoding='utf-8', newline='\n') as output:
+        return writer(output, source, target, os.path.basename(source_path))
+
+
+def import_file(input_path, output_path=None):
+    """
+    Odtwarza plik tłumaczenia Babele z XLIFF (.xlf, .xliff) albo PO (.po).
+
+    :return: Drzewo pliku (zapisane do output_path, jeśli podano).
+    """
+    reader = read_po if input_path.endswith('.po') else read_xliff
+    tree = rebuild(reader(input_path))
+    if output_path:
+        write_translation(output_path, tree)
+    return tree
+
+
+def verify(source_path, target_path=None, directory='.cache/exchange'):
+    """
+    Sprawdza, że eksport i import w obu formatach odtwarzają pliki bajt w bajt.
+
+    :return: Lista krotek (format, liczba jednostek, czas eksportu, czas importu).
+    """
+    os.makedirs(directory, exist_ok=True)
+    with open(source_path, 'r', encoding='utf-8') as json_file:
+        expected_source = json_file.read()
+    expected_target = None
+    if target_path:
+        with open(target_path, 'r', encoding='utf-8') as json_file:
+            expected_target = json_file.read()
+
+    rows = []
+    name = os.path.splitext(os.path.basename(source_path))[0]
+    for file_format in FORMATS:
+        exchange_path = os.path.join(directory, name + EXTENSIONS[file_format])
+        start = time.perf_counter()
+        count = export_file(source_path, exchange_path, None, file_format)
+        export_time = time.perf_counter() - start
+        start = time.perf_counter()
+        if dump_translation(import_file(exchange_path)) != expected_source:
+            raise ValueError(f'{file_format}: import pliku {source_path} nie odtwarza go bajt w bajt')
+        import_time = time.perf_counter() - start
+        if expected_target is not None:
+            export_file(source_path, exchange_path, target_path, file_format)
+            if dump_translation(import_file(exchange_path)) != expected_target:
+                raise ValueError(f'{file_format}: import tłumaczenia {target_path} nie odtwarza go bajt w bajt')
+        rows.append((file_format, count, export_time, import_time))
+    return rows
+
+
+def main():
+    parser = argparse.ArgumentParser(description='Eksport i import plików tłumaczeń w XLIFF 2.0 i PO.')
+    commands = parser.add_subparsers(dest='command', required=True)
+    export = commands.add_parser('export', help='Zapisuje plik JSON jako XLIFF albo PO')
+    export.add_argument('source', help='Plik angielski (np. lang/en/... albo <wersja>.<pakiet>.json)')
+    export.add_argument('--target', help='Istniejące tłumaczenie do wstawienia jako target/msgstr')
+    export.add_argument('--format', choices=FORMATS, default='xliff')
+    export.add_argument('--output', help='Plik wynikowy (domyślnie nazwa źródła z rozszerzeniem formatu)')
+    import_parser = commands.add_parser('import', help='Odtwarza plik JSON z XLIFF albo PO')
+    import_parser.add_argument('input')
+    import_parser.add_argument('--output', required=True)
+    verify_parser = commands.add_parser('verify', help='Sprawdza eksport i import w obu formatach')
+    verify_parser.add_argument('source')
+    verify_parser.add_argument('--target')
+    args = parser.parse_args()
+
+    if args.command == 'export':
+        output = args.output or os.path.splitext(os.path.basename(args.source))[0] + EXTENSIONS[args.format]
+        count = export_file(args.source, output, args.target, args.format)
+        print(f'Zapisano {count} tekstów do {output}')
+    elif args.command == 'import':
+        import_file(args.input, args.output)
+        print(f'Zapisano {args.output}')
+    else:
+        for file_format, count, export_time, import_time in verify(args.source, args.target):
+            print(f'{file_format:<6} {count:>6} tekstów  eksport {export_time * 1000:>7.1f} ms  '
+                  f'import {import_time * 1000:>7.1f} ms  OK')
+
+
+if __name__ == '__main__':
+    main()
@@ -0,0 +1,187 @@
+"""
+Pomiary etapów przetwarzania: czas, liczba dokumentów, bajty wejścia i wyjścia oraz szczytowa pamięć procesu.
+
+Ustawienia są trzymane w zmiennych środowiskowych, więc dziedziczą je procesy z ProcessPoolExecutor:
+    PF2E_TRACE         - plik śladu (brak - pomiary są wyłączone)
+    PF2E_TRACE_FORMAT  - 'jsonl' (jeden obiekt na linię) lub 'chrome' (do otwarcia w chrome://tracing i Perfetto)
+    PF2E_QUIET         - '1' wyłącza komunikaty o pojedynczych dokumentach i plikach
+
+Podsumowanie pliku śladu:
+    python instrumentation.py trace.jsonl
+"""
+import contextlib
+import json
+import os
+import sys
+import threading
+import time
+
+try:
+    import resource
+except ImportError:  # Windows
+    resource = None
+
+TRACE_ENV = 'PF2E_TRACE'
+TRACE_FORMAT_ENV = 'PF2E_TRACE_FORMAT'
+QUIET_ENV = 'PF2E_QUIET'
+TRACE_FORMATS = ('jsonl', 'chrome')
+
+_write_lock = threading.Lock()
+
+
+def configure(trace_file=None, trace_format='jsonl', quiet=False):
+    """
+    Włącza zapis śladu i tryb cichy dla tego procesu i procesów potomnych. Plik śladu jest zakładany od nowa.
+    """
+    if trace_format not in TRACE_FORMATS:
+        raise ValueError(f'Nieznany format śladu: {trace_format}')
+
+    if trace_file:
+        trace_file = os.path.abspath(trace_file)
+        with open(trace_file, 'w', encoding='utf-8') as file:
+            # Format tablicowy Chrome dopuszcza brak zamykającego nawiasu, więc zdarzenia można tylko dopisywać
+            file.write('[\n' if trace_format == 'chrome' else '')
+        os.environ[TRACE_ENV] = trace_file
+        os.environ[TRACE_FORMAT_ENV] = trace_format
+    else:
+        os.environ.pop(TRACE_ENV, None)
+        os.environ.pop(TRACE_FORMAT_ENV, None)
+
+    if quiet:
+        os.environ[QUIET_ENV] = '1'
+    else:
+        os.environ.pop(QUIET_ENV, None)
+
+
+def is_quiet():
+    return os.environ.get(QUIET_ENV) == '1'
+
+
+def progress(*args, **kwargs):
+    """
+    print() dla komunikatów o postępie, pomijany w trybie cichym.
+    """
+    if not is_quiet():
+        print(*args, **kwargs)
+
+
+def peak_rss_mb():
+    """
+    Szczytowa pamięć (RSS) bieżącego procesu w MB albo None, gdy system jej nie podaje.
+    """
+    if resource is None:
+        return None
+    # ru_maxrss jest w KB na Linuksie i w bajtach na macOS
+    return resource.getrusage(resource.RUSAGE_SELF).ru_maxrss / (1024 * 1024 if sys.platform == 'darwin' else 1024)
+
+
+class Span:
+    """
+    Liczniki jednego mierzonego etapu, uzupełniane przez kod w trakcie jego trwania.
+    """
+    def __init__(self, name, args):
+        self.name = name
+        self.args = args
+        self.documents = 0
+        self.bytes_in = 0
+        self.bytes_out = 0
+
+    def add(self, documents=0, bytes_in=0, bytes_out=0):
+        self.documents += documents
+        self.bytes_in += bytes_in
+        self.bytes_out += bytes_out
+
+
+@contextlib.contextmanager
+def span(name, **args):
+    """
+    Mierzy czas bloku i po jego zakończeniu dopisuje zdarzenie do pliku śladu (jeśli jest włączony).
+
+    :param name: Nazwa etapu (download, extract, leveldb, process, cleanup, write...).
+    :param args: Dodatkowe informacje zapisywane w zdarzeniu, np. nazwa pakietu.
+    :return: Obiekt Span, do którego można dodać liczbę dokumentów i bajtów.
+    """
+    current = Span(name, args)
+    trace_file = os.environ.get(TRACE_ENV)
+    if not trace_file:
+        yield current
+        return
+
+    start = time.time()
+    begin = time.perf_counter()
+    try:
+        yield current
+    except BaseException as error:
+        current.args['error'] = repr(error)
+        raise
+    finally:
+        write_event(trace_file, current, start, time.perf_counter() - begin)
+
+
+def write_event(trace_file, current, start, duration):
+    counters = {
+        "documents": current.documents,
+        "bytes_in": current.bytes_in,
+        "bytes_out": current.bytes_out,
+        "peak_rss_mb": peak_rss_mb(),
+    }
+    if os.environ.get(TRACE_FORMAT_ENV) == 'chrome':
+        event = {"name": current.name, "cat": 'pf2e', "ph": 'X', "ts": start * 1e6, "dur": duration * 1e6,
+                 "pid": os.getpid(), "tid": threading.get_ident(), "args": {**counters, **current.args}}
+        line = json.dumps(event, ensure_ascii=False) + ',\n'
+    else:
+        event = {"name": current.name, "start": start, "duration": duration, "pid": os.getpid(),
+                 "thread": threading.get_ident(), **counters, "args": current.args}
+        line = json.dumps(event, ensure_ascii=False) + '\n'
+
+    # Jedno krótkie dopisanie na zdarzenie, więc zapisy z wielu procesów się nie przeplatają
+    with _write_lock, open(trace_file, 'a', encoding='utf-8') as file:
+        file.write(line)
+
+
+def read_trace(trace_file):
+    """
+    Wczytuje zdarzenia z pliku śladu w dowolnym z obsługiwanych formatów do postaci jak w 'jsonl'.
+    """
+    with open(trace_file, 'r', encoding='utf-8') as file:
+        text = file.read()
+
+    if text.lstrip().startswith('['):
+        events = json.loads(text.rstrip().rstrip(']').rstrip().rstrip(',') + ']')
+        return [{"name": event["name"], "start": event["ts"] / 1e6, "duration": event["dur"] / 1e6,
+                 "pid": event["pid"], "thread": event["tid"],
+                 **{key: event["args"].get(key) for key in ('documents', 'bytes_in', 'bytes_out', 'peak_rss_mb')},
+                 "args": {key: value for key, value in event["args"].items()
+                          if key not in ('documents', 'bytes_in', 'bytes_out', 'peak_rss_mb')}}
+                for event in events]
+    return [json.loads(line) for line in text.splitlines() if line.strip()]
+
+
+def summarize(events):
+    """
+    Sumuje zdarzenia według nazwy etapu.
+
+    :return: Słownik nazwa -> {"count", "seconds", "documents", "bytes_in", "bytes_out", "peak_rss_mb"}.
+    """
+    summary = {}
+    for event in events:
+        stage = summary.setdefault(event["name"], {"count": 0, "seconds": 0.0, "documents": 0, "bytes_in": 0,
+                                                   "bytes_out": 0, "peak_rss_mb": 0.0})
+        stage["count"] += 1
+        stage["seconds"] += event["duration"]
+        stage["documents"] += event["documents"] or 0
+        stage["bytes_in"] += event["bytes_in"] or 0
+        stage["bytes_out"] += event["bytes_out"] or 0
+        stage["peak_rss_mb"] = max(stage["peak_rss_mb"], event["peak_rss_mb"] or 0.0)
+    return summary
+
+
+if __name__ == '__main__':
+    if len(sys.argv) != 2:
+        raise SystemExit('Użycie: python instrumentation.py <plik śladu>')
+
+    print(f'{"etap":<12} {"liczba":>7} {"czas [s]":>9} {"dokumenty":>10} {"MB we":>8} {"MB wy":>8} {"RSS [MB]":>9}')
+    for name, stage in summarize(read_trace(sys.argv[1])).items():
+        print(f'{name:<12} {stage["count"]:>7} {stage["seconds"]:>9.2f} {stage["documents"]:>10} '
+              f'{stage["bytes_in"] / 1024 / 1024:>8.1f} {stage["bytes_out"] / 1024 / 1024:>8.1f} '
+              f'{stage["peak_rss_mb"]:>9.1f}')
@@ -1,14 +1,40 @@
+import argparse
+import hashlib
+import itertools
 import json
+import operator
 import os
 import pathlib
 import re
 import shutil
+import sqlite3
+import sys
 import zipfile
-from urllib.request import urlretrieve
+import zlib
+from concurrent.futures import ProcessPoolExecutor, ThreadPoolExecutor, as_completed
 
 import plyvel
 import requests
 
+from instrumentation import configure, progress, span
+from model import Actor, Adventure, Item, Journal, Macro, Page, Playlist, Record, Scene, Sound, Table
+from pack_cache import SNAPSHOT_PATH, PackCache, pack_identity
+from segments import StringTable, deduplicate
+from translation_memory import MEMORY_PATH, TranslationMemory
+from translations import atomic_write, read_translation, write_translation
+
+DOWNLOAD_CACHE_DIR = '.cache/downloads'
+PIPELINE_DIR = '.cache/pipeline'
+# Etapy przetwarzania przygody w kolejności wykonywania
+STAGES = ('downloaded', 'extracted', 'dumped', 'processed', 'written')
+DOWNLOAD_TIMEOUT = (10, 60)
+MODULE_ZIP_FILES = ('module.json', 'adventures.json')
+UUID_LABEL_PATTERN = re.compile(r"(@UUID\[[^\]]+\])\{[^}]+\}")
+# Pliki pakietów większe od tego progu process_files czyta strumieniowo
+STREAMING_THRESHOLD = 64 * 1024 * 1024
+JSON_WHITESPACE = re.compile(r'[ \t\n\r]*')
+JSON_INDENT = ' ' * 4
+
 
 def create_version_directory(version):
     if os.path.exists(version):
@@ -20,45 +46,240 @@ def create_version_directory(version):
         return True
 
 
-def download_and_extract_zip(zip_url, zip_filename, extract_folder_zip):
-    response = requests.get(zip_url)
-    with open(zip_filename, 'wb') as zip_file:
-        zip_file.write(response.content)
-
-    with zipfile.ZipFile(zip_filename, 'r') as zip_file:
-        zip_file.extractall(extract_folder_zip)
-        print('Pobrano i rozpakowano plik .zip')
+def cached_download(url, destination=None, cache_dir=DOWNLOAD_CACHE_DIR, chunk_size=1024 * 1024, session=None):
+    """
+    Pobiera plik przez podręczny katalog na dysku.
+
+    Zapytania są warunkowe (If-None-Match / If-Modified-Since), więc niezmieniony plik kosztuje jedną odpowiedź
+    304 bez treści. Treść jest zapisywana strumieniowo w kawałkach, a przerwane pobieranie jest wznawiane
+    nagłówkiem Range. Rozmiar i suma MD5 (gdy ETag nią jest) są sprawdzane po pobraniu, a suma SHA-256
+    pliku z pamięci podręcznej przed każdym użyciem. Jeśli serwer odpowie 416 (plik .part ma już całą treść,
+    bo przerwano przed przeniesieniem go na miejsce), sprawdzony plik .part jest używany bez pobierania,
+    a niepasujący jest usuwany i plik pobierany od początku.
+
+    :param url: Adres pliku.
+    :param destination: Ścieżka, do której skopiować plik (opcjonalnie).
+    :param cache_dir: Katalog pamięci podręcznej.
+    :param chunk_size: Rozmiar kawałka przy zapisie.
+    :param session: Obiekt z metodą get() jak requests.Session (domyślnie moduł requests).
+    :return: Krotka (ścieżka pliku w pamięci podręcznej, czy treść się zmieniła).
+    """
+    http = session or requests
+    os.makedirs(cache_dir, exist_ok=True)
+    cache_key = hashlib.sha1(url.encode('utf-8')).hexdigest()
+    body_path = os.path.join(cache_dir, f'{cache_key}.bin')
+    part_path = os.path.join(cache_dir, f'{cache_key}.part')
+    meta_path = os.path.join(cache_dir, f'{cache_key}.json')
+    part_meta_path = os.path.join(cache_dir, f'{cache_key}.part.json')
+
+    meta = load_manifest(meta_path)
+    if meta and not (os.path.exists(body_path) and file_sha256(body_path) == meta.get('sha256')):
+        print(f'Uszkodzony plik w pamięci podręcznej, pobieram ponownie: {url}')
+        meta = {}
+
+    # Rozmiar z Content-Length, zakres Range i suma MD5 w ETag dotyczą bajtów przesyłanych, a iter_content
+    # rozpakowuje treść skompresowaną przez serwer (gzip), więc prosimy o treść bez kompresji
+    headers = {'Accept-Encoding': 'identity'}
+    if meta.get('etag'):
+        headers['If-None-Match'] = meta['etag']
+    if meta.get('last_modified'):
+        headers['If-Modified-Since'] = meta['last_modified']
+
+    # Wznowienie przerwanego pobierania, o ile serwer nadal ma tę samą wersję pliku
+    part_meta = load_manifest(part_meta_path)
+    resume_from = os.path.getsize(part_path) if os.path.exists(part_path) else 0
+    if resume_from and (part_meta.get('etag') or part_meta.get('last_modified')):
+        headers['Range'] = f'bytes={resume_from}-'
+        headers['If-Range'] = part_meta.get('etag') or part_meta['last_modified']
+    else:
+        resume_from = 0
+
+    with span('download', url=url) as current, \
+            http.get(url, headers=headers, stream=True, timeout=DOWNLOAD_TIMEOUT) as response:
+        if response.status_code == 304:
+            progress(f'Plik bez zmian, używam pamięci podręcznej: {url}')
+            changed = False
+        elif response.status_code == 416 and resume_from:
+            # Proces przerwano po pobraniu całej treści, a przed przeniesieniem pliku .part na miejsce
+            total = response.headers.get('Content-Range', '').rpartition('/')[2]
+            changed = total.isdigit() and int(total) == resume_from
+            if changed:
+                sha256, md5 = part_hashes(part_path, chunk_size)
+                etag, last_modified = part_meta.get('etag'), part_meta.get('last_modified')
+                changed = verify_checksum(etag, md5)
+            if changed:
+                current.add(documents=1)
+                promote_part(url, part_path, part_meta_path, body_path, meta_path, etag, last_modified, sha256)
+        else:
+            response.raise_for_status()
+            etag = response.headers.get('ETag')
+            last_modified = response.headers.get('Last-Modified')
+
+            if response.status_code != 206:
+                resume_from = 0
+            expected_size = response.headers.get('Content-Length')
+            expected_size = int(expected_size) + resume_from if expected_size is not None else None
+
+            if resume_from:
+                sha256, md5 = part_hashes(part_path, chunk_size)
+            else:
+                sha256, md5 = hashlib.sha256(), hashlib.md5()
+
+            download_meta = {'etag': etag, 'last_modified': last_modified}
+            with open(part_path, 'ab' if resume_from else 'wb') as part_file:
+                for chunk in response.iter_content(chunk_size):
+                    part_file.write(chunk)
+                    sha256.update(chunk)
+                    md5.update(chunk)
+                    if part_meta != download_meta:
+                        # Zapisywane dopiero po pierwszym kawałku, żeby nie opisywały pustego pliku .part
+                        part_file.flush()
+                        save_manifest(part_meta_path, download_meta)
+                        part_meta = download_meta
+
+            size = os.path.getsize(part_path)
+            if expected_size is not None and size != expected_size:
+                raise IOError(f'Niepełne pobieranie {url}: {size} z {expected_size} bajtów')
+            if not verify_checksum(etag, md5):
+                discard_part(part_path, part_meta_path)
+                raise IOError(f'Niezgodna suma kontrolna pliku {url}')
+
+            current.add(documents=1, bytes_out=size - resume_from)
+            promote_part(url, part_path, part_meta_path, body_path, meta_path, etag, last_modified, sha256)
+            changed = True
+
+    if response.status_code == 416 and not changed:
+        # Plik .part nie pasuje do wersji na serwerze; pobieramy całość od nowa
+        progress(f'Nie można wznowić pobierania, pobieram od początku: {url}')
+        discard_part(part_path, part_meta_path)
+        return cached_download(url, destination, cache_dir, chunk_size, session)
+
+    if destination:
+        copy_atomic(body_path, destination)
+    return body_path, changed
+
+
+def part_hashes(part_path, chunk_size):
+    """
+    :return: Obiekty hashlib SHA-256 i MD5 z dotychczasową treścią pliku .part.
+    """
+    sha256 = hashlib.sha256()
+    md5 = hashlib.md5()
+    with open(part_path, 'rb') as part_file:
+        for chunk in iter(lambda: part_file.read(chunk_size), b''):
+            sha256.update(chunk)
+            md5.update(chunk)
+    return sha256, md5
 
 
-def remove_all_braces_from_uuid(data):
+def verify_checksum(etag, md5):
     """
-    Szuka w wartościach słownika '@UUID[xxx]{xxx}' i usuwa wszystkie wystąpienia '{xxx}' po każdym '@UUID[xxx]'.
-
-    :param data: Słownik do przeszukania i modyfikacji.
+    ETag z S3/R2 dla plików wysłanych w całości to suma MD5 treści; inne ETagi nie są sprawdzane.
     """
-    for key, value in data.items():
-        if isinstance(value, str) and "@UUID" in value:
-            # Usuń wszystkie wystąpienia wzorca {xxx} po @UUID[xxx]
-            data[key] = re.sub(r"(@UUID\[[^\]]+\])\{[^}]+\}", r"\1", value)
-        elif isinstance(value, dict):
-            # Rekurencyjnie przeszukaj zagnieżdżone słowniki
-            remove_all_braces_from_uuid(value)
+    return not (etag and re.fullmatch(r'"?[0-9a-f]{32}"?', etag) and etag.strip('"') != md5.hexdigest())
+
+
+def discard_part(part_path, part_meta_path):
+    for path in (part_path, part_meta_path):
+        if os.path.exists(path):
+            os.remove(path)
+
+
+def promote_part(url, part_path, part_meta_path, body_path, meta_path, etag, last_modified, sha256):
+    os.replace(part_path, body_path)
+    if os.path.exists(part_meta_path):
+        os.remove(part_meta_path)
+    save_manifest(meta_path, {'url': url, 'etag': etag, 'last_modified': last_modified,
+                              'sha256': sha256.hexdigest(), 'size': os.path.getsize(body_path)})
+
+
+def copy_atomic(source, destination):
+    with open(source, 'rb') as source_file, atomic_write(destination, 'wb') as destination_file:
+        shutil.copyfileobj(source_file, destination_file)
+
 
+def download_and_extract_zip(zip_url, zip_filename, extract_folder_zip, selective=True):
+    cached_download(zip_url, zip_filename)
 
-def read_leveldb_to_json(leveldb_path, output_json_path):
+    extract_module_zip(zip_filename, extract_folder_zip, selective)
+    progress('Pobrano i rozpakowano plik .zip')
+
+
+def extract_module_zip(zip_filename, extract_folder, selective=True):
+    """
+    Rozpakowuje archiwum modułu. W trybie selektywnym wypakowuje tylko bazy LevelDB z katalogów 'packs'
+    oraz module.json i adventures.json, bo tylko z nich korzysta dalsza część skryptu. Mapy, tokeny
+    i dźwięki zostają w archiwum, a pliki, które już istnieją z tym samym CRC, są pomijane.
+
+    :param zip_filename: Ścieżka archiwum .zip.
+    :param extract_folder: Katalog docelowy.
+    :param selective: False rozpakowuje całe archiwum (extractall).
+    """
+    with span('extract', archive=zip_filename) as current, zipfile.ZipFile(zip_filename, 'r') as zip_file:
+        current.add(bytes_in=os.path.getsize(zip_filename))
+        if not selective:
+            zip_file.extractall(extract_folder)
+            current.add(documents=len(zip_file.infolist()),
+                        bytes_out=sum(info.file_size for info in zip_file.infolist()))
+            return
+
+        extracted = skipped = 0
+        for info in zip_file.infolist():
+            parts = info.filename.split('/')
+            in_packs = 'packs' in parts[:-1]
+            module_file = parts[-1] in MODULE_ZIP_FILES and len(parts) <= 2
+            if info.is_dir() or not (in_packs or module_file):
+                continue
+
+            target = os.path.join(extract_folder, *parts)
+            if os.path.isfile(target) and os.path.getsize(target) == info.file_size \
+                    and file_crc32(target) == info.CRC:
+                skipped += 1
+                continue
+
+            zip_file.extract(info, extract_folder)
+            extracted += 1
+            current.add(documents=1, bytes_out=info.file_size)
+
+        progress(f'Rozpakowano {extracted} plików, pominięto {skipped} niezmienionych')
+
+
+def file_crc32(path, chunk_size=1024 * 1024):
+    crc = 0
+    with open(path, 'rb') as crc_file:
+        for chunk in iter(lambda: crc_file.read(chunk_size), b''):
+            crc = zlib.crc32(chunk, crc)
+    return crc
+
+
+def read_leveldb_to_json(leveldb_path, output_json_path, streaming=True, workers=None, incremental=False,
+                         snapshot=None):
+    """
+    Zrzuca wszystkie pakiety LevelDB z katalogu do plików JSON, każdy pakiet w osobnym procesie.
+
+    :param leveldb_path: Katalog z pakietami LevelDB.
+    :param output_json_path: Katalog na pliki JSON.
+    :param streaming: Zapisuje dokumenty na bieżąco, bez trzymania całego pakietu w pamięci.
+    :param workers: Liczba procesów (None - liczba rdzeni, 1 - bez puli procesów).
+    :param incremental: Pomija pakiety bez zmian i dekoduje tylko dokumenty, których skrót się zmienił
+                        (według manifestu obok katalogu wynikowego).
+    :param snapshot: Plik migawki SQLite, do której trafiają też dokumenty pakietów (opcjonalnie).
+    """
     def list_subfolders(directory):
         try:
             # Lista folderów w katalogu
             subfolders = [f.name for f in os.scandir(directory) if f.is_dir()]
 
-            # Zwróć nazwy folderów, jeśli istnieją
-            if subfolders:
-                return subfolders
-            else:
-                return "Brak folderów w katalogu"
-        except Exception as error:
-            raise f"Wystąpił błąd list_subfolders: {error}"
+            if not subfolders:
+                print(f"Brak folderów w katalogu {directory}")
+            return subfolders
+        except OSError as error:
+            raise OSError(f"Wystąpił błąd list_subfolders: {error}") from error
 
+    jobs = []
+    manifest_path = manifest_path_for(output_json_path)
+    manifest = load_manifest(manifest_path)
+    packs = manifest.setdefault('packs', {})
     folders_list = list_subfolders(leveldb_path.replace('\\', '/'))
     for sub_folders in folders_list:
         output_path = rf'{output_json_path}\{sub_folders}.json'
@@ -73,85 +294,375 @@ def read_leveldb_to_json(leveldb_path, output_json_path):
         output_dir = output_json_path.replace('\\', '/')
         os.makedirs(output_dir, exist_ok=True)
 
-        try:
-            # Otwórz bazę danych LevelDB
-            db = plyvel.DB(output_folder, create_if_missing=False)
+        previous = packs.get(sub_folders) if incremental else None
+        jobs.append((sub_folders, output_folder, output_file, previous))
 
-            # Stwórz pustą listę na dane
-            data = []
+    # Każdy pakiet to osobna baza LevelDB, więc można je zrzucać równolegle
+    if workers == 1 or len(jobs) < 2:
+        for sub_folders, output_folder, output_file, previous in jobs:
+            packs[sub_folders] = export_leveldb_pack(output_folder, output_file, streaming, previous, snapshot)
+    else:
+        with ProcessPoolExecutor(max_workers=workers) as executor:
+            futures = {sub_folders: executor.submit(export_leveldb_pack, output_folder, output_file, streaming, previous,
+                                                    snapshot)
+                       for sub_folders, output_folder, output_file, previous in jobs}
+            for sub_folders, future in futures.items():
+                packs[sub_folders] = future.result()
 
-            # Iteruj przez wszystkie klucze i wartości w bazie danych
-            for key, value in db:
-                try:
-                    value_str = value.decode('utf-8', errors='ignore')
-                    # Jeśli wartość to poprawny JSON, konwertujemy ją do obiektu
-                    try:
-                        value_data = json.loads(value_str)
-                    except json.JSONDecodeError:
-                        value_data = {"name": value_str}  # Jeśli to nie JSON, utwórz obiekt z kluczem "name"
-
-                    # Dodaj tylko wartość do listy
-                    data.append(value_data)
-                except Exception as e:
-                    print(f"Błąd dekodowania dla klucza {key}: {e}")
-                    continue
+    save_manifest(manifest_path, manifest)
 
-            # Zapisz dane do pliku JSON jako listę
-            with open(output_file, 'w', encoding='utf-8') as json_file:
-                json.dump(data, json_file, ensure_ascii=False, indent=4)
 
-            print(f"Dane zostały zapisane do {output_file}")
-        except Exception as e:
-            raise f"Wystąpił błąd read_leveldb_to_json: {e}"
-        finally:
-            db.close()
+def manifest_path_for(output_dir):
+    """
+    Zwraca ścieżkę manifestu leżącego obok katalogu wynikowego, np. 'output' -> 'output.manifest.json'.
+    Manifest nie może leżeć w środku katalogu, bo process_files przetwarza tam wszystkie pliki .json.
+    """
+    return output_dir.replace('\\', '/').rstrip('/') + '.manifest.json'
+
+
+def load_manifest(manifest_path):
+    try:
+        with open(manifest_path, 'r', encoding='utf-8') as manifest_file:
+            return json.load(manifest_file)
+    except (FileNotFoundError, json.JSONDecodeError):
+        return {}
+
 
+def save_manifest(manifest_path, manifest):
+    with atomic_write(manifest_path) as manifest_file:
+        json.dump(manifest, manifest_file, indent=1, sort_keys=True)
 
-def sort_entries(input_dict):
-    if "entries" in input_dict:
-        input_dict["entries"] = dict(sorted(input_dict["entries"].items()))
 
-    for key, value in input_dict.items():
-        if isinstance(value, dict):
-            input_dict[key] = sort_entries(value)
+def hash_value(value):
+    return hashlib.blake2b(value, digest_size=16).hexdigest()
 
-    return input_dict
 
+def file_sha256(path):
+    with open(path, 'rb') as hashed_file:
+        return hashlib.file_digest(hashed_file, 'sha256').hexdigest()
 
-def remove_empty_keys(data_dict):
+
+def hash_files(*paths):
+    """
+    Liczy wspólny skrót zawartości plików, pomijając te, które nie istnieją.
     """
-    Usuwa puste klucze w słowniku i usuwa 'name', jeśli 'pages' jest pusty.
-    Proces powtarza się aż do wyeliminowania wszystkich pustych kluczy.
+    digest = hashlib.blake2b(digest_size=16)
+    for path in paths:
+        try:
+            with open(path, 'rb') as hashed_file:
+                digest.update(hashlib.file_digest(hashed_file, 'blake2b').digest())
+        except FileNotFoundError:
+            digest.update(b'-')
+    return digest.hexdigest()
+
 
-    :param data_dict: Słownik wejściowy
-    :return: Oczyszczony słownik
+def leveldb_signature(folder):
+    """
+    Skrót nazw, rozmiarów i czasów modyfikacji plików danych (.ldb, .log) baz LevelDB w katalogu i jego
+    podkatalogach. Jest tańszy od skrótu zawartości, a zmienia się przy każdym zapisie do bazy.
+    """
+    digest = hashlib.blake2b(digest_size=16)
+    for directory, subdirectories, names in os.walk(folder):
+        subdirectories.sort()
+        for name in sorted(names):
+            if name.endswith(('.ldb', '.log')):
+                path = os.path.join(directory, name)
+                stat = os.stat(path)
+                digest.update(f'{os.path.relpath(path, folder)}:{stat.st_size}:{stat.st_mtime_ns}\0'.encode())
+    return digest.hexdigest()
+
+
+def outputs_digest(paths):
+    """
+    Skrót wyników etapu: zawartość plików i obecność katalogów (brakująca ścieżka też zmienia skrót).
+    """
+    digest = hashlib.blake2b(digest_size=16)
+    for path in sorted(paths):
+        digest.update(path.encode('utf-8') + b'\0')
+        if os.path.isdir(path):
+            digest.update(b'd')
+        elif os.path.isfile(path):
+            with open(path, 'rb') as hashed_file:
+                digest.update(hashlib.file_digest(hashed_file, 'blake2b').digest())
+        else:
+            digest.update(b'-')
+    return digest.hexdigest()
+
+
+class StageManifest:
+    """
+    Manifest etapów (STAGES) jednej przygody w .cache/pipeline/<przygoda>.json: dla każdego zakończonego etapu
+    skrót jego wejść oraz lista i skrót wyników. Etap jest pomijany, jeśli wejścia się nie zmieniły, a wyniki są na
+    dysku niezmienione, więc ponowne uruchomienie zaczyna od pierwszego niezakończonego albo unieważnionego etapu.
+    Wejściem etapu jest stan poprzedniego (wejścia i wyniki), więc zmiana wcześniej unieważnia etapy za nią.
     """
+    def __init__(self, name, directory=PIPELINE_DIR, restart=False, keep=()):
+        """
+        :param name: Nazwa przygody.
+        :param directory: Katalog manifestów.
+        :param restart: Pomija zapisany stan i wykonuje wszystkie etapy od nowa.
+        :param keep: Etapy, których zapisany stan zostaje także przy restart (wykonane od nowa wcześniej w tym
+                     samym uruchomieniu).
+        """
+        os.makedirs(directory, exist_ok=True)
+        self.path = os.path.join(directory, f'{name}.json')
+        stages = load_manifest(self.path) if keep or not restart else {}
+        self.stages = {stage: stages[stage] for stage in keep if stage in stages} if restart else stages
 
-    def clean_dict_once(d):
+    def state(self, stage):
         """
-        Jednokrotne przejście przez słownik w celu usunięcia pustych kluczy.
+        :return: Skrót wejść i wyników zakończonego etapu (wejście następnego) albo None.
         """
-        cleaned = {}
-        for key, value in d.items():
-            if isinstance(value, dict):  # Jeśli wartość to słownik, oczyść go rekurencyjnie
-                value = clean_dict_once(value)
-            if key == "pages" and not value:  # Jeśli "pages" jest pusty
-                continue  # Usuń klucz "pages"
-            if key == "name" and "pages" in d and not d["pages"]:
-                continue  # Usuń klucz "name", jeśli "pages" jest pusty
-            if value not in (None, {}, [], ""):  # Usuń inne puste wartości
-                cleaned[key] = value
-        return cleaned
+        record = self.stages.get(stage)
+        return hash_value(f'{record["inputs"]}:{record["digest"]}'.encode()) if record else None
+
+    def is_done(self, stage, inputs):
+        record = self.stages.get(stage)
+        return bool(record) and record["inputs"] == inputs and outputs_digest(record["outputs"]) == record["digest"]
+
+    def complete(self, stage, inputs, outputs=()):
+        self.stages[stage] = {"inputs": inputs, "outputs": sorted(outputs), "digest": outputs_digest(outputs)}
+        save_manifest(self.path, self.stages)
+        return self.state(stage)
 
-    previous = None
-    current = data_dict
+    def run(self, stage, inputs, function, outputs):
+        """
+        Wykonuje etap, jeśli nie jest zakończony dla tych wejść.
 
-    # Iteruj, aż słownik przestanie się zmieniać
-    while previous != current:
-        previous = current
-        current = clean_dict_once(previous)
+        :param stage: Nazwa etapu z STAGES.
+        :param inputs: Skrót wejść etapu.
+        :param function: Funkcja bez argumentów wykonująca etap.
+        :param outputs: Funkcja bez argumentów zwracająca ścieżki wyników, wywoływana po wykonaniu etapu.
+        :return: Stan etapu (wejście następnego).
+        """
+        if self.is_done(stage, inputs):
+            progress(f'Etap {stage} zakończony wcześniej, pomijam')
+            return self.state(stage)
+        with span('stage', stage=stage):
+            function()
+        return self.complete(stage, inputs, outputs())
 
-    return current
+
+def decode_leveldb_value(value):
+    value_str = value.decode('utf-8', errors='ignore')
+    # Jeśli wartość to poprawny JSON, konwertujemy ją do obiektu
+    try:
+        return json.loads(value_str)
+    except json.JSONDecodeError:
+        return {"name": value_str}  # Jeśli to nie JSON, utwórz obiekt z kluczem "name"
+
+
+class SerializedDocument(str):
+    """
+    Dokument poprzedniego zrzutu jako tekst JSON w układzie write_json_array (z wcięciem elementu tablicy),
+    zapisywany bez ponownego dekodowania i kodowania.
+    """
+
+
+def iter_previous_documents(path, keys):
+    """
+    Dokumenty poprzedniego zrzutu pakietu jako tekst, czytane strumieniowo razem z kluczami manifestu, które są
+    w tej samej kolejności.
+
+    :param path: Plik poprzedniego zrzutu.
+    :param keys: Klucze i skróty z manifestu poprzedniego zrzutu (klucz LevelDB -> skrót).
+    :return: Generator krotek ((klucz, skrót), SerializedDocument).
+    :raise ValueError: Jeśli liczba dokumentów w pliku nie zgadza się z manifestem.
+    """
+    missing = object()
+    for entry, text in itertools.zip_longest(keys.items(), iter_json_array(path, raw=True), fillvalue=missing):
+        if entry is missing or text is missing:
+            raise ValueError(f'Plik {path} nie pasuje do manifestu zrzutu')
+        yield entry, SerializedDocument(text)
+
+
+def iter_leveldb_documents(db, hashes=None, reuse=None):
+    """
+    Dekoduje kolejne wartości bazy LevelDB w takiej kolejności, w jakiej zwraca je iterator plyvel.
+
+    :param db: Otwarta baza plyvel.DB.
+    :param hashes: Słownik, do którego trafiają skróty wartości (klucz LevelDB -> skrót).
+    :param reuse: Dokumenty poprzedniego zrzutu z iter_previous_documents; niezmienione wartości nie są ponownie
+                  dekodowane, tylko przepisywane jako tekst (write_json_array).
+    :return: Generator dokumentów (słowników albo SerializedDocument).
+    :raise ValueError: Jeśli poprzedni zrzut nie pasuje do swojego manifestu.
+    """
+    previous = next(reuse, None) if reuse is not None else None
+    for key, value in db:
+        manifest_key = key.decode('latin-1')
+        # Klucze LevelDB i poprzedniego zrzutu są posortowane tak samo (latin-1 zachowuje kolejność bajtów),
+        # więc po poprzednim zrzucie przesuwamy się razem z bazą
+        while previous is not None and previous[0][0] < manifest_key:
+            previous = next(reuse, None)
+        try:
+            digest = hash_value(value)
+            if previous is not None and previous[0] == (manifest_key, digest):
+                value_data = previous[1]
+            else:
+                value_data = decode_leveldb_value(value)
+
+            if hashes is not None:
+                hashes[manifest_key] = digest
+            yield value_data
+        except Exception as e:
+            print(f"Błąd dekodowania dla klucza {key}: {e}")
+            continue
+    if reuse is not None:
+        # Doczytanie reszty sprawdza, że poprzedni zrzut miał tyle dokumentów, ile kluczy w manifeście
+        for _ in reuse:
+            pass
+
+
+def write_json_array(items, json_file):
+    """
+    Zapisuje elementy jako tablicę JSON, element po elemencie, bez budowania całej listy w pamięci.
+    Wynik jest bajt w bajt taki sam jak json.dump(list(items), json_file, ensure_ascii=False, indent=4).
+
+    :param items: Iterowalny zbiór elementów; SerializedDocument jest zapisywany bez zmian.
+    :param json_file: Plik otwarty do zapisu w trybie tekstowym.
+    """
+    first = True
+    for item in items:
+        json_file.write('[\n    ' if first else ',\n    ')
+        if isinstance(item, SerializedDocument):
+            json_file.write(item)
+        else:
+            # Łańcuchy JSON nie zawierają surowych '\n', więc wcięcie można dodać zwykłą zamianą
+            json_file.write(json.dumps(item, ensure_ascii=False, indent=4).replace('\n', '\n    '))
+        first = False
+    json_file.write('[]' if first else '\n]')
+
+
+def iter_json_array(path, chunk_size=1024 * 1024, raw=False):
+    """
+    Czyta tablicę JSON z pliku element po elemencie, bez wczytywania całego pliku. W pamięci jest naraz
+    tylko bieżący element i bufor o rozmiarze kawałka (albo największego elementu, jeśli jest większy).
+
+    :param path: Ścieżka pliku z tablicą JSON (np. zrzut pakietu z write_json_array).
+    :param chunk_size: Liczba znaków czytanych naraz.
+    :param raw: Zwraca tekst JSON elementów w takiej postaci, w jakiej są w pliku, zamiast obiektów.
+    :return: Generator elementów tablicy.
+    """
+    decoder = json.JSONDecoder()
+    with open(path, 'r', encoding='utf-8') as json_file:
+        buffer = ''
+        position = 0
+        eof = False
+        started = False
+        while True:
+            position = JSON_WHITESPACE.match(buffer, position).end()
+            if position >= len(buffer) - 1 and not eof:
+                # Bufor rośnie co najmniej dwukrotnie, żeby duży element nie był dekodowany od nowa zbyt wiele razy
+                chunk = json_file.read(max(chunk_size, len(buffer)))
+                eof = not chunk
+                buffer = buffer[position:] + chunk
+                position = 0
+                continue
+
+            char = buffer[position:position + 1]
+            if not started:
+                if char != '[':
+                    raise ValueError(f'Plik {path} nie zawiera tablicy JSON')
+                started = True
+                position += 1
+            elif char == ']':
+                return
+            elif char == ',':
+                position += 1
+            elif not char:
+                raise ValueError(f'Niepełna tablica JSON w pliku {path}')
+            else:
+                try:
+                    item, end = decoder.raw_decode(buffer, position)
+                    following_position = JSON_WHITESPACE.match(buffer, end).end()
+                    following = buffer[following_position:following_position + 1]
+                except json.JSONDecodeError:
+                    if eof:
+                        raise
+                    following = ''
+                if following not in (',', ']'):
+                    # Element może być ucięty na końcu bufora (np. liczba 3.5 z 3.5e2), więc bez przecinka
+                    # albo nawiasu za nim dokładamy kolejny kawałek
+                    if eof:
+                        raise ValueError(f'Niepełna tablica JSON w pliku {path}')
+                    chunk = json_file.read(max(chunk_size, len(buffer)))
+                    eof = not chunk
+                    buffer = buffer[position:] + chunk
+                    position = 0
+                    continue
+                yield buffer[position:end] if raw else item
+                position = end
+
+
+def export_leveldb_pack(leveldb_folder, output_file, streaming=True, previous=None, snapshot=None):
+    """
+    Zrzuca jeden pakiet LevelDB do pliku JSON z listą dokumentów.
+
+    :param leveldb_folder: Katalog bazy LevelDB pakietu.
+    :param output_file: Ścieżka pliku wynikowego.
+    :param streaming: Zapisuje dokumenty na bieżąco zamiast zbierać je najpierw w liście.
+    :param previous: Wpis manifestu z poprzedniego zrzutu; jeśli podany, niezmieniony pakiet jest pomijany, a przy
+                     streaming dekodowane są tylko zmienione dokumenty (pozostałe są przepisywane z poprzedniego
+                     pliku).
+    :param snapshot: Plik migawki SQLite (pack_cache.PackCache), odświeżanej przy tym samym otwarciu bazy.
+    :return: Wpis manifestu pakietu ({"hash": ..., "keys": {klucz: skrót}}).
+    """
+    with span('leveldb', pack=os.path.basename(leveldb_folder)) as pack_span:
+        pack_span.add(bytes_in=directory_size(leveldb_folder))
+        # Otwórz bazę danych LevelDB
+        try:
+            db = plyvel.DB(leveldb_folder, create_if_missing=False)
+        except Exception as e:
+            raise RuntimeError(f"Wystąpił błąd read_leveldb_to_json ({leveldb_folder}): {e}") from e
+        try:
+            if snapshot:
+                with span('snapshot', pack=os.path.basename(leveldb_folder)) as snapshot_span, \
+                        PackCache(snapshot) as cache:
+                    snapshot_span.add(documents=cache.refresh(*pack_identity(leveldb_folder), db,
+                                                              decode_leveldb_value))
+
+            reuse = previous and os.path.exists(output_file)
+            if reuse:
+                # Porównanie samych skrótów wartości, bez dekodowania i bez trzymania ich w pamięci
+                current = ((key.decode('latin-1'), hash_value(value)) for key, value in db)
+                if all(entry == known for entry, known in itertools.zip_longest(current, previous['keys'].items())):
+                    progress(f"Pakiet bez zmian, pomijam {output_file}")
+                    pack_span.args['skipped'] = True
+                    return previous
+
+            def dump(reuse):
+                hashes = {}
+                with atomic_write(output_file) as json_file:
+                    if streaming:
+                        # Poprzedni zrzut jest czytany strumieniowo, a jego niezmienione dokumenty przepisywane
+                        # jako tekst
+                        write_json_array(iter_leveldb_documents(
+                            db, hashes, iter_previous_documents(output_file, previous['keys']) if reuse else None),
+                            json_file)
+                    else:
+                        json.dump(list(iter_leveldb_documents(db, hashes)), json_file, ensure_ascii=False, indent=4)
+                return hashes
+
+            try:
+                hashes = dump(reuse)
+            except ValueError as error:
+                progress(f"Nie można użyć poprzedniego zrzutu ({error}), dekoduję cały pakiet {output_file}")
+                hashes = dump(False)
+            if reuse:
+                changed = sum(1 for key, digest in hashes.items() if previous['keys'].get(key) != digest)
+                progress(f"Zmienione dokumenty w {output_file}: {changed}")
+
+            pack_span.add(documents=len(hashes), bytes_out=os.path.getsize(output_file))
+            progress(f"Dane zostały zapisane do {output_file}")
+            return {"hash": hash_value(json.dumps(hashes).encode()), "keys": hashes}
+        except Exception as e:
+            raise RuntimeError(f"Wystąpił błąd read_leveldb_to_json ({leveldb_folder}): {e}") from e
+        finally:
+            db.close()
+
+
+def directory_size(path):
+    return sum(entry.stat().st_size for entry in os.scandir(path) if entry.is_file())
 
 
 def remove_newlines_from_dict(data):
@@ -171,438 +682,1167 @@ def remove_newlines_from_dict(data):
         return data
 
 
-def process_files(folders, version):
+def postprocess_transifex_dict(data):
+    """
+    Porządkuje słownik tłumaczeń w jednym przejściu po drzewie. Wynik jest taki sam jak kolejne wywołanie
+    dawnych funkcji remove_empty_keys, sort_entries, remove_newlines_from_dict i remove_all_braces_from_uuid
+    (benchmarks/postprocess.py), ale każdy węzeł jest odwiedzany raz i nie trzeba powtarzać czyszczenia aż do
+    braku zmian. Wpisy modelu (model.Record) są zapisywane jako słowniki z polami w kolejności ich __slots__.
+
+    :param data: Słownik wejściowy (nie jest modyfikowany).
+    :return: Nowy, oczyszczony słownik.
+    """
+    cleaned = {}
+    if isinstance(data, dict):
+        items = data.items()
+        pages_empty = "pages" in data and not data["pages"]
+    else:
+        # Jak model.tree_items, ale bez dodatkowego wywołania dla każdego węzła
+        items = zip(data.__slots__, data.values_getter(data))
+        pages = getattr(data, "pages", None)
+        pages_empty = pages is not None and not pages
+    for key, value in items:
+        if value is None:
+            continue  # Także nieustawione pola wpisów modelu
+        if key == "name" and pages_empty:
+            continue  # Usuń klucz "name", jeśli "pages" jest pusty
+
+        if isinstance(value, str):
+            if not value:
+                continue
+            value = value.replace("\n", "").replace("\t", " ")
+            if "@UUID" in value:
+                value = UUID_LABEL_PATTERN.sub(r"\1", value)
+        elif isinstance(value, (dict, Record)):
+            value = postprocess_transifex_dict(value)
+            if not value:
+                continue
+        elif isinstance(value, list):
+            if not value:
+                continue
+            # Listy nie są czyszczone ani sortowane, tylko usuwane są z nich znaki nowej linii
+            value = remove_newlines_from_dict(value)
+        elif key == "pages" and not value:
+            continue
+
+        cleaned[key] = value
+
+    if "entries" in cleaned:
+        cleaned["entries"] = dict(sorted(cleaned["entries"].items()))
+    return cleaned
+
+
+def encode_transifex_key(key):
+    # Klucze inne niż tekst json zamienia na tekst tak jak wartości ('1', 'true')
+    return json.encoder.encode_basestring(key if isinstance(key, str) else json.dumps(key))
+
+
+def encode_transifex_value(key, value, level):
+    """
+    Tekst JSON wartości innej niż słownik i wpis modelu, oczyszczonej tak jak w postprocess_transifex_dict
+    i sformatowanej jak w json.dump(..., ensure_ascii=False, indent=4) dla składowej na poziomie level.
+
+    :return: Tekst albo None, jeśli wartość jest pusta i nie trafia do pliku.
+    """
+    if isinstance(value, str):
+        if not value:
+            return None
+        value = value.replace("\n", "").replace("\t", " ")
+        if "@UUID" in value:
+            value = UUID_LABEL_PATTERN.sub(r"\1", value)
+        return json.encoder.encode_basestring(value)
+    if isinstance(value, list) and not value or key == "pages" and not value:
+        return None
+    # Listy nie są czyszczone ani sortowane, tylko usuwane są z nich znaki nowej linii
+    return json.dumps(remove_newlines_from_dict(value), ensure_ascii=False, indent=4).replace(
+        '\n', '\n' + JSON_INDENT * level)
+
+
+def iter_transifex_json(data, level=0, sort=False):
+    """
+    Fragmenty tekstu JSON słownika albo wpisu modelu, oczyszczonego tak jak w postprocess_transifex_dict
+    i sformatowanego jak w json.dump(..., ensure_ascii=False, indent=4). Pusty po oczyszczeniu nie daje żadnego
+    fragmentu, więc składowa z nim jest pomijana, zanim zostanie zapisany jej klucz.
+
+    :param level: Poziom zagnieżdżenia słownika.
+    :param sort: Składowe w kolejności kluczy, jak sekcja 'entries' po postprocess_transifex_dict.
+    """
+    if isinstance(data, dict):
+        items = sorted(data.items(), key=operator.itemgetter(0)) if sort else data.items()
+        pages_empty = "pages" in data and not data["pages"]
+    else:
+        items = zip(data.__slots__, data.values_getter(data))
+        pages = getattr(data, "pages", None)
+        pages_empty = pages is not None and not pages
+    indent = JSON_INDENT * (level + 1)
+    separator = '{\n' + indent
+    for key, value in items:
+        if value is None or key == "name" and pages_empty:
+            continue
+        if isinstance(value, (dict, Record)):
+            chunks = iter_transifex_json(value, level + 1, key == "entries")
+            first = next(chunks, None)
+            if first is None:
+                continue
+            yield f'{separator}{encode_transifex_key(key)}: {first}'
+            yield from chunks
+        else:
+            text = encode_transifex_value(key, value, level + 1)
+            if text is None:
+                continue
+            yield f'{separator}{encode_transifex_key(key)}: {text}'
+        separator = ',\n' + indent
+    if separator[0] == ',':
+        yield f'\n{JSON_INDENT * level}}}'
+
+
+def write_transifex_dict(data, outfile):
+    """
+    Zapisuje słownik tłumaczeń tak jak json.dump(postprocess_transifex_dict(data), outfile, ensure_ascii=False,
+    indent=4), ale bez budowania oczyszczonej kopii drzewa: wpisy (model.Record albo słowniki) są czyszczone
+    i kodowane wprost do pliku, fragment po fragmencie.
+    """
+    chunks = iter_transifex_json(data)
+    first = next(chunks, None)
+    if first is None:
+        outfile.write('{}')
+        return
+    outfile.write(first)
+    outfile.writelines(chunks)
+
+
+REQUIRED = object()
+
+
+def collapse_whitespace(text):
+    return " ".join(text.split())
+
+
+def format_range(value_range):
+    return f'{value_range[0]}-{value_range[1]}'
+
+
+def is_not_empty(value):
+    return value != ""
+
+
+def is_none(value):
+    return value is None
+
+
+def is_unidentified(value):
+    return value == "unidentified"
+
+
+def is_own_item_source(value):
+    return value is None or value.startswith('Item')
+
+
+ACTOR_ITEM_FIELDS = [
+    {"target": "name", "path": "name"},
+    {"target": "description", "path": "system.description.value"},
+]
+
+
+# Schemat pól wyciąganych z dokumentów przygody (pakiet z 'caption').
+#
+# Kolekcja opisuje listę osadzonych dokumentów: 'source' to klucz listy w dokumencie, 'target' to klucz
+# w pliku tłumaczenia, 'key' buduje klucz elementu, a 'value' (dla prostych słowników) albo 'fields'
+# i 'collections' opisują jego zawartość. Pole to 'target' i ścieżka 'path' z kropkami; 'default' czyni
+# ścieżkę opcjonalną, 'skip_empty' pomija brakujące i puste wartości, 'transform' przetwarza wartość.
+# 'model' to klasa z model.py tworzona dla elementu zamiast słownika.
+# Reguły ('rules') są sprawdzane po kolei: gdy wszystkie warunki 'when' są spełnione, dopisują pola
+# (z 'reset' zaczynając wpis od nowa) i uzupełniają 'mapping' (w sekcji 'mapping_section').
+# Nowy typ dokumentu to nowa kolekcja w schemacie; compile_extraction_schema kompiluje go raz do funkcji.
+ADVENTURE_SCHEMA = {
+    "mapping": {
+        "actors": {
+            "publicNotes": "system.details.publicNotes",
+            "privateNotes": "system.details.privateNotes",
+            "blurb": "system.details.blurb",
+            "languagesDetails": "system.details.languages.details"
+        }
+    },
+    "fields": [
+        {"target": "caption", "path": "caption"},
+        {"target": "description", "path": "description"},
+    ],
+    "collections": [
+        # Foldery
+        {"source": "folders", "target": "folders", "key": {"path": "name"}, "value": {"path": "name"}},
+        # Dzienniki
+        {"source": "journal", "target": "journals", "key": {"path": "name"}, "model": Journal,
+         "fields": [{"target": "name", "path": "name"}],
+         "collections": [
+             {"source": "pages", "target": "pages", "key": {"path": "name", "transform": str.strip}, "model": Page,
+              "fields": [
+                  {"target": "name", "path": "name", "transform": str.strip},
+                  {"target": "text", "path": "text.content", "default": "", "transform": collapse_whitespace},
+              ]},
+         ]},
+        # Sceny
+        {"source": "scenes", "target": "scenes", "key": {"path": "name"}, "model": Scene,
+         "fields": [{"target": "name", "path": "name"}],
+         "collections": [
+             {"source": "notes", "target": "notes", "key": {"path": "text"}, "value": {"path": "text"}},
+         ]},
+        # Makra
+        {"source": "macros", "target": "macros", "key": {"path": "name"}, "model": Macro,
+         "fields": [{"target": "name", "path": "name"}]},
+        # Tabele
+        {"source": "tables", "target": "tables", "key": {"path": "name"}, "model": Table,
+         "fields": [
+             {"target": "name", "path": "name"},
+             {"target": "description", "path": "description"},
+         ],
+         "collections": [
+             {"source": "results", "target": "results", "key": {"path": "range", "transform": format_range},
+              "value": {"path": "text"}},
+         ]},
+        # Przedmioty
+        {"source": "items", "target": "items", "key": {"path": "name"}, "model": Item,
+         "fields": [{"target": "name", "path": "name"}],
+         "rules": [
+             {"when": [("_stats.compendiumSource", is_own_item_source)],
+              "fields": [
+                  {"target": "description", "path": "system.description.value"},
+                  {"target": "gmNote", "path": "system.description.gm"},
+              ],
+              "mapping": {"gmNote": "system.description.gm"}},
+             # Dla niezidentyfikowanych
+             {"when": [("_stats.compendiumSource", is_own_item_source),
+                       ("system.identification.unidentified.name", is_not_empty)],
+              "fields": [
+                  {"target": "unidentified", "path": "system.identification.unidentified.name"},
+                  {"target": "unidentified_desc",
+                   "path": "system.identification.unidentified.data.description.value"},
+              ],
+              "mapping": {
+                  "unidentified": "system.identification.unidentified.name",
+                  "unidentified_desc": "system.identification.unidentified.data.description.value",
+              }},
+         ]},
+        # Playlisty
+        {"source": "playlists", "target": "playlists", "key": {"path": "name"}, "model": Playlist,
+         "fields": [
+             {"target": "name", "path": "name"},
+             {"target": "description", "path": "description", "default": None},
+         ],
+         "collections": [
+             {"source": "sounds", "target": "sounds", "key": {"path": "name"}, "model": Sound,
+              "fields": [
+                  {"target": "name", "path": "name"},
+                  {"target": "description", "path": "description", "default": None},
+              ]},
+         ]},
+        # Aktorzy
+        {"source": "actors", "target": "actors", "key": {"path": "name"}, "model": Actor,
+         "fields": [
+             {"target": "name", "path": "name"},
+             {"target": "tokenName", "path": "prototypeToken.name"},
+             # Tylko PF2E
+             {"target": "publicNotes", "path": "system.details.publicNotes", "skip_empty": True},
+             {"target": "blurb", "path": "system.details.blurb", "skip_empty": True},
+             {"target": "privateNotes", "path": "system.details.privateNotes", "skip_empty": True},
+             {"target": "description", "path": "system.details.description", "skip_empty": True},
+             {"target": "languagesDetails", "path": "system.details.languages.details", "skip_empty": True},
+         ],
+         "collections": [
+             # Przedmioty aktora trafiają do pliku tylko wtedy, gdy pasuje któraś z reguł
+             {"source": "items", "target": "items", "key": {"path": "name"}, "model": Item, "create": False,
+              "rules": [
+                  # Dla opisów GM
+                  {"when": [("system.description.gm", is_not_empty)], "reset": True,
+                   "fields": ACTOR_ITEM_FIELDS + [{"target": "gmNote", "path": "system.description.gm"}],
+                   "mapping_section": "actors", "mapping": {"gmNote": "system.description.gm"}},
+                  # Dla niezidentyfikowanych w aktorach
+                  {"when": [("system.identification.status", is_unidentified)], "reset": True,
+                   "fields": ACTOR_ITEM_FIELDS + [
+                       {"target": "unidentified", "path": "system.identification.unidentified.name"},
+                       {"target": "unidentified_desc",
+                        "path": "system.identification.unidentified.data.description.value"},
+                   ],
+                   "mapping_section": "actors", "mapping": {
+                       "unidentified": "system.identification.unidentified.name",
+                       "unidentified_desc": "system.identification.unidentified.data.description.value",
+                   }},
+                  # Przedmioty własne przygody (spoza kompendiów)
+                  {"when": [("_stats.compendiumSource", is_none)], "reset": True, "fields": ACTOR_ITEM_FIELDS},
+                  {"when": [("_stats.compendiumSource", is_none), ("system.description.gm", is_not_empty)],
+                   "fields": [{"target": "gmNote", "path": "system.description.gm"}],
+                   "mapping_section": "actors", "mapping": {"gmNote": "system.description.gm"}},
+              ]},
+         ]},
+    ],
+}
+
+
+def path_getter(keys):
+    """
+    Funkcja pobierająca document[k1][k2]...; najczęstsze długości ścieżek mają osobne domknięcia, żeby odczyt
+    był jednym wyrażeniem, bez pętli po kluczach.
+    """
+    if len(keys) == 1:
+        return operator.itemgetter(keys[0])
+    if len(keys) == 2:
+        first, second = keys
+        return lambda document: document[first][second]
+    if len(keys) == 3:
+        first, second, third = keys
+        return lambda document: document[first][second][third]
+
+    def getter(document):
+        for key in keys:
+            document = document[key]
+        return document
+    return getter
+
+
+def compile_path(path, default=REQUIRED):
+    """
+    Kompiluje ścieżkę 'a.b.c' do funkcji pobierającej wartość z dokumentu (document['a']['b']['c']). Bez wartości
+    domyślnej brak klucza kończy się KeyError, z wartością domyślną funkcja zwraca ją zamiast błędu.
+    """
+    getter = path_getter(path.split('.'))
+    if default is REQUIRED:
+        return getter
+
+    def getter_or_default(document):
+        try:
+            return getter(document)
+        except (KeyError, TypeError, IndexError):
+            return default
+    return getter_or_default
+
+
+def compile_value(spec):
+    getter = compile_path(spec["path"], spec.get("default", None if spec.get("skip_empty") else REQUIRED))
+    transform = spec.get("transform")
+    if transform is None:
+        return getter
+    return lambda document: transform(getter(document))
+
+
+def compile_fields(specs):
+    return [(spec["target"], compile_value(spec), spec.get("skip_empty", False)) for spec in specs]
+
+
+def fill_fields(entry, fields, document):
+    # Pola wpisu modelu są ustawiane bezpośrednio, bez przechodzenia przez Record.__setitem__
+    store = operator.setitem if type(entry) is dict else setattr
+    for target, getter, skip_empty in fields:
+        value = getter(document)
+        if skip_empty and (value is None or value == ""):
+            continue
+        store(entry, target, value)
+
+
+def compile_rules(specs):
+    """
+    Zwraca krotkę (funkcje pobierające ścieżki warunków, reguły). Każda ścieżka występuje raz, więc dla
+    elementu jest odczytywana tylko raz, niezależnie od liczby reguł, które z niej korzystają.
+    """
+    paths = []
+    rules = []
+    for spec in specs:
+        conditions = []
+        for path, predicate in spec["when"]:
+            if path not in paths:
+                paths.append(path)
+            conditions.append((paths.index(path), predicate))
+        rules.append((conditions, spec.get("reset", False), compile_fields(spec["fields"]),
+                      spec.get("mapping_section"), spec.get("mapping")))
+    return [compile_path(path, None) for path in paths], rules
+
+
+def apply_rules(elements, key, rules, document, mapping, new_entry=dict):
+    condition_getters, rules = rules
+    values = [getter(document) for getter in condition_getters]
+    for conditions, reset, fields, mapping_section, mapping_update in rules:
+        for index, predicate in conditions:
+            if not predicate(values[index]):
+                break
+        else:
+            apply_rule(elements, key, reset, fields, document, mapping, mapping_section, mapping_update, new_entry)
+
+
+def apply_rule(elements, key, reset, fields, document, mapping, mapping_section, mapping_update, new_entry=dict):
+    if reset or key not in elements:
+        elements[key] = new_entry()
+    try:
+        fill_fields(elements[key], fields, document)
+    except KeyError:
+        return
+    if mapping_update:
+        (mapping[mapping_section] if mapping_section else mapping).update(mapping_update)
+
+
+def compile_collection(spec, models=True):
+    source, target = spec["source"], spec["target"]
+    key_of = compile_value(spec["key"])
+    value_of = compile_value(spec["value"]) if "value" in spec else None
+    create = spec.get("create", True)
+    fields = compile_fields(spec.get("fields", []))
+    rules = compile_rules(spec.get("rules", []))
+    has_rules = bool(spec.get("rules"))
+    new_entry = spec.get("model", dict) if models else dict
+    collections = [compile_collection(child, models) for child in spec.get("collections", [])]
+
+    def extract(document, parent, mapping):
+        elements = parent[target] = {}
+        for element in document[source]:
+            key = key_of(element)
+            if value_of is not None:
+                elements[key] = value_of(element)
+                continue
+            if create:
+                entry = elements[key] = new_entry()
+                fill_fields(entry, fields, element)
+                for _, collection in collections:
+                    collection(element, entry, mapping)
+            if has_rules:
+                apply_rules(elements, key, rules, element, mapping, new_entry)
+
+    return source, extract
+
+
+def compile_extraction_schema(schema, models=True):
+    """
+    Kompiluje schemat (np. ADVENTURE_SCHEMA) do funkcji extract(document, keys, entry, mapping), która w jednym
+    przejściu wypełnia wpis pliku tłumaczenia. Kolekcje są brane pod uwagę, jeśli ich klucz jest w 'keys'.
+
+    :param models: False tworzy słowniki zamiast obiektów klas 'model' (np. do porównania w benchmarks).
+    """
+    fields = compile_fields(schema.get("fields", []))
+    collections = [compile_collection(spec, models) for spec in schema.get("collections", [])]
+    mapping_template = schema.get("mapping", {})
+
+    def extract(document, keys, entry, mapping):
+        mapping.update({section: dict(values) for section, values in mapping_template.items()})
+        fill_fields(entry, fields, document)
+        for source, collection in collections:
+            if source in keys:
+                collection(document, entry, mapping)
+
+    return extract
+
+
+extract_adventure_document = compile_extraction_schema(ADVENTURE_SCHEMA)
+
+
+def build_id_index(documents):
+    """
+    Buduje indeks _id -> dokument dla pakietu, żeby wyszukiwanie stron i dokumentów osadzonych było O(1).
+
+    :param documents: Lista dokumentów pakietu.
+    :return: Słownik _id -> dokument.
+    """
+    return {document['_id']: document for document in documents
+            if isinstance(document, dict) and '_id' in document}
+
+
+class DocumentIndex:
+    """
+    Indeks _id -> dokument jak z build_id_index, ale trzymany w tymczasowej bazie SQLite na dysku,
+    dla trybu strumieniowego process_files.
+    """
+    def __init__(self, documents):
+        # Pusta ścieżka to prywatna, tymczasowa baza na dysku usuwana przy zamknięciu
+        self.connection = sqlite3.connect('')
+        self.connection.execute('CREATE TABLE documents (id TEXT PRIMARY KEY, document TEXT NOT NULL)')
+        with self.connection:
+            self.connection.executemany('INSERT OR REPLACE INTO documents VALUES (?, ?)',
+                                        ((document['_id'], json.dumps(document, ensure_ascii=False))
+                                         for document in documents
+                                         if isinstance(document, dict) and '_id' in document))
+
+    def get(self, document_id, default=None):
+        row = self.connection.execute('SELECT document FROM documents WHERE id = ?', (document_id,)).fetchone()
+        return json.loads(row[0]) if row else default
+
+    def close(self):
+        self.connection.close()
+
+
+class EntrySpool:
+    """
+    Wpisy słownika tłumaczeń odkładane na dysk (tymczasowa baza SQLite) zaraz po przetworzeniu dokumentu,
+    już oczyszczone przez postprocess_transifex_dict i sformatowane. Przy zapisie są czytane posortowane po
+    nazwie, więc plik jest bajt w bajt taki sam jak json.dump całego słownika. Późniejszy wpis o tej samej
+    nazwie zastępuje wcześniejszy, tak jak przy uzupełnianiu słownika.
+    """
+    # Wpis zastępczy w miejscu 'entries', podmieniany przy zapisie na wpisy z bazy
+    PLACEHOLDER = {"\0": "\0"}
+    PLACEHOLDER_TEXT = '{\n        "\\u0000": "\\u0000"\n    }'
+
+    def __init__(self, memory=None):
+        self.memory = memory
+        self.connection = sqlite3.connect('')
+        self.connection.execute('CREATE TABLE entries (name TEXT PRIMARY KEY, text TEXT NOT NULL, prefilled TEXT, '
+                                'filled INTEGER, total INTEGER)')
+
+    @staticmethod
+    def format_entry(name, value):
+        # Wpis na drugim poziomie wcięcia, jak w json.dump(..., indent=4) całego słownika
+        return (f'        {json.dumps(name, ensure_ascii=False)}: '
+                f'{json.dumps(value, ensure_ascii=False, indent=4).replace(chr(10), chr(10) + " " * 8)}')
+
+    def add(self, entries):
+        for name, entry in entries.items():
+            cleaned = postprocess_transifex_dict({"entries": {name: entry}}).get("entries")
+            if not cleaned:
+                self.connection.execute('DELETE FROM entries WHERE name = ?', (name,))
+                continue
+
+            prefilled = filled = total = None
+            if self.memory:
+                tree, filled, total = self.memory.prefill({"entries": cleaned})
+                prefilled = self.format_entry(name, tree["entries"][name])
+            self.connection.execute('INSERT OR REPLACE INTO entries VALUES (?, ?, ?, ?, ?)',
+                                    (name, self.format_entry(name, cleaned[name]), prefilled, filled, total))
+
+    def write(self, path, transifex_dict, column='text', head=None):
+        """
+        Zapisuje słownik tłumaczeń: część bez wpisów z transifex_dict i wpisy z bazy.
+
+        :return: Liczba zapisanych wpisów.
+        """
+        count = self.connection.execute('SELECT COUNT(*) FROM entries').fetchone()[0]
+        if head is None:
+            head = postprocess_transifex_dict({**transifex_dict, "entries": self.PLACEHOLDER if count else {}})
+        text = json.dumps(head, ensure_ascii=False, indent=4)
+        before, _, after = text.partition(self.PLACEHOLDER_TEXT)
+
+        with atomic_write(path) as outfile:
+            outfile.write(before)
+            if count:
+                outfile.write('{\n')
+                rows = self.connection.execute(f'SELECT {column} FROM entries ORDER BY name')
+                for index, (entry_text,) in enumerate(rows):
+                    outfile.write(entry_text if index == 0 else ',\n' + entry_text)
+                outfile.write('\n    }')
+                outfile.write(after)
+        return count
+
+    def write_prefilled(self, path, transifex_dict):
+        """
+        Zapisuje słownik z tłumaczeniami z pamięci tłumaczeń (jak TranslationMemory.prefill całego słownika).
+
+        :return: Krotka (liczba podstawionych tekstów, liczba wszystkich tekstów).
+        """
+        count = self.connection.execute('SELECT COUNT(*) FROM entries').fetchone()[0]
+        head = postprocess_transifex_dict({**transifex_dict, "entries": {}})
+        head, filled, total = self.memory.prefill(head)
+        if count:
+            # Przywraca 'entries' na jego miejscu wśród kluczy najwyższego poziomu
+            cleaned = postprocess_transifex_dict({**transifex_dict, "entries": self.PLACEHOLDER})
+            head = {key: self.PLACEHOLDER if key == "entries" else head[key] for key in cleaned}
+        self.write(path, transifex_dict, 'prefilled', head)
+
+        entries_filled, entries_total = self.connection.execute(
+            'SELECT COALESCE(SUM(filled), 0), COALESCE(SUM(total), 0) FROM entries').fetchone()
+        return filled + entries_filled, total + entries_total
+
+    def close(self):
+        self.connection.close()
+
+
+def process_document(new_data, keys, file, transifex_dict, id_index, unresolved, flag, strings=None):
+    """
+    Dodaje do słownika tłumaczeń wpis jednego dokumentu pakietu.
+
+    :param new_data: Dokument pakietu.
+    :param keys: Klucze pierwszego dokumentu pakietu, które wyznaczają rodzaj kompendium.
+    :param file: Nazwa pliku pakietu.
+    :param transifex_dict: Budowany słownik tłumaczeń.
+    :param id_index: Indeks _id -> dokument (słownik albo DocumentIndex), potrzebny dla stron dzienników.
+    :param unresolved: Lista, do której trafiają nieznalezione i niepełne strony (nazwa dziennika, _id, powód).
+    :param flag: Lista znaczników rodzaju wpisów.
+    :param strings: StringTable pakietu; teksty wpisu są zastępowane wspólnymi kopiami (opcjonalnie).
+    """
+    name = new_data["name"].strip()
+    progress(name)
+
+    # Dla folderów - DZIAŁA
+    if 'folder' in new_data.keys() and 'color' in new_data.keys():
+        transifex_dict["folders"].update({name: name})
+        return
+
+    # Dla Kompendium z nazwami
+    elif 'name' in keys:
+        # Wpis przygody wypełnia schemat, więc od razu jest obiektem modelu
+        transifex_dict["entries"][name] = Adventure(name=name) if 'caption' in keys else {"name": name}
+
+    # Dla Przygód
+    if 'caption' in keys:
+        extract_adventure_document(new_data, keys, transifex_dict["entries"][name], transifex_dict['mapping'])
+
+    # Dla Kompendium z opisami
+    if 'prototypeToken' not in keys and file.split('.')[0] not in ['rules', 'weapon']:
+        if 'caption' not in keys:
+            flag.append('description')
+        try:
+            transifex_dict["entries"][name]["description"] = new_data["system"]["description"]
+        except KeyError:
+            transifex_dict["entries"][name]["description"] = new_data["description"]
+
+    # TODO: Zrobić pregens i rules i summons
+    # Dla Makr
+    elif 'command' in keys:
+        transifex_dict["entries"].update({name: {}})
+        transifex_dict["entries"][name].update({"name": name})
+
+    # Dla Dzienników
+    elif file.split('.')[0] == 'rules':
+        transifex_dict["entries"].update({name: {}})
+        transifex_dict["entries"][name].update({"name": name})
+        transifex_dict["entries"][name].update({"pages": {}})
+        # Obejscie na umiejętności adventure #TODO: do przetłumaczenia
+        for result in new_data.get('pages', []):
+            # Strony osadzone w dzienniku (słowniki zamiast _id) nie są tu obsługiwane
+            if not isinstance(result, str):
+                continue
+            pages = id_index.get(result)
+            if pages is None:
+                unresolved.append((name, result, 'brak strony w pakiecie'))
+                continue
+            if 'name' not in pages:
+                unresolved.append((name, result, 'strona bez pola name'))
+                continue
+            page = transifex_dict["entries"][name]['pages'][pages['name']] = {"name": pages['name']}
+            try:
+                page["text"] = pages['text']['content']
+            except (KeyError, TypeError):
+                # Nazwa strony zostaje do tłumaczenia, brakuje tylko treści
+                unresolved.append((name, result, 'strona bez pola text.content'))
+
+    # elif 'permission' in keys:
+    #     transifex_dict["entries"].update({name: {}})
+    #     transifex_dict["entries"][name].update({"name": name})
+    #     transifex_dict["entries"][name].update({"pages": {}})
+    #     transifex_dict["entries"][name]['pages'].update({name: {}})
+    #     transifex_dict["entries"][name]['pages'][name].update({"name": name})
+    #     try:
+    #         transifex_dict["entries"][name]['pages'][name].update({"text": new_data['content']})
+    #     except KeyError:
+    #         del transifex_dict["entries"][name]['pages']
+    #         try:
+    #             transifex_dict["entries"][name].update({"description": new_data['data']['description']['value']})
+    #         except KeyError:
+    #             transifex_dict["entries"][name].update(
+    #                 {"description": new_data['system']['description']['value']})
+    #
+    # # Dla tabel
+    # elif 'displayRoll' in keys:
+    #     transifex_dict["entries"].update({name: {}})
+    #     transifex_dict["entries"][name].update({"name": name})
+    #     transifex_dict["entries"][name].update({"description": new_data['description']})
+    #     transifex_dict["entries"][name].update({"results": {}})
+    #     for result in new_data['results']:
+    #         result_name = f'{result["range"][0]}-{result["range"][1]}'
+    #         transifex_dict["entries"][name]['results'].update({result_name: result['text']})
+
+    # Te same opisy przedmiotów i ataków powtarzają się w wielu aktorach, więc w słowniku zostaje jedna kopia
+    if strings is not None and isinstance(transifex_dict["entries"].get(name), (dict, Record)):
+        strings.intern_tree(transifex_dict["entries"][name])
+
+
+def output_names(version, file, output_dir=None):
+    """
+    Ścieżki plików wynikowych pakietu: <wersja>.<pakiet>.json i <wersja>.<pakiet>.pl.json.
+
+    :param output_dir: Katalog plików wynikowych (domyślnie bieżący).
+    """
+    name = f'{version}.{file.split('.')[0]}'
+    if output_dir:
+        name = os.path.join(output_dir, name)
+    return f'{name}.json', f'{name}.pl.json'
+
+
+def process_pack(root, file, version, memory=None, streaming=None, dedup=False, data=None, output_dir=None):
+    """
+    Tworzy plik do tłumaczenia <wersja>.<pakiet>.json z jednego pliku JSON pakietu (zob. process_files).
+
+    :param root: Katalog pliku pakietu.
+    :param file: Nazwa pliku pakietu.
+    :param version: Identyfikator przygody, przedrostek nazw plików wynikowych.
+    :param memory: Otwarta TranslationMemory (opcjonalnie).
+    :param streaming: Jak w process_files.
+    :param dedup: Jak w process_files.
+    :param data: Już wczytana lista dokumentów pakietu (np. trzymana w pamięci przez watch.py); dokumenty
+                 nie są modyfikowane.
+    :param output_dir: Katalog plików wynikowych (domyślnie bieżący).
+    :return: Klucze pierwszego dokumentu pakietu.
+    """
+    file_path = os.path.join(root, file)
+    stream_file = data is None and (streaming if streaming is not None else
+                                    os.path.getsize(file_path) > STREAMING_THRESHOLD)
+    with span('process', pack=file, streaming=stream_file) as process_span:
+        progress('Oryginalny plik:', file)
+        process_span.add(bytes_in=os.path.getsize(file_path))
+        if stream_file:
+            documents = iter_json_array(file_path)
+            compendium = next(documents, None)
+            documents = itertools.chain([compendium] if compendium is not None else [], documents)
+            compendium = compendium if compendium is not None else {}
+        else:
+            if data is None:
+                with open(file_path, 'r', encoding='utf-8') as json_file:
+                    data = json.load(json_file)
+            documents = data
+
+            try:
+                compendium = data[0]
+            except (KeyError, AttributeError) as e:
+                compendium = data
+
+        keys = compendium.keys()
+        progress('Klucze pliku JSON:', list(keys))
+
+        new_name, prefilled_name = output_names(version, file, output_dir)
+        # try:
+        #     name = compendium['_stats']['systemId'] # Nazwa pobierana z plików, na razie nie używane
+        # except KeyError:
+        #     print('BŁĄD!!!')
+        progress('Nowy plik:', new_name)
+        progress()
+
+        if pathlib.Path(f'{root}/{file.split(".")[0]}_folders.json').is_file():
+            transifex_dict = {
+                "label": file.split('.')[0].title(),
+                "folders": {},
+                "entries": {},
+                "mapping": {}
+            }
+
+            with open(f'{root}/{file.split(".")[0]}_folders.json', 'r', encoding='utf-8') as json_file:
+                data_folder = json.load(json_file)
+
+            for new_data in data_folder:
+                name = new_data["name"].strip()
+                transifex_dict["folders"].update({name: name})
+
+        elif 'color' in keys or 'folder' in keys:
+            transifex_dict = {
+                "label": file.split('.')[0].title(),
+                "folders": {},
+                "entries": {},
+                "mapping": {}
+            }
+        else:
+            transifex_dict = {
+                "label": file.split('.')[0].title(),
+                "entries": {},
+                "mapping": {}
+            }
+
+        # Indeks _id -> dokument budowany raz na plik, zamiast przeszukiwania całego pakietu dla każdej strony
+        if not stream_file:
+            id_index = build_id_index(data)
+        elif file.split('.')[0] == 'rules':
+            # Strony dzienników mogą leżeć w pliku za dziennikiem, więc potrzebne jest osobne przejście
+            id_index = DocumentIndex(iter_json_array(file_path))
+        else:
+            id_index = {}
+        unresolved = []
+        spool = EntrySpool(None if dedup else memory) if stream_file else None
+        # W trybie strumieniowym wpisy i tak nie zostają w pamięci, więc liczymy tylko powtórzenia
+        strings = StringTable(keep=not stream_file)
+
+        flag = []
+        for new_data in documents:
+            process_document(new_data, keys, file, transifex_dict, id_index, unresolved, flag, strings)
+            process_span.add(documents=1)
+            if spool:
+                # Wpis trafia od razu na dysk, w pamięci zostaje tylko bieżący dokument
+                spool.add(transifex_dict["entries"])
+                transifex_dict["entries"].clear()
+
+        if isinstance(id_index, DocumentIndex):
+            id_index.close()
+
+        if unresolved:
+            print(f'Pominięto {len(unresolved)} stron w {file}:')
+            for journal_name, document_id, reason in unresolved:
+                print(f'    {journal_name}: {document_id} ({reason})')
+
+        duplicates = strings.stats()
+        process_span.args.update(duplicates)
+        progress(f'Powtórzone teksty: {duplicates["repeated"]} z {duplicates["texts"]} '
+                 f'({duplicates["repeated_bytes"] / 1024:.0f} KB)')
+
+    if spool:
+        # Wpisy są już oczyszczone w EntrySpool.add, zostaje tylko złożenie pliku
+        with span('write', pack=file) as write_span:
+            write_span.add(documents=spool.write(new_name, transifex_dict),
+                           bytes_out=os.path.getsize(new_name))
+        if memory and not dedup:
+            with span('prefill', pack=file) as prefill_span:
+                filled, total = spool.write_prefilled(prefilled_name, transifex_dict)
+                prefill_span.add(documents=total)
+            progress(f'Przetłumaczono z pamięci {filled} z {total} tekstów')
+        spool.close()
+    elif dedup or memory:
+        # Segmenty i pamięć tłumaczeń działają na oczyszczonym słowniku; bez nich write_transifex_dict zapisuje
+        # plik wprost z wpisów
+        with span('cleanup', pack=file):
+            transifex_dict = postprocess_transifex_dict(transifex_dict)
+
+    if dedup:
+        if spool:
+            # Segmenty wymagają całego pliku, ale gotowy plik jest wielokrotnie mniejszy od pakietu
+            transifex_dict = read_translation(new_name)
+        with span('dedup', pack=file):
+            transifex_dict, segment_count, replaced = deduplicate(transifex_dict)
+        progress(f'Segmenty: {segment_count} zamiast {replaced} wystąpień')
+
+    if not spool or dedup:
+        with span('write', pack=file) as write_span, atomic_write(new_name) as outfile:
+            if dedup or memory:
+                json.dump(transifex_dict, outfile, ensure_ascii=False, indent=4)
+            else:
+                write_transifex_dict(transifex_dict, outfile)
+            write_span.add(documents=len(transifex_dict.get("entries", {})), bytes_out=outfile.tell())
+
+        if memory:
+            with span('prefill', pack=file) as prefill_span:
+                prefilled, filled, total = memory.prefill(transifex_dict)
+                write_translation(prefilled_name, prefilled)
+                prefill_span.add(documents=total)
+            progress(f'Przetłumaczono z pamięci {filled} z {total} tekstów')
+
+    return compendium.keys()
+
+
+def process_files(folders, version, incremental=False, memory_path=None, streaming=None, dedup=False,
+                  output_dir=None):
+    """
+    Tworzy pliki do tłumaczenia <wersja>.<pakiet>.json z plików JSON pakietów.
+
+    :param folders: Katalog z plikami JSON pakietów.
+    :param version: Identyfikator przygody, przedrostek nazw plików wynikowych.
+    :param incremental: Pomija pliki, których wejście się nie zmieniło od poprzedniego uruchomienia.
+    :param memory_path: Baza pamięci tłumaczeń; jeśli podana, obok każdego pliku powstaje
+                        <wersja>.<pakiet>.pl.json z tłumaczeniami znanych tekstów.
+    :param streaming: Czyta pakiet dokument po dokumencie i odkłada gotowe wpisy na dysk, więc pamięć zależy
+                      od największego dokumentu, a nie od całego pakietu. Wynik jest taki sam jak bez tego trybu.
+                      None - tylko dla plików większych niż STREAMING_THRESHOLD.
+    :param dedup: Powtarzające się długie teksty trafiają do sekcji 'segments' pliku, a w ich miejscu zostają
+                  odwołania (segments.deduplicate), rozwijane przez build_release.py.
+    :param output_dir: Katalog plików wynikowych (domyślnie bieżący).
+    """
     dict_key = []
+    manifest_path = manifest_path_for(folders)
+    manifest = load_manifest(manifest_path)
+    processed = manifest.setdefault('processed', {})
+    memory = TranslationMemory(memory_path) if memory_path else None
     for root, dirs, files in os.walk(folders):
         for file in files:
             if file.endswith(".json"):
                 file_path = os.path.join(root, file)
-                print('Oryginalny plik:', file)
-                with open(file_path, 'r', encoding='utf-8') as json_file:
-                    data = json.load(json_file)
 
-                try:
-                    compendium = data[0]
-                except (KeyError, AttributeError) as e:
-                    compendium = data
-
-                keys = compendium.keys()
-                print('Klucze pliku JSON:', list(keys))
-
-                new_name = fr'{version}.{file.split('.')[0]}.json'
-                # try:
-                #     name = compendium['_stats']['systemId'] # Nazwa pobierana z plików, na razie nie używane
-                # except KeyError:
-                #     print('BŁĄD!!!')
-                print('Nowy plik:', new_name)
-                print()
-
-                if pathlib.Path(f'{root}/{file.split(".")[0]}_folders.json').is_file():
-                    transifex_dict = {
-                        "label": file.split('.')[0].title(),
-                        "folders": {},
-                        "entries": {},
-                        "mapping": {}
-                    }
-
-                    with open(f'{root}/{file.split(".")[0]}_folders.json', 'r', encoding='utf-8') as json_file:
-                        data_folder = json.load(json_file)
-
-                    for new_data in data_folder:
-                        name = new_data["name"].strip()
-                        transifex_dict["folders"].update({name: name})
-
-                elif 'color' in keys or 'folder' in keys:
-                    transifex_dict = {
-                        "label": file.split('.')[0].title(),
-                        "folders": {},
-                        "entries": {},
-                        "mapping": {}
-                    }
-                else:
-                    transifex_dict = {
-                        "label": file.split('.')[0].title(),
-                        "entries": {},
-                        "mapping": {}
-                    }
-
-                flag = []
-                for new_data in data:
-                    name = new_data["name"].strip()
-                    print(name)
-
-                    # Dla folderów - DZIAŁA
-                    if 'folder' in new_data.keys() and 'color' in new_data.keys():
-                        transifex_dict["folders"].update({name: name})
-                        continue
-
-                    # Dla Kompendium z nazwami
-                    elif 'name' in keys:
-                        transifex_dict["entries"].update({name: {}})
-                        transifex_dict["entries"][name].update({"name": name})
-
-                    # Dla Przygód
-                    if 'caption' in keys:
-                        transifex_dict['mapping'].update(
-                            {
-                                "actors":
-                                    {
-                                        "publicNotes": "system.details.publicNotes",
-                                        "privateNotes": "system.details.privateNotes",
-                                        "blurb": "system.details.blurb",
-                                        "languagesDetails": "system.details.languages.details"
-                                    }
-                            }
-                        )
-                        transifex_dict["entries"][name].update({"caption": new_data["caption"]})
-                        transifex_dict["entries"][name].update({"description": new_data["description"]})
-
-                        # Foldery
-                        if 'folders' in keys:
-                            transifex_dict["entries"][name].update({"folders": {}})
-                            for folder in new_data["folders"]:
-                                if 'folders' in keys:
-                                    transifex_dict["entries"][name]["folders"].update({folder['name']: folder['name']})
-
-                        # Dzienniki
-                        if 'journal' in keys:
-                            transifex_dict["entries"][name.strip()].update({"journals": {}})
-                            for journal in new_data["journal"]:
-                                transifex_dict["entries"][name]["journals"].update({journal["name"]: {}})
-                                transifex_dict["entries"][name]["journals"][journal["name"].strip()].update(
-                                    {"name": journal["name"]})
-                                transifex_dict["entries"][name]["journals"][journal["name"]].update({"pages": {}})
-                                for pages in journal["pages"]:
-                                    transifex_dict["entries"][name]["journals"][journal["name"]]["pages"].update(
-                                        {pages["name"].strip(): {}})
-                                    transifex_dict["entries"][name]["journals"][journal["name"]]["pages"][
-                                        pages["name"].strip()].update({"name": pages["name"].strip()})
-                                    transifex_dict["entries"][name]["journals"][journal["name"]]["pages"][
-                                        pages["name"].strip()].update(
-                                        {"text": " ".join(pages["text"].get("content", "").split())})
-                        # Sceny
-                        if 'scenes' in keys:
-                            transifex_dict["entries"][name].update({"scenes": {}})
-                            for scene in new_data["scenes"]:
-                                transifex_dict["entries"][name]["scenes"].update({scene["name"]: {}})
-                                transifex_dict["entries"][name]["scenes"][scene["name"]].update({"name": scene["name"]})
-                                transifex_dict["entries"][name]["scenes"][scene["name"]].update({"notes": {}})
-                                for note in scene["notes"]:
-                                    transifex_dict["entries"][name]["scenes"][scene["name"]]["notes"].update(
-                                        {note["text"]: note["text"]})
-
-                        # Makra
-                        if 'macros' in keys:
-                            transifex_dict["entries"][name].update({"macros": {}})
-                            for macro in new_data["macros"]:
-                                transifex_dict["entries"][name]["macros"].update({macro["name"]: {}})
-                                transifex_dict["entries"][name]["macros"][macro["name"]].update({"name": macro["name"]})
-
-                        # Tabele
-                        if 'tables' in keys:
-                            transifex_dict["entries"][name].update({"tables": {}})
-                            for table in new_data["tables"]:
-                                transifex_dict["entries"][name]["tables"].update({table["name"]: {}})
-                                transifex_dict["entries"][name]["tables"][table["name"]].update({"name": table["name"]})
-                                transifex_dict["entries"][name]["tables"][table["name"]].update({"description": table["description"]})
-                                transifex_dict["entries"][name]["tables"][table["name"]].update({"results": {}})
-                                for result in table['results']:
-                                    result_name = f'{result["range"][0]}-{result["range"][1]}'
-                                    transifex_dict["entries"][name]["tables"][table["name"]]['results'].update({result_name: result['text']})
-
-                        # Przedmioty
-                        if 'items' in keys:
-                            transifex_dict["entries"][name].update({"items": {}})
-                            for item in new_data["items"]:
-                                transifex_dict["entries"][name]["items"].update({item["name"]: {}})
-                                transifex_dict["entries"][name]["items"][item["name"]].update({"name": item["name"]})
-
-                                if item.get('_stats').get('compendiumSource') is None or item.get('_stats').get(
-                                        'compendiumSource').startswith('Item'):
-                                    transifex_dict["entries"][name]["items"][item["name"]].update({"description": item["system"]["description"]["value"]})
-                                    transifex_dict["entries"][name]["items"][item["name"]].update({"gmNote": item["system"]["description"]["gm"]})
-                                    transifex_dict['mapping'].update(
-                                        {
-                                            "gmNote": "system.description.gm"
-                                        }
-                                    )
-
-                                    # Dla niezidentyfikowanych
-                                    try:
-                                        if item["system"]["identification"]["unidentified"]["name"] != "":
-                                           transifex_dict["entries"][name]["items"][item["name"]].update(
-                                               {"unidentified": item["system"]["identification"]["unidentified"]["name"]})
-                                           transifex_dict["entries"][name]["items"][item["name"]].update(
-                                               {"unidentified_desc": item["system"]["identification"]["unidentified"]["data"]["description"]["value"]})
-                                           transifex_dict['mapping'].update(
-                                               {
-                                                   "unidentified": "system.identification.unidentified.name",
-                                                   "unidentified_desc": "system.identification.unidentified.data.description.value",
-                                               }
-                                           )
-                                    except KeyError:
-                                        pass
-
-                        # Playlisty
-                        if 'playlists' in keys:
-                            transifex_dict["entries"][name].update({"playlists": {}})
-                            for playlist in new_data["playlists"]:
-                                transifex_dict["entries"][name]["playlists"].update({playlist["name"]: {}})
-                                transifex_dict["entries"][name]["playlists"][playlist["name"]].update(
-                                    {"name": playlist["name"]})
-                                transifex_dict["entries"][name]["playlists"][playlist["name"]].update(
-                                    {"description": playlist.get("description")})
-                                transifex_dict["entries"][name]["playlists"][playlist["name"]].update({"sounds": {}})
-                                for sound in playlist["sounds"]:
-                                    transifex_dict["entries"][name]["playlists"][playlist["name"]]["sounds"].update(
-                                        {sound["name"]: {}})
-                                    transifex_dict["entries"][name]["playlists"][playlist["name"]]["sounds"][
-                                        sound["name"]].update({"name": sound["name"]})
-                                    transifex_dict["entries"][name]["playlists"][playlist["name"]]["sounds"][
-                                        sound["name"]].update({"description": sound.get("description")})
-
-                        # Aktorzy
-                        if 'actors' in keys:
-                            transifex_dict["entries"][name].update({"actors": {}})
-                            for actor in new_data["actors"]:
-                                transifex_dict["entries"][name]["actors"].update({actor["name"]: {}})
-                                transifex_dict["entries"][name]["actors"][actor["name"]].update({"name": actor["name"]})
-                                transifex_dict["entries"][name]["actors"][actor["name"]].update(
-                                    {"tokenName": actor["prototypeToken"]["name"]})
-
-                                # Tylko PF2E
-                                try:
-                                    if actor['system']['details']['publicNotes'] != "":
-                                        transifex_dict["entries"][name]["actors"][actor["name"]].update(
-                                            {"publicNotes": actor['system']['details']['publicNotes']})
-                                except KeyError:
-                                    pass
-                                try:
-                                    if actor['system']['details']['blurb'] != "":
-                                        transifex_dict["entries"][name]["actors"][actor["name"]].update(
-                                            {"blurb": actor['system']['details']['blurb']})
-                                except KeyError:
-                                    pass
-                                try:
-                                    if actor['system']['details']['privateNotes'] != "":
-                                        transifex_dict["entries"][name]["actors"][actor["name"]].update(
-                                            {"privateNotes": actor['system']['details']['privateNotes']})
-                                except KeyError:
-                                    pass
-                                try:
-                                    if actor['system']['details']['description'] != "":
-                                        transifex_dict["entries"][name]["actors"][actor["name"]].update(
-                                            {"description": actor['system']['details']['description']})
-                                except KeyError:
-                                    pass
-                                try:
-                                    if actor['system']['details']['languages']['details'] != "":
-                                        transifex_dict["entries"][name]["actors"][actor["name"]].update(
-                                            {"languagesDetails": actor['system']['details']['languages']['details']})
-                                except KeyError:
-                                    pass
-
-                                transifex_dict["entries"][name]["actors"][actor["name"]].update({"items": {}})
-                                for item in actor['items']:
-                                    try:
-                                        if item.get("system").get("description").get("gm") != "":
-                                            transifex_dict["entries"][name]["actors"][actor["name"]]["items"].update(
-                                                {item["name"]: {}})
-                                            transifex_dict["entries"][name]["actors"][actor["name"]]["items"][
-                                                item["name"]].update({"name": item["name"]})
-                                            transifex_dict["entries"][name]["actors"][actor["name"]]["items"][
-                                                item["name"]].update(
-                                                {"description": item["system"]["description"]["value"]})
-
-                                            # Dla opisów GM
-                                            transifex_dict["entries"][name]["actors"][actor["name"]]["items"][
-                                                item["name"]].update({"gmNote": item["system"]["description"]["gm"]})
-                                            transifex_dict['mapping']['actors'].update(
-                                                {
-                                                    "gmNote": "system.description.gm"
-                                                }
-                                            )
-                                    except KeyError:
-                                        pass
-
-                                    try:
-                                        if item.get("system").get("identification").get("status") == "unidentified":
-                                            transifex_dict["entries"][name]["actors"][actor["name"]]["items"].update(
-                                                {item["name"]: {}})
-                                            transifex_dict["entries"][name]["actors"][actor["name"]]["items"][
-                                                item["name"]].update({"name": item["name"]})
-                                            transifex_dict["entries"][name]["actors"][actor["name"]]["items"][
-                                                item["name"]].update(
-                                                {"description": item["system"]["description"]["value"]})
-
-                                            # Dla niezidentyfikowanych w aktorach
-                                            transifex_dict["entries"][name]["actors"][actor["name"]]["items"][item["name"]].update(
-                                                {"unidentified":
-                                                     item["system"]["identification"]["unidentified"][
-                                                         "name"]})
-                                            transifex_dict["entries"][name]["actors"][actor["name"]]["items"][item["name"]].update(
-                                                {"unidentified_desc":
-                                                     item["system"]["identification"]["unidentified"]["data"][
-                                                         "description"]["value"]})
-                                            transifex_dict['mapping']['actors'].update(
-                                                {
-                                                    "unidentified": "system.identification.unidentified.name",
-                                                    "unidentified_desc": "system.identification.unidentified.data.description.value",
-                                                }
-                                            )
-                                    except AttributeError:
-                                        pass
-
-                                    if item["_stats"]["compendiumSource"] is None:
-                                        transifex_dict["entries"][name]["actors"][actor["name"]]["items"].update(
-                                            {item["name"]: {}})
-                                        transifex_dict["entries"][name]["actors"][actor["name"]]["items"][
-                                            item["name"]].update({"name": item["name"]})
-                                        transifex_dict["entries"][name]["actors"][actor["name"]]["items"][
-                                            item["name"]].update({"description": item["system"]["description"]["value"]})
-                                        if item.get("system").get("description").get("gm") != "":
-                                            transifex_dict["entries"][name]["actors"][actor["name"]]["items"][
-                                                item["name"]].update({"gmNote": item["system"]["description"]["gm"]})
-                                            transifex_dict['mapping']['actors'].update(
-                                                {
-                                                    "gmNote": "system.description.gm"
-                                                }
-                                            )
-
-                    # Dla Kompendium z opisami
-                    if 'prototypeToken' not in keys and file.split('.')[0] not in ['rules', 'weapon']:
-                        if 'caption' not in keys:
-                            flag.append('description')
-                        try:
-                            transifex_dict["entries"][name].update({"description": new_data["system"]["description"]})
-                        except KeyError:
-                            transifex_dict["entries"][name].update({"description": new_data["description"]})
-
-                    # TODO: Zrobić pregens i rules i summons
-                    # Dla Makr
-                    elif 'command' in keys:
-                        transifex_dict["entries"].update({name: {}})
-                        transifex_dict["entries"][name].update({"name": name})
-
-                    # Dla Dzienników
-                    elif file.split('.')[0] == 'rules':
-                        transifex_dict["entries"].update({name: {}})
-                        transifex_dict["entries"][name].update({"name": name})
-                        transifex_dict["entries"][name].update({"pages": {}})
-                        try:  # Obejscie na umiejętności adventure #TODO: do przetłumaczenia
-                            for result in new_data['pages']:
-                                for pages in data:
-                                    try:
-                                        if result == pages['_id']:
-                                            transifex_dict["entries"][name]['pages'].update({pages['name']: {}})
-                                            transifex_dict["entries"][name]['pages'][pages['name']].update(
-                                                {"name": pages['name']})
-                                            transifex_dict["entries"][name]['pages'][pages['name']].update(
-                                                {"text": pages['text']['content']})
-                                    except KeyError:
-                                        pass
-                        except KeyError:
-                            pass
-
-                    # elif 'permission' in keys:
-                    #     transifex_dict["entries"].update({name: {}})
-                    #     transifex_dict["entries"][name].update({"name": name})
-                    #     transifex_dict["entries"][name].update({"pages": {}})
-                    #     transifex_dict["entries"][name]['pages'].update({name: {}})
-                    #     transifex_dict["entries"][name]['pages'][name].update({"name": name})
-                    #     try:
-                    #         transifex_dict["entries"][name]['pages'][name].update({"text": new_data['content']})
-                    #     except KeyError:
-                    #         del transifex_dict["entries"][name]['pages']
-                    #         try:
-                    #             transifex_dict["entries"][name].update({"description": new_data['data']['description']['value']})
-                    #         except KeyError:
-                    #             transifex_dict["entries"][name].update(
-                    #                 {"description": new_data['system']['description']['value']})
-                    #
-                    # # Dla tabel
-                    # elif 'displayRoll' in keys:
-                    #     transifex_dict["entries"].update({name: {}})
-                    #     transifex_dict["entries"][name].update({"name": name})
-                    #     transifex_dict["entries"][name].update({"description": new_data['description']})
-                    #     transifex_dict["entries"][name].update({"results": {}})
-                    #     for result in new_data['results']:
-                    #         result_name = f'{result["range"][0]}-{result["range"][1]}'
-                    #         transifex_dict["entries"][name]['results'].update({result_name: result['text']})
-
-                transifex_dict = remove_empty_keys(transifex_dict)
-                transifex_dict = sort_entries(transifex_dict)
-                transifex_dict = remove_newlines_from_dict(transifex_dict)
-                remove_all_braces_from_uuid(transifex_dict)
-
-                with open(new_name, "w", encoding='utf-8') as outfile:
-                    json.dump(transifex_dict, outfile, ensure_ascii=False, indent=4)
-
-                dict_key.append(f'{compendium.keys()}')
-
-
-def adventures(adventure_url, zip_adventure_filename, zip_adventure, extract_folder):
-    path_adventure, headers_adventure = urlretrieve(adventure_url, 'adventure.json')
+                # Plik wynikowy zależy tylko od pakietu, jego folderów i kodu tego skryptu
+                input_hash = hash_files(file_path, f'{root}/{file.split(".")[0]}_folders.json', __file__,
+                                        *([memory_path] if memory else [])) + ('.dedup' if dedup else '')
+                new_name, prefilled_name = output_names(version, file, output_dir)
+                if incremental and processed.get(file) == input_hash and os.path.exists(new_name) and not (
+                        memory and not os.path.exists(prefilled_name)):
+                    progress('Bez zmian, pomijam:', file)
+                    continue
 
+                keys = process_pack(root, file, version, memory, streaming, dedup, output_dir=output_dir)
+                processed[file] = input_hash
+                dict_key.append(f'{keys}')
+
+    if memory:
+        memory.close()
+    save_manifest(manifest_path, manifest)
+
+
+def read_module_id(module_filename):
     try:
-        with open('adventure.json', 'r') as file:
+        with open(module_filename, 'r') as file:
             data = json.load(file)
-            id_value = data.get('id', None)
+            return data.get('id', None)
     except FileNotFoundError:
         print("Plik nie został znaleziony.")
     except json.JSONDecodeError:
         print("Błąd podczas parsowania pliku JSON.")
 
+
+def download_adventure(adventure_url, zip_adventure_filename, zip_adventure, module_filename='adventure.json',
+                       stages=None):
+    """
+    Etap sieciowy przygody z archiwum: pobiera module.json i, dla nowej wersji, archiwum modułu.
+
+    :param stages: StageManifest przygody; archiwum jest pobierane też wtedy, gdy etap 'downloaded' nie jest
+                   zakończony dla tego module.json (np. poprzednie pobieranie zostało przerwane).
+    :return: Identyfikator (wersja) przygody.
+    """
+    cached_download(adventure_url, module_filename)
+    id_value = read_module_id(module_filename)
+
     print("*** Wersja przygody: ", id_value, " ***")
     print()
 
-    if create_version_directory(id_value):
-        download_and_extract_zip(zip_adventure, zip_adventure_filename, extract_folder)
+    inputs = hash_files(module_filename)
+    if create_version_directory(id_value) or not os.path.exists(zip_adventure_filename) or (
+            stages and not stages.is_done('downloaded', inputs)):
+        cached_download(zip_adventure, zip_adventure_filename)
         print("Pobrano przygodę...")
-    else:
-        with zipfile.ZipFile(zip_adventure_filename, 'r') as zip_ref:
-            zip_ref.extractall(extract_folder)
+    if stages:
+        stages.complete('downloaded', inputs, [zip_adventure_filename])
+    return id_value
+
+
+def extract_adventure(id_value, zip_adventure_filename, extract_folder, incremental=False, workers=None,
+                      snapshot=None):
+    """
+    Etap obliczeniowy przygody z archiwum: rozpakowuje pakiety i konwertuje je z LevelDB na JSON.
+    """
+    extract_module_zip(zip_adventure_filename, extract_folder)
 
     # Konwersja z db na json
     read_leveldb_to_json(fr'{extract_folder}\{id_value}\packs',
-                         fr'{extract_folder}\{id_value}\output')
+                         fr'{extract_folder}\{id_value}\output', incremental=incremental, workers=workers,
+                         snapshot=snapshot)
     print()
 
 
-def adventures_local(adventure_url, extract_folder):
-    response = requests.get(adventure_url)
-    if response.status_code == 200:  # Sprawdza, czy żądanie zakończyło się sukcesem
-        with open('adventure.json', 'wb') as file:
-            file.write(response.content)  # Zapisuje dane do pliku
-        print("Plik został pobrany i zapisany jako adventure.json.")
-    else:
-        print(f"Błąd: {response.status_code}")
+def adventures(adventure_url, zip_adventure_filename, zip_adventure, extract_folder, incremental=False,
+               module_filename='adventure.json'):
+    id_value = download_adventure(adventure_url, zip_adventure_filename, zip_adventure, module_filename)
+    extract_adventure(id_value, zip_adventure_filename, extract_folder, incremental)
+
 
+def download_adventure_local(adventure_url, module_filename='adventure.json', stages=None):
+    """
+    Etap sieciowy przygody lokalnej: pobiera tylko module.json, pakiety leżą już na dysku.
+
+    :param stages: StageManifest przygody (opcjonalnie).
+    :return: Identyfikator (wersja) przygody.
+    """
     try:
-        with open('adventure.json', 'r') as file:
-            data = json.load(file)
-            id_value = data.get('id', None)
-    except FileNotFoundError:
-        print("Plik nie został znaleziony.")
-    except json.JSONDecodeError:
-        print("Błąd podczas parsowania pliku JSON.")
+        cached_download(adventure_url, module_filename)
+        print(f"Plik został pobrany i zapisany jako {module_filename}.")
+    except requests.HTTPError as error:
+        print(f"Błąd: {error.response.status_code}")
+
+    id_value = read_module_id(module_filename)
+    if stages and id_value is not None:
+        stages.complete('downloaded', hash_files(module_filename))
 
     print()
     print("*** Wersja przygody lokalnej: ", id_value, " ***")
+    return id_value
+
 
+def extract_adventure_local(id_value, incremental=False, workers=None, snapshot=None):
     # Konwersja z db na json
-    read_leveldb_to_json(fr'{id_value}\packs', fr'{id_value}')
+    read_leveldb_to_json(fr'{id_value}\packs', fr'{id_value}', incremental=incremental, workers=workers,
+                         snapshot=snapshot)
     print()
 
 
-def json_files(adventure_url):
+def adventures_local(adventure_url, extract_folder, incremental=False, module_filename='adventure.json'):
+    id_value = download_adventure_local(adventure_url, module_filename)
+    extract_adventure_local(id_value, incremental)
+
+
+def prepare_local_output(adventure_url, extract_folder):
+    """
+    Kopiuje zrzut przygody lokalnej do katalogu, z którego czyta json_files.
+    """
+    version_adventure = adventure_url.split('/')[-2]
+    os.makedirs(f'{version_adventure}/output', exist_ok=True)
+    # Abomination Vaults ma pakiet przygody nazwany 'av'
+    if os.path.exists(f'{version_adventure}/av.json'):
+        os.rename(f'{version_adventure}/av.json', f'{version_adventure}/adventures.json')
+    shutil.copy(f'{version_adventure}/adventures.json',
+                f'{version_adventure}/output/adventures.json')
+    shutil.copytree(f'{version_adventure}',
+                    f'{extract_folder}/{version_adventure}',
+                    dirs_exist_ok=True)
+
+
+def json_files(adventure_url, incremental=False, memory_path=None, streaming=None, dedup=False, output_dir=None):
     version_adventure = adventure_url.split('/')[-2]
 
     folder = rf'pack_adventure/{version_adventure}/output'
-    process_files(folder, version_adventure)
+    process_files(folder, version_adventure, incremental, memory_path, streaming, dedup, output_dir)
+
+
+def publish_outputs(staged, version, pack_names=None):
+    """
+    Etap 'written': kopiuje gotowe pliki z katalogu roboczego przygody do bieżącego katalogu, każdy atomowo.
+
+    :param staged: Ścieżki plików <wersja>.<pakiet>(.pl).json w katalogu roboczym.
+    :param version: Identyfikator przygody.
+    :param pack_names: Nazwy pakietów w plikach docelowych, np. {"adventures": "kingmaker"}.
+    :return: Ścieżki plików docelowych.
+    """
+    written = []
+    for path in staged:
+        rest = os.path.basename(path)[len(version) + 1:]
+        pack = rest.split('.')[0]
+        target = f'{version}.{(pack_names or {}).get(pack, pack)}{rest[len(pack):]}'
+        copy_atomic(path, target)
+        written.append(target)
+    return written
+
+
+def download_stage(adventure, local, restart=False):
+    stages = StageManifest(adventure["adventure"], restart=restart)
+    if local:
+        return download_adventure_local(adventure["adventure_url"], adventure["module_filename"], stages)
+    return download_adventure(adventure["adventure_url"], adventure["zip_adventure_filename"],
+                              adventure["zip_adventure"], adventure["module_filename"], stages)
+
+
+def processing_stage(adventure, local, id_value, incremental=False, memory_path=None, streaming=None,
+                     dedup=False, snapshot=None, restart=False):
+    """
+    Etapy 'extracted', 'dumped', 'processed' i 'written' przygody; etapy zakończone przy poprzednim uruchomieniu
+    (zob. StageManifest) są pomijane, chyba że restart=True. Pliki wynikowe powstają najpierw w katalogu roboczym
+    .cache/pipeline/<przygoda>, a do bieżącego katalogu trafiają dopiero w etapie 'written'.
+    """
+    # Etap 'downloaded' wykonał już download_stage w tym uruchomieniu (od nowa przy restart)
+    stages = StageManifest(adventure["adventure"], restart=restart, keep=('downloaded',))
+    version_adventure = adventure["adventure_url"].split('/')[-2]
+    dump_folder = f'pack_adventure/{version_adventure}/output'
+    staging = os.path.join(PIPELINE_DIR, adventure["adventure"])
+    os.makedirs(staging, exist_ok=True)
+
+    def dumped_outputs():
+        return [os.path.join(dump_folder, name) for name in sorted(os.listdir(dump_folder)) if name.endswith('.json')]
+
+    def processed_outputs():
+        names = [output_names(version_adventure, os.path.basename(path), staging) for path in dumped_outputs()]
+        return [name for new_name, prefilled_name in names for name in
+                ([new_name, prefilled_name] if memory_path else [new_name])]
+
+    # Przygody są już rozdzielone między procesy, więc pakiety jednej przygody zrzucamy po kolei
+    with span('adventure', adventure=adventure["adventure"], version=id_value):
+        state = stages.state('downloaded')
+        if local:
+            # Pakiety lokalne mogą się zmienić bez zmiany module.json, więc są też wejściem zrzutu
+            packs_folder = fr'{id_value}\packs'
+            state = hash_value(f'{state}:{leveldb_signature(packs_folder)}'.encode())
+
+            def dump():
+                extract_adventure_local(id_value, incremental, workers=1, snapshot=snapshot)
+                prepare_local_output(adventure["adventure_url"], adventure["extract_folder"])
+        else:
+            packs_folder = os.path.join(adventure["extract_folder"], id_value, 'packs')
+            state = stages.run('extracted', state,
+                               lambda: extract_module_zip(adventure["zip_adventure_filename"],
+                                                          adventure["extract_folder"]),
+                               lambda: [packs_folder])
+
+            def dump():
+                read_leveldb_to_json(fr'{adventure["extract_folder"]}\{id_value}\packs',
+                                     fr'{adventure["extract_folder"]}\{id_value}\output', incremental=incremental,
+                                     workers=1, snapshot=snapshot)
+        state = stages.run('dumped', state, dump, dumped_outputs)
+
+        # Pliki wynikowe zależą też od kodu tego skryptu, pamięci tłumaczeń i trybu dedup
+        inputs = hash_value(f'{state}:{hash_files(__file__, *([memory_path] if memory_path else []))}:'
+                            f'{dedup}'.encode())
+        state = stages.run('processed', inputs,
+                           lambda: json_files(adventure["adventure_url"], incremental, memory_path, streaming, dedup,
+                                              staging),
+                           processed_outputs)
+
+        written = []
+        stages.run('written', state,
+                   lambda: written.extend(publish_outputs(processed_outputs(), version_adventure,
+                                                          adventure.get("pack_names"))),
+                   lambda: written)
+
+
+def run_adventures(adventures_list, adventures_local_list, network_workers=4, cpu_workers=None, incremental=False,
+                   memory_path=None, streaming=None, dedup=False, snapshot=None, restart=False):
+    """
+    Przetwarza wszystkie przygody równolegle. Pobieranie (I/O) działa w puli wątków, a rozpakowywanie,
+    zrzut LevelDB i process_files w puli procesów; przygoda trafia do przetwarzania, gdy tylko się pobierze.
+    Błąd jednej przygody nie przerywa pozostałych, a po ponownym uruchomieniu przygody zaczynają od pierwszego
+    niezakończonego etapu (StageManifest).
+
+    :param adventures_list: Przygody pobierane jako archiwum modułu.
+    :param adventures_local_list: Przygody z pakietami na dysku.
+    :param network_workers: Liczba równoczesnych pobrań.
+    :param cpu_workers: Liczba procesów przetwarzających (None - liczba rdzeni).
+    :param incremental: Przekazywane do read_leveldb_to_json i process_files.
+    :param memory_path: Zbudowana pamięć tłumaczeń przekazywana do process_files (opcjonalnie).
+    :param streaming: Tryb strumieniowy process_files (None - według rozmiaru pakietu).
+    :param dedup: Przenosi powtarzające się teksty do sekcji 'segments' plików wynikowych.
+    :param snapshot: Plik migawki SQLite pakietów (pack_cache.py) uzupełnianej przy zrzucie LevelDB.
+    :param restart: Wykonuje wszystkie etapy od nowa, bez wznawiania.
+    :return: Słownik nazwa przygody -> wyjątek dla przygód zakończonych błędem.
+    """
+    jobs = [(adventure, False) for adventure in adventures_list] + \
+           [(adventure, True) for adventure in adventures_local_list]
+    failures = {}
+
+    with ThreadPoolExecutor(max_workers=network_workers) as network, \
+            ProcessPoolExecutor(max_workers=cpu_workers) as cpu:
+        downloads = {network.submit(download_stage, adventure, local, restart): (adventure, local)
+                     for adventure, local in jobs}
+        processing = {}
+        for future in as_completed(downloads):
+            adventure, local = downloads[future]
+            try:
+                id_value = future.result()
+                if id_value is None:
+                    raise ValueError(f'Brak identyfikatora w {adventure["module_filename"]}')
+            except Exception as error:
+                print(f'Błąd pobierania przygody {adventure["adventure"]}: {error!r}')
+                failures[adventure["adventure"]] = error
+                continue
+            processing[cpu.submit(processing_stage, adventure, local, id_value, incremental, memory_path,
+                                  streaming, dedup, snapshot, restart)] = adventure
+
+        for future in as_completed(processing):
+            adventure = processing[future]
+            try:
+                future.result()
+            except Exception as error:
+                print(f'Błąd przetwarzania przygody {adventure["adventure"]}: {error!r}')
+                failures[adventure["adventure"]] = error
+
+    return failures
 
 
 if __name__ == '__main__':
+    parser = argparse.ArgumentParser(description='Tworzy pliki do tłumaczenia przygód PF2e.')
+    parser.add_argument('--incremental', action='store_true',
+                        help='Przetwarza tylko pakiety i dokumenty zmienione od poprzedniego uruchomienia')
+    parser.add_argument('--network-workers', type=int, default=4, help='Liczba równoczesnych pobrań')
+    parser.add_argument('--cpu-workers', type=int, default=None,
+                        help='Liczba procesów przetwarzających przygody (domyślnie liczba rdzeni)')
+    parser.add_argument('--trace', help='Plik śladu z czasem, liczbą dokumentów, bajtami i pamięcią każdego etapu')
+    parser.add_argument('--trace-format', choices=['jsonl', 'chrome'], default='jsonl',
+                        help='Format pliku śladu: JSON lines albo format Chrome (chrome://tracing, Perfetto)')
+    parser.add_argument('--quiet', action='store_true', help='Nie wypisuje nazw pojedynczych dokumentów i plików')
+    parser.add_argument('--translation-memory', nargs='?', const=MEMORY_PATH, metavar='PLIK',
+                        help='Tworzy też pliki <wersja>.<pakiet>.pl.json z tłumaczeniami z pamięci tłumaczeń')
+    parser.add_argument('--streaming', action=argparse.BooleanOptionalAction, default=None,
+                        help='Czyta pakiety dokument po dokumencie (domyślnie tylko pakiety większe niż '
+                             f'{STREAMING_THRESHOLD // (1024 * 1024)} MB)')
+    parser.add_argument('--dedup', action='store_true',
+                        help='Powtarzające się długie teksty zapisuje raz, w sekcji segments '
+                             '(rozwija je build_release.py)')
+    parser.add_argument('--snapshot', nargs='?', const=SNAPSHOT_PATH, metavar='PLIK',
+                        help='Zapisuje też dokumenty pakietów do bazy SQLite do zapytań (pack_cache.py)')
+    parser.add_argument('--restart', action='store_true',
+                        help=f'Wykonuje wszystkie etapy od nowa, zamiast wznawiać według manifestów w {PIPELINE_DIR}')
+    args = parser.parse_args()
+    configure(args.trace, args.trace_format, args.quiet)
+
+    if args.translation_memory:
+        # Pamięć budujemy raz tutaj, procesy przetwarzające tylko z niej czytają
+        with TranslationMemory(args.translation_memory) as memory:
+            memory.build()
 
     # === === === === === === === === === === === === === === === === === === === === === === === === === === === ===
 
@@ -617,7 +1857,7 @@ if __name__ == '__main__':
     adventures_list = [
         {
             "adventure_url": "https://downloads.paizo.com/foundry-public/modules/pf2e-ap196-199-season-of-ghosts/module.json",
-            "zip_adventure_filename": "adventure.zip",
+            "zip_adventure_filename": "season-of-ghosts-pg.zip",
             "zip_adventure": "https://downloads.paizo.com/foundry-public/modules/pf2e-ap196-199-season-of-ghosts/module-v12.zip",
             "extract_folder": "pack_adventure",
             "adventure": "season-of-ghosts-pg"
@@ -642,7 +1882,8 @@ if __name__ == '__main__':
         {
             "adventure_url": "https://foundryvtt.s3.us-west-2.amazonaws.com/modules/pf2e-kingmaker/module.json",
             "extract_folder": "pack_adventure",
-            "adventure": "pf2e-kingmaker"
+            "adventure": "pf2e-kingmaker",
+            "pack_names": {"adventures": "kingmaker"}
         },
         {
             "adventure_url": "https://cdn.paizo.com/foundry/modules/pf2e-rusthenge/module.json",
@@ -655,28 +1896,14 @@ if __name__ == '__main__':
             "adventure": "pf2e-abomination-vaults"
         }
     ]
-    for adventure in adventures_list:
-        adventures(
-            adventure["adventure_url"],
-            adventure["zip_adventure_filename"],
-            adventure["zip_adventure"],
-            adventure["extract_folder"]
-        )
-        json_files(adventure["adventure_url"])
-
-    for adventure in adventures_local_list:
-        adventures_local(
-            adventure["adventure_url"],
-            adventure["extract_folder"]
-        )
-        os.makedirs(f'{adventure["adventure_url"].split('/')[-2]}/output', exist_ok=True)
-        if os.path.exists('pf2e-abomination-vaults/av.json'):
-            os.rename('pf2e-abomination-vaults/av.json', 'pf2e-abomination-vaults/adventures.json')
-        shutil.copy(f'{adventure["adventure_url"].split('/')[-2]}/adventures.json',
-                    f'{adventure["adventure_url"].split('/')[-2]}/output/adventures.json')
-        shutil.copytree(f'{adventure["adventure_url"].split('/')[-2]}',
-                        f'{adventure["extract_folder"]}/{adventure["adventure_url"].split('/')[-2]}',
-                        dirs_exist_ok=True)
-        json_files(adventure["adventure_url"])
-
-    os.rename("pf2e-kingmaker.adventures.json", "pf2e-kingmaker.kingmaker.json")
+    for adventure in adventures_list + adventures_local_list:
+        # Osobne pliki robocze dla każdej przygody, żeby równoległe przebiegi ich nie nadpisywały
+        adventure["module_filename"] = f'{adventure["adventure"]}.module.json'
+
+    failures = run_adventures(adventures_list, adventures_local_list, args.network_workers, args.cpu_workers,
+                              args.incremental, args.translation_memory, args.streaming, args.dedup,
+                              args.snapshot, args.restart)
+
+    if failures:
+        print('Przygody zakończone błędem:', ', '.join(failures))
+        sys.exit(1)
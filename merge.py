@@ -0,0 +1,150 @@
+"""
+Scala świeżo wygenerowany plik angielski (wynik process_files) z istniejącym tłumaczeniem z lang/pl.
+
+Pliki są dopasowywane po ścieżkach kluczy: nowy angielski wyznacza strukturę i kolejność, a dla każdego
+liścia sprawdzany jest poprzedni angielski (lang/en) i tłumaczenie (lang/pl):
+    - tekst angielski bez zmian - zostaje tłumaczenie,
+    - nowy klucz - wstawiany jest tekst angielski do przetłumaczenia,
+    - zmieniony tekst angielski - zostaje stare tłumaczenie, a wpis trafia do raportu do sprawdzenia
+      (chyba że nie był przetłumaczony, wtedy po prostu bierzemy nowy tekst),
+    - klucz usunięty z angielskiego - tłumaczenie trafia do kwarantanny (quarantine/<plik>), żeby nie zginęło.
+
+Uruchomienie z katalogu repozytorium:
+    python merge.py pf2e-rusthenge.adventures.json [--update-en] [--report merge-report.json]
+"""
+import argparse
+import json
+import os
+import time
+
+from translations import (EN_DIR, PL_DIR, STRUCTURAL_SECTIONS, json_pointer, leaf_index, read_translation, set_path,
+                          write_translation)
+
+QUARANTINE_DIR = 'quarantine'
+MISSING = object()
+
+
+def merge_translation(new_en, old_en=None, pl=None):
+    """
+    Scala nowy plik angielski z poprzednim angielskim i tłumaczeniem w jednym przejściu po nowym pliku.
+
+    :param new_en: Nowe drzewo angielskie.
+    :param old_en: Poprzednie drzewo angielskie (None - nie da się wykryć zmian tekstu źródłowego).
+    :param pl: Obecne tłumaczenie (None - nowe tłumaczenie z samymi tekstami angielskimi).
+    :return: Krotka (scalone tłumaczenie, lista (ścieżka, tłumaczenie) usuniętych kluczy, raport).
+    """
+    old_index = leaf_index(old_en) if old_en else {}
+    pl_index = leaf_index(pl) if pl else {}
+    seen = set()
+    report = {"kept": 0, "updated": 0, "added": [], "changed": [], "removed": []}
+
+    def merge_node(node, path):
+        merged = {}
+        for key, value in node.items():
+            key_path = path + (key,)
+            if isinstance(value, dict):
+                merged[key] = merge_node(value, key_path)
+                continue
+
+            seen.add(key_path)
+            translation = pl_index.get(key_path, MISSING)
+            old = old_index.get(key_path, MISSING)
+            if translation is MISSING:
+                merged[key] = value
+                report["added"].append(json_pointer(key_path))
+            elif old is MISSING or old == value:
+                merged[key] = translation
+                report["kept"] += 1
+            elif translation == old:
+                # Tekst nie był przetłumaczony, więc nie ma czego sprawdzać
+                merged[key] = value
+                report["updated"] += 1
+            else:
+                merged[key] = translation
+                report["changed"].append({"path": json_pointer(key_path), "old": old, "new": value,
+                                          "translation": translation})
+        return merged
+
+    merged = {}
+    for key, value in new_en.items():
+        # Sekcje struktury są zawsze brane z nowego pliku angielskiego
+        if key in STRUCTURAL_SECTIONS:
+            merged[key] = value
+        elif isinstance(value, dict):
+            merged[key] = merge_node(value, (key,))
+        else:
+            merged.update(merge_node({key: value}, ()))
+
+    removed = [(path, translation) for path, translation in pl_index.items()
+               if path not in seen and path[0] not in STRUCTURAL_SECTIONS]
+    report["removed"] = [json_pointer(path) for path, _ in removed]
+    return merged, removed, report
+
+
+def quarantine(path, removed):
+    """
+    Dopisuje usunięte tłumaczenia do pliku kwarantanny, zachowując to, co już w nim było.
+    """
+    tree = read_translation(path) if os.path.exists(path) else {}
+    for key_path, translation in removed:
+        set_path(tree, key_path, translation)
+    write_translation(path, tree)
+
+
+def merge_file(new_en_path, en_dir=EN_DIR, pl_dir=PL_DIR, quarantine_dir=QUARANTINE_DIR, drop_removed=False,
+               update_en=False, dry_run=False):
+    """
+    Scala jeden plik z process_files z plikami o tej samej nazwie w en_dir i pl_dir; wynik trafia do pl_dir.
+
+    :return: Raport scalania.
+    """
+    name = os.path.basename(new_en_path)
+    old_en_path = os.path.join(en_dir, name)
+    pl_path = os.path.join(pl_dir, name)
+
+    new_en = read_translation(new_en_path)
+    old_en = read_translation(old_en_path) if os.path.exists(old_en_path) else None
+    pl = read_translation(pl_path) if os.path.exists(pl_path) else None
+
+    merged, removed, report = merge_translation(new_en, old_en, pl)
+    if not dry_run:
+        write_translation(pl_path, merged)
+        if removed and not drop_removed:
+            quarantine(os.path.join(quarantine_dir, name), removed)
+        if update_en:
+            write_translation(old_en_path, new_en)
+    return report
+
+
+def main():
+    parser = argparse.ArgumentParser(description='Scala nowe pliki angielskie z istniejącym tłumaczeniem.')
+    parser.add_argument('files', nargs='+', help='Nowe pliki angielskie z process_files (<wersja>.<pakiet>.json)')
+    parser.add_argument('--en-dir', default=EN_DIR, help='Katalog poprzednich plików angielskich')
+    parser.add_argument('--pl-dir', default=PL_DIR, help='Katalog tłumaczeń (scalony plik zastępuje obecny)')
+    parser.add_argument('--quarantine-dir', default=QUARANTINE_DIR, help='Katalog na tłumaczenia usuniętych kluczy')
+    parser.add_argument('--drop-removed', action='store_true', help='Usuwa tłumaczenia usuniętych kluczy')
+    parser.add_argument('--update-en', action='store_true', help='Zastępuje plik w --en-dir nowym plikiem angielskim')
+    parser.add_argument('--dry-run', action='store_true', help='Tylko raport, bez zapisu plików')
+    parser.add_argument('--report', help='Plik JSON z pełnym raportem (ścieżki nowych, zmienionych i usuniętych)')
+    args = parser.parse_args()
+
+    reports = {}
+    for path in args.files:
+        start = time.perf_counter()
+        report = merge_file(path, args.en_dir, args.pl_dir, args.quarantine_dir, args.drop_removed,
+                            args.update_en, args.dry_run)
+        elapsed = time.perf_counter() - start
+        reports[os.path.basename(path)] = report
+        print(f'{os.path.basename(path)}: bez zmian {report["kept"]}, nowe {len(report["added"])}, '
+              f'zmieniony angielski {len(report["changed"])}, zaktualizowane nieprzetłumaczone {report["updated"]}, '
+              f'usunięte {len(report["removed"])} ({elapsed * 1000:.0f} ms)')
+        for change in report["changed"]:
+            print(f'    do sprawdzenia: {change["path"]}')
+
+    if args.report:
+        with open(args.report, 'w', encoding='utf-8') as report_file:
+            json.dump(reports, report_file, ensure_ascii=False, indent=4)
+
+
+if __name__ == '__main__':
+    main()
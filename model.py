@@ -0,0 +1,151 @@
+"""
+Typowany model pośredni wpisów przygody (pakiet z 'caption'): przygoda, dzienniki, strony, sceny, aktorzy,
+przedmioty, tabele, playlisty.
+
+Schemat wyciągania (main.ADVENTURE_SCHEMA) tworzy dla każdego elementu kolekcji obiekt klasy z __slots__
+(dataclass) zamiast słownika. Obiekt nie ma własnego __dict__, więc jest mniejszy od słownika z tymi samymi polami;
+całe drzewo, w większości złożone z tekstów, zajmuje około 65% pamięci drzewa słowników
+(benchmarks/model_memory.py). Ma to znaczenie w przygodach z setkami aktorów i tysiącami ich przedmiotów,
+trzymanych w pamięci do zapisu pliku.
+
+Plik Babele powstaje z modelu wprost, przez main.write_transifex_dict: pola są zapisywane w kolejności __slots__
+(tej samej, w której schemat je wypełnia), nieustawione są pomijane, a oczyszczona kopia drzewa nie powstaje, więc
+szczyt pamięci przy zapisie jest niewiele wyższy od samego drzewa. Tylko pamięć tłumaczeń i segmenty (--dedup)
+potrzebują oczyszczonego słownika z postprocess_transifex_dict.
+"""
+import operator
+from dataclasses import dataclass
+
+
+class Record:
+    """
+    Wpis pliku tłumaczenia z polami w __slots__. Tam, gdzie kod czyta wpisy jak słowniki (schemat wyciągania,
+    StringTable.intern_tree, postprocess_transifex_dict, write_transifex_dict), działa jak słownik:
+    entry[pole] = wartość, entry[pole] i pole in entry, a record_items zastępuje dict.items (metoda items
+    zderzyłaby się z polem 'items' aktorów).
+
+    Nieustawione pole ma wartość None i, tak jak None w słowniku, nie trafia do pliku. Klasy wpisów są tworzone
+    dekoratorem record.
+    """
+    __slots__ = ()
+    __setitem__ = object.__setattr__
+    __getitem__ = object.__getattribute__
+
+    def __contains__(self, field):
+        return field in self.__slots__ and getattr(self, field) is not None
+
+    def field_values(self):
+        """
+        :return: Krotka wartości wszystkich pól, w kolejności __slots__.
+        """
+        return self.values_getter(self)
+
+    def __repr__(self):
+        return f'{type(self).__name__}({", ".join(f"{field}={value!r}" for field, value in record_items(self))})'
+
+
+def record(cls):
+    """
+    Dekorator klasy wpisu: dataclass z __slots__, w której każde pole ma domyślnie wartość None (odczyt
+    nieustawionego slotu kończyłby się kosztownym AttributeError), i z odczytem wszystkich pól naraz przez
+    operator.attrgetter.
+    """
+    cls = dataclass(slots=True, repr=False)(cls)
+    getter = operator.attrgetter(*cls.__slots__)
+    # attrgetter z jednym polem zwraca samą wartość, nie krotkę
+    cls.values_getter = staticmethod(getter if len(cls.__slots__) > 1 else lambda entry: (getter(entry),))
+    return cls
+
+
+def record_items(entry):
+    """
+    :return: Pary (pole, wartość) ustawionych pól, w kolejności __slots__.
+    """
+    return [(field, value) for field, value in zip(entry.__slots__, entry.field_values()) if value is not None]
+
+
+def tree_items(tree):
+    """
+    Pary (klucz, wartość) słownika albo wpisu modelu. Dla wpisu modelu są to wszystkie pola, także
+    nieustawione (None), które postprocess_transifex_dict i tak pomija.
+    """
+    return tree.items() if isinstance(tree, dict) else zip(tree.__slots__, tree.values_getter(tree))
+
+
+@record
+class Adventure(Record):
+    name: str | None = None
+    caption: str | None = None
+    description: str | None = None
+    folders: dict | None = None
+    journals: dict | None = None
+    scenes: dict | None = None
+    macros: dict | None = None
+    tables: dict | None = None
+    items: dict | None = None
+    playlists: dict | None = None
+    actors: dict | None = None
+
+
+@record
+class Journal(Record):
+    name: str | None = None
+    pages: dict | None = None
+
+
+@record
+class Page(Record):
+    name: str | None = None
+    text: str | None = None
+
+
+@record
+class Scene(Record):
+    name: str | None = None
+    notes: dict | None = None
+
+
+@record
+class Macro(Record):
+    name: str | None = None
+
+
+@record
+class Table(Record):
+    name: str | None = None
+    description: str | None = None
+    results: dict | None = None
+
+
+@record
+class Item(Record):
+    name: str | None = None
+    description: str | None = None
+    gmNote: str | None = None
+    unidentified: str | None = None
+    unidentified_desc: str | None = None
+
+
+@record
+class Playlist(Record):
+    name: str | None = None
+    description: str | None = None
+    sounds: dict | None = None
+
+
+@record
+class Sound(Record):
+    name: str | None = None
+    description: str | None = None
+
+
+@record
+class Actor(Record):
+    name: str | None = None
+    tokenName: str | None = None
+    publicNotes: str | None = None
+    blurb: str | None = None
+    privateNotes: str | None = None
+    description: str | None = None
+    languagesDetails: str | None = None
+    items: dict | None = None
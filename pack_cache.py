@@ -0,0 +1,212 @@
+"""
+Migawka pakietów LevelDB w SQLite: jeden wiersz na dokument, także osadzony (aktorzy przygody, ich przedmioty,
+strony dzienników...), z kolumnami z indeksem i pełnym JSON dokumentu.
+
+Migawkę uzupełnia export_leveldb_pack (main.py --snapshot), przy tym samym otwarciu bazy LevelDB. Odświeżanie
+jest przyrostowe: niezmieniony pakiet jest pomijany, a w zmienionym dekodowane i zapisywane są tylko dokumenty,
+których skrót wartości się zmienił. Zapytania korzystają z indeksów i json_extract, bez ponownego dekodowania
+LevelDB ani przeszukiwania plików JSON.
+
+Uruchomienie z katalogu repozytorium:
+    python pack_cache.py stats
+    python pack_cache.py query "SELECT name FROM documents WHERE collection = 'items' AND compendium_source IS NULL"
+    python pack_cache.py export pf2e-rusthenge adventures rusthenge.adventures.json
+"""
+import argparse
+import hashlib
+import json
+import os
+import sqlite3
+
+SNAPSHOT_PATH = '.cache/packs.sqlite'
+# Ścieżka (JSON Pointer) dokumentu najwyższego poziomu, czyli wartości zapisanej pod kluczem LevelDB
+ROOT_PATH = ''
+
+SCHEMA = '''
+CREATE TABLE IF NOT EXISTS packs (
+    module TEXT NOT NULL,
+    pack TEXT NOT NULL,
+    hash TEXT NOT NULL,
+    PRIMARY KEY (module, pack)
+);
+CREATE TABLE IF NOT EXISTS documents (
+    module TEXT NOT NULL,
+    pack TEXT NOT NULL,
+    key TEXT NOT NULL,
+    path TEXT NOT NULL,
+    parent_path TEXT,
+    collection TEXT,
+    id TEXT,
+    type TEXT,
+    name TEXT,
+    compendium_source TEXT,
+    digest TEXT,
+    document TEXT NOT NULL,
+    PRIMARY KEY (module, pack, key, path)
+);
+CREATE INDEX IF NOT EXISTS documents_pack ON documents(pack);
+CREATE INDEX IF NOT EXISTS documents_collection ON documents(collection);
+CREATE INDEX IF NOT EXISTS documents_type ON documents(type);
+CREATE INDEX IF NOT EXISTS documents_id ON documents(id);
+CREATE INDEX IF NOT EXISTS documents_name ON documents(name);
+CREATE INDEX IF NOT EXISTS documents_compendium_source ON documents(compendium_source);
+'''
+
+
+def value_digest(value):
+    # Ten sam skrót co w manifeście zrzutu (main.hash_value)
+    return hashlib.blake2b(value, digest_size=16).hexdigest()
+
+
+def pack_identity(leveldb_folder):
+    """
+    Moduł i pakiet z katalogu bazy LevelDB, np. 'pack_adventure/pf2e-rusthenge/packs/adventures'
+    -> ('pf2e-rusthenge', 'adventures').
+    """
+    parts = leveldb_folder.replace('\\', '/').rstrip('/').split('/')
+    module = parts[-3] if len(parts) >= 3 and parts[-2] == 'packs' else ''
+    return module, parts[-1]
+
+
+def is_embedded_collection(value):
+    return isinstance(value, list) and bool(value) and all(isinstance(item, dict) and '_id' in item for item in value)
+
+
+def iter_embedded(document, path=ROOT_PATH):
+    """
+    Dokument i wszystkie osadzone w nim dokumenty. Osadzona kolekcja to lista słowników z '_id'. Wartość, która
+    nie jest słownikiem, nie ma osadzonych dokumentów.
+
+    :return: Generator krotek (ścieżka, ścieżka rodzica, kolekcja, dokument).
+    """
+    stack = [(path, None, None, document)]
+    while stack:
+        current_path, parent_path, collection, current = stack.pop()
+        yield current_path, parent_path, collection, current
+        if not isinstance(current, dict):
+            continue
+        for key, value in reversed(list(current.items())):
+            if is_embedded_collection(value):
+                for item in reversed(value):
+                    item_path = f'{current_path}/{key}/{str(item["_id"]).replace("~", "~0").replace("/", "~1")}'
+                    stack.append((item_path, current_path, key, item))
+
+
+def document_row(module, pack, key, path, parent_path, collection, document, digest=None):
+    if not isinstance(document, dict):
+        # Wartość LevelDB, która nie jest dokumentem (lista, tekst, liczba), trafia do migawki bez zmian, tak jak
+        # do zrzutu JSON, tylko bez kolumn z polami dokumentu
+        return (module, pack, key, path, parent_path, collection, None, None, None, None, digest,
+                json.dumps(document, ensure_ascii=False))
+    stats = document.get('_stats')
+    compendium_source = stats.get('compendiumSource') if isinstance(stats, dict) else None
+    name = document.get('name')
+    return (module, pack, key, path, parent_path, collection, document.get('_id'), document.get('type'),
+            name if isinstance(name, str) else None, compendium_source, digest,
+            json.dumps(document, ensure_ascii=False))
+
+
+class PackCache:
+    def __init__(self, path=SNAPSHOT_PATH):
+        directory = os.path.dirname(path)
+        if directory:
+            os.makedirs(directory, exist_ok=True)
+        self.path = path
+        # Pakiety są zrzucane równolegle w kilku procesach, więc czekamy na blokadę zamiast zgłaszać błąd
+        self.connection = sqlite3.connect(path, timeout=300)
+        self.connection.execute('PRAGMA journal_mode=WAL')
+        self.connection.executescript(SCHEMA)
+
+    def close(self):
+        self.connection.close()
+
+    def __enter__(self):
+        return self
+
+    def __exit__(self, *exc_info):
+        self.close()
+
+    def refresh(self, module, pack, db, decode):
+        """
+        Uzgadnia migawkę pakietu z bazą LevelDB.
+
+        :param module: Identyfikator modułu.
+        :param pack: Nazwa pakietu.
+        :param db: Otwarta baza plyvel.DB (albo iterowalny zbiór par klucz, wartość w bajtach).
+        :param decode: Funkcja zamieniająca wartość LevelDB na dokument (jak w iter_leveldb_documents).
+        :return: Liczba dokumentów najwyższego poziomu zapisanych na nowo.
+        """
+        digests = {key.decode('latin-1'): value_digest(value) for key, value in db}
+        pack_hash = value_digest(json.dumps(digests).encode())
+        row = self.connection.execute('SELECT hash FROM packs WHERE module = ? AND pack = ?',
+                                      (module, pack)).fetchone()
+        if row and row[0] == pack_hash:
+            return 0
+
+        stored = dict(self.connection.execute(
+            'SELECT key, digest FROM documents WHERE module = ? AND pack = ? AND path = ?', (module, pack, ROOT_PATH)))
+        changed = {key for key, digest in digests.items() if stored.get(key) != digest}
+        removed = [(module, pack, key) for key in stored if key not in digests or key in changed]
+
+        rows = []
+        for raw_key, value in db:
+            key = raw_key.decode('latin-1')
+            if key not in changed:
+                continue
+            for path, parent_path, collection, document in iter_embedded(decode(value)):
+                rows.append(document_row(module, pack, key, path, parent_path, collection, document,
+                                         digests[key] if path == ROOT_PATH else None))
+
+        with self.connection:
+            self.connection.executemany('DELETE FROM documents WHERE module = ? AND pack = ? AND key = ?', removed)
+            self.connection.executemany('INSERT OR REPLACE INTO documents VALUES (?, ?, ?, ?, ?, ?, ?, ?, ?, ?, ?, ?)',
+                                        rows)
+            self.connection.execute('INSERT OR REPLACE INTO packs VALUES (?, ?, ?)', (module, pack, pack_hash))
+        return len(changed)
+
+    def iter_documents(self, module, pack):
+        """
+        Dokumenty najwyższego poziomu pakietu w kolejności kluczy LevelDB, czyli tak jak w zrzucie JSON.
+        """
+        rows = self.connection.execute('SELECT document FROM documents WHERE module = ? AND pack = ? AND path = ? '
+                                       'ORDER BY key', (module, pack, ROOT_PATH))
+        for (document,) in rows:
+            yield json.loads(document)
+
+    def query(self, sql, parameters=()):
+        cursor = self.connection.execute(sql, parameters)
+        return [column[0] for column in cursor.description or ()], cursor.fetchall()
+
+
+def main():
+    parser = argparse.ArgumentParser(description='Migawka pakietów LevelDB w SQLite.')
+    parser.add_argument('--db', default=SNAPSHOT_PATH, help='Plik bazy SQLite')
+    commands = parser.add_subparsers(dest='command', required=True)
+    commands.add_parser('stats', help='Liczba dokumentów w pakietach')
+    query = commands.add_parser('query', help='Wykonuje zapytanie SQL (tabele packs i documents)')
+    query.add_argument('sql')
+    export = commands.add_parser('export', help='Zapisuje pakiet z migawki jako plik JSON jak zrzut LevelDB')
+    export.add_argument('module')
+    export.add_argument('pack')
+    export.add_argument('output')
+    args = parser.parse_args()
+
+    with PackCache(args.db) as cache:
+        if args.command == 'stats':
+            args.sql = ('SELECT module, pack, collection, COUNT(*) AS documents FROM documents '
+                        'GROUP BY module, pack, collection ORDER BY module, pack, collection')
+        if args.command == 'export':
+            # Import tutaj, bo main.py importuje ten moduł
+            from main import write_json_array
+            with open(args.output, 'w', encoding='utf-8') as json_file:
+                write_json_array(cache.iter_documents(args.module, args.pack), json_file)
+            return
+
+        columns, rows = cache.query(args.sql)
+        print('\t'.join(columns))
+        for row in rows:
+            print('\t'.join('' if value is None else str(value) for value in row))
+
+
+if __name__ == '__main__':
+    main()
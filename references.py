@@ -0,0 +1,208 @@
+"""
+Indeks identyfikatorów dokumentów z pakietów i sprawdzanie odwołań @UUID[...] w plikach tłumaczeń.
+
+Indeks zbiera _id wszystkich dokumentów (także osadzonych) ze zrzuconych pakietów pack_adventure/*/output/*.json
+i jest zapisywany w .cache według skrótu każdego pakietu, więc po aktualizacji przygody przeliczane są tylko
+zmienione pakiety. Pliki tłumaczeń są przeglądane raz, jednym wyrażeniem regularnym, a każde odwołanie jest
+zgłaszane z plikiem i ścieżką kluczy (JSON Pointer) jako:
+    dangling      - dokumentu nie ma w żadnym zaindeksowanym pakiecie
+    renamed       - dokument jest, ale w innym pakiecie lub module niż w odwołaniu (zmieniona nazwa pakietu)
+    cross-module  - odwołanie do kompendium innej przygody
+    stale         - odwołanie w lang/pl, którego nie ma już w tym samym tekście w lang/en (np. po aktualizacji)
+Odwołania do kompendiów systemu (Compendium.pf2e...) i moduły bez zrzuconych pakietów są tylko liczone.
+
+Uruchomienie z katalogu repozytorium:
+    python references.py [--packs 'pack_adventure/*/output/*.json'] [--json references.json]
+"""
+import argparse
+import glob
+import json
+import os
+import re
+import sys
+import time
+
+from pack_cache import iter_embedded
+from translations import (EN_DIR, PL_DIR, cached_pair_results, iter_leaves, json_pointer, read_translation,
+                          translation_pairs)
+
+INDEX_PATH = '.cache/uuid-index.json'
+PACKS_PATTERN = 'pack_adventure/*/output/*.json'
+FOLDERS_SUFFIX = '_folders'
+UUID_PATTERN = re.compile(r'@UUID\[([^\]#]+)(?:#[^\]]*)?\](?:\{[^}]*\})?')
+# Pakiety systemu, a nie przygód; odwołania do nich nie są sprawdzane
+SYSTEM_PACKAGES = ('pf2e',)
+# Typy dokumentów świata, do których odwołują się przygody po zaimportowaniu (JournalEntry.<id>...)
+WORLD_TYPES = ('Actor', 'Adventure', 'Cards', 'Folder', 'Item', 'JournalEntry', 'Macro', 'Playlist', 'RollTable',
+               'Scene')
+CATEGORIES = ('dangling', 'renamed', 'cross-module', 'stale')
+
+
+def pack_ids(path):
+    """
+    Wszystkie _id dokumentów pakietu, także osadzonych (aktorzy i dzienniki przygody, strony, przedmioty...).
+    """
+    with open(path, 'r', encoding='utf-8') as json_file:
+        documents = json.load(json_file)
+    ids = set()
+    for document in documents if isinstance(documents, list) else [documents]:
+        if isinstance(document, dict):
+            ids.update(str(embedded['_id']) for _, _, _, embedded in iter_embedded(document) if '_id' in embedded)
+    return sorted(ids)
+
+
+def pack_location(path):
+    """
+    Moduł i pakiet zrzutu, np. 'pack_adventure/pf2e-rusthenge/output/adventures.json' -> ('pf2e-rusthenge', 'adventures').
+    """
+    folder = os.path.dirname(os.path.abspath(path))
+    pack = os.path.splitext(os.path.basename(path))[0]
+    if pack.endswith(FOLDERS_SUFFIX):
+        pack = pack[:-len(FOLDERS_SUFFIX)]
+    return os.path.basename(os.path.dirname(folder)), pack
+
+
+class ReferenceIndex:
+    def __init__(self, packs):
+        """
+        :param packs: Słownik ścieżka zrzutu -> {"module": ..., "pack": ..., "ids": [...]}.
+        """
+        self.pack_ids = {}
+        self.locations = {}
+        for entry in packs.values():
+            location = (entry["module"], entry["pack"])
+            ids = self.pack_ids.setdefault(location, set())
+            ids.update(entry["ids"])
+            for document_id in entry["ids"]:
+                self.locations.setdefault(document_id, set()).add(location)
+        self.modules = {module for module, _ in self.pack_ids}
+
+    def module_has(self, module, document_id):
+        return any(module == location[0] for location in self.locations.get(document_id, ()))
+
+    def check(self, uuid, file_module):
+        """
+        :return: Krotka (kategoria albo None dla poprawnego odwołania, opis) albo None, gdy odwołania nie da się
+                 sprawdzić (system, moduł bez zrzuconych pakietów, nieznany format).
+        """
+        parts = uuid.split('.')
+        if parts[0] == 'Compendium' and len(parts) >= 4:
+            module, pack, rest = parts[1], parts[2], parts[3:]
+            # Compendium.<moduł>.<pakiet>.<Typ>.<id>[.<Typ>.<id>] albo starsze Compendium.<moduł>.<pakiet>.<id>
+            ids = rest[1::2] if len(rest) % 2 == 0 else rest[:1]
+        elif parts[0] in WORLD_TYPES and len(parts) >= 2:
+            module, pack, ids = file_module, None, parts[1::2]
+        elif parts[0] == '' and len(parts) == 2:
+            # Odwołanie względne (.<id>) do strony tego samego dziennika
+            module, pack, ids = file_module, None, parts[1:]
+        else:
+            return None
+
+        if module in SYSTEM_PACKAGES or module not in self.modules:
+            return ('cross-module', f'moduł {module} nie jest zaindeksowany') \
+                if module != file_module and module not in SYSTEM_PACKAGES else None
+
+        for document_id in ids:
+            found = document_id in self.pack_ids.get((module, pack), ()) if pack else \
+                self.module_has(module, document_id)
+            if found:
+                continue
+            elsewhere = sorted(self.locations.get(document_id, ()))
+            if elsewhere:
+                return 'renamed', 'jest w ' + ', '.join(f'{other_module}.{other_pack}'
+                                                         for other_module, other_pack in elsewhere)
+            return 'dangling', f'brak dokumentu {document_id}'
+
+        if module != file_module:
+            return 'cross-module', f'{module}.{pack}'
+        return None, ''
+
+
+def build_index(patterns=(PACKS_PATTERN,), index_path=INDEX_PATH, workers=None):
+    """
+    Uzupełnia zapisany indeks o zmienione pakiety.
+
+    :return: Krotka (ReferenceIndex, liczba przeliczonych pakietów).
+    """
+    paths = sorted({path for pattern in patterns for path in glob.glob(pattern)})
+    ids, indexed = cached_pair_results([(path, path) for path in paths], index_path, pack_ids, __file__, workers)
+    packs = {}
+    for path in paths:
+        module, pack = pack_location(path)
+        packs[path] = {"module": module, "pack": pack, "ids": ids[path]}
+    return ReferenceIndex(packs), indexed
+
+
+def iter_references(tree):
+    """
+    :return: Generator krotek (ścieżka kluczy, UUID) w kolejności pliku.
+    """
+    for path, value in iter_leaves(tree):
+        if isinstance(value, str) and '@UUID' in value:
+            for match in UUID_PATTERN.finditer(value):
+                yield path, match.group(1)
+
+
+def check_translations(index, en_dir=EN_DIR, pl_dir=PL_DIR):
+    """
+    :return: Krotka (lista problemów {"category", "file", "path", "uuid", "detail"}, liczniki odwołań).
+    """
+    problems = []
+    counts = {"references": 0, "checked": 0, "unchecked": 0}
+    for name, en_path, pl_path in translation_pairs(en_dir, pl_dir):
+        file_module = name.split('.')[0]
+        en_references = {}
+        for language, path in (('en', en_path), ('pl', pl_path)):
+            if not path:
+                continue
+            for keys, uuid in iter_references(read_translation(path)):
+                counts["references"] += 1
+                location = {"file": path, "path": json_pointer(keys), "uuid": uuid}
+                if language == 'en':
+                    en_references.setdefault(keys, set()).add(uuid)
+                elif uuid not in en_references.get(keys, ()):
+                    problems.append({"category": "stale", **location, "detail": 'nie ma go w tekście angielskim'})
+
+                result = index.check(uuid, file_module)
+                if result is None:
+                    counts["unchecked"] += 1
+                    continue
+                counts["checked"] += 1
+                category, detail = result
+                if category:
+                    problems.append({"category": category, **location, "detail": detail})
+    return problems, counts
+
+
+def main():
+    parser = argparse.ArgumentParser(description='Sprawdza odwołania @UUID w plikach tłumaczeń.')
+    parser.add_argument('--packs', action='append', help=f'Wzorzec plików zrzutu pakietów (domyślnie {PACKS_PATTERN})')
+    parser.add_argument('--en-dir', default=EN_DIR)
+    parser.add_argument('--pl-dir', default=PL_DIR)
+    parser.add_argument('--json', help='Zapisuje listę problemów do pliku JSON')
+    parser.add_argument('--workers', type=int, default=None, help='Liczba procesów indeksowania')
+    args = parser.parse_args()
+
+    start = time.perf_counter()
+    index, indexed = build_index(args.packs or [PACKS_PATTERN], workers=args.workers)
+    problems, counts = check_translations(index, args.en_dir, args.pl_dir)
+
+    for problem in problems:
+        print(f'{problem["category"]:<13} {problem["file"]} {problem["path"]}\n'
+              f'              @UUID[{problem["uuid"]}]: {problem["detail"]}')
+    summary = ', '.join(f'{category}: {sum(problem["category"] == category for problem in problems)}'
+                        for category in CATEGORIES)
+    print(f'Odwołania: {counts["references"]} (sprawdzone: {counts["checked"]}, bez indeksu lub systemowe: '
+          f'{counts["unchecked"]}); {summary}')
+    print(f'Pakiety w indeksie: {len(index.pack_ids)} (przeliczone: {indexed}), '
+          f'czas {time.perf_counter() - start:.2f} s')
+
+    if args.json:
+        with open(args.json, 'w', encoding='utf-8') as json_file:
+            json.dump(problems, json_file, ensure_ascii=False, indent=4)
+    if any(problem["category"] in ('dangling', 'renamed', 'stale') for problem in problems):
+        sys.exit(1)
+
+
+if __name__ == '__main__':
+    main()
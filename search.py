@@ -0,0 +1,248 @@
+"""
+Wyszukiwanie pełnotekstowe we wszystkich plikach tłumaczeń: jak dotąd przetłumaczono nazwę, termin albo zdanie.
+
+Każdy liść plików lang/en jest zapisywany w SQLite (FTS5) razem z odpowiadającym mu tekstem z lang/pl, nazwą
+przygody i ścieżką kluczy, jako czysty tekst (bez znaczników HTML i celów wzbogaceń @UUID[...]). Wyszukiwanie
+nie rozróżnia wielkości liter ani polskich znaków: 'rdzawy krag' znajduje 'Rdzawy Krąg'. Tokenizator unicode61
+usuwa znaki diakrytyczne poza 'ł', które jest zamieniane na 'l' przed indeksowaniem i w zapytaniu.
+
+Indeks jest uzupełniany przed każdym wyszukiwaniem, ale tylko o pary plików, które zmieniły się od ostatniego
+razu (skrót obu plików w tabeli files); zmienione pliki są czytane równolegle.
+
+Uruchomienie z katalogu repozytorium:
+    python search.py build [--force]
+    python search.py query "Rusthenge" [--lang pl] [--adventure pf2e-rusthenge] [--phrase] [--full]
+"""
+import argparse
+import html
+import os
+import re
+import sqlite3
+import time
+
+from segments import is_segment_reference
+from translations import (EN_DIR, PL_DIR, STRUCTURAL_SECTIONS, iter_leaves, json_pointer, map_changed_pairs,
+                          read_translation, translation_pairs)
+
+INDEX_PATH = '.cache/search.sqlite'
+LANGUAGES = ('en', 'pl')
+# Znaczniki HTML i cele wzbogaceń; etykiety w nawiasach klamrowych zostają, bo są tekstem
+MARKUP_PATTERN = re.compile(r'<[^>]+>|@\w+\[(?:[^\[\]]|\[[^\[\]]*\])*\]')
+SPACE_PATTERN = re.compile(r'\s+')
+# unicode61 z remove_diacritics nie zamienia 'ł' (nie ma rozkładu na literę i znak diakrytyczny); zamiana
+# znak na znak zachowuje pozycje, więc wyróżnienia z tekstu w indeksie pasują do tekstu oryginalnego
+FOLDED_CHARACTERS = (('ł', 'l'), ('Ł', 'L'))
+HIGHLIGHT_START = '\x02'
+HIGHLIGHT_END = '\x03'
+EXCERPT_LENGTH = 160
+
+SCHEMA = '''
+CREATE TABLE IF NOT EXISTS files (name TEXT PRIMARY KEY, digest TEXT NOT NULL);
+CREATE TABLE IF NOT EXISTS segments (
+    id INTEGER PRIMARY KEY,
+    file TEXT NOT NULL,
+    adventure TEXT NOT NULL,
+    path TEXT NOT NULL,
+    en TEXT NOT NULL,
+    pl TEXT
+);
+CREATE INDEX IF NOT EXISTS segments_file ON segments(file);
+CREATE VIRTUAL TABLE IF NOT EXISTS segments_fts USING fts5(
+    en, pl, tokenize = 'unicode61 remove_diacritics 2'
+);
+'''
+
+
+def plain_text(value):
+    return SPACE_PATTERN.sub(' ', html.unescape(MARKUP_PATTERN.sub(' ', value))).strip()
+
+
+def fold(text):
+    # str.replace jest wielokrotnie szybsze od str.translate dla tekstów spoza ASCII
+    for character, replacement in FOLDED_CHARACTERS:
+        text = text.replace(character, replacement)
+    return text
+
+
+def file_segments(en_path, pl_path):
+    """
+    Teksty pliku w kolejności pliku angielskiego.
+
+    :return: Lista krotek (JSON Pointer, tekst angielski, tekst polski albo None), oba jako czysty tekst.
+    """
+    pl_leaves = dict(iter_leaves(read_translation(pl_path))) if pl_path else {}
+    segments = []
+    for path, source in iter_leaves(read_translation(en_path)):
+        # Odwołania do segmentów nie są tekstem, sam segment leży w sekcji 'segments'
+        if path[0] in STRUCTURAL_SECTIONS or not isinstance(source, str) or is_segment_reference(source):
+            continue
+        en = plain_text(source)
+        if not en:
+            continue
+        target = pl_leaves.get(path)
+        segments.append((json_pointer(path), en, plain_text(target) if isinstance(target, str) else None))
+    return segments
+
+
+def restore_highlight(original, highlighted):
+    """
+    Przenosi znaczniki wyróżnienia z tekstu zapisanego w indeksie (po fold) na tekst oryginalny.
+    """
+    characters = []
+    position = 0
+    for character in highlighted:
+        if character in (HIGHLIGHT_START, HIGHLIGHT_END):
+            characters.append(character)
+        else:
+            characters.append(original[position])
+            position += 1
+    return ''.join(characters)
+
+
+def excerpt(text, length=EXCERPT_LENGTH):
+    """
+    Fragment tekstu wokół pierwszego wyróżnienia (albo jego początek), z wyróżnieniami jako [[...]].
+    """
+    start = max(0, text.find(HIGHLIGHT_START) - length // 3)
+    end = start + length
+    fragment = text[start:end]
+    if fragment.count(HIGHLIGHT_START) > fragment.count(HIGHLIGHT_END):
+        fragment += HIGHLIGHT_END
+    fragment = fragment.replace(HIGHLIGHT_START, '[[').replace(HIGHLIGHT_END, ']]')
+    return f'{"…" if start else ""}{fragment}{"…" if end < len(text) else ""}'
+
+
+def fts_query(text, phrase=False):
+    """
+    Zapytanie FTS5 z tekstu użytkownika: wszystkie słowa (każde jako osobny termin, więc '-' czy ':' nie są
+    składnią FTS5), albo całe wyrażenie przy phrase=True. Słowo zakończone '*' pasuje jako przedrostek.
+    """
+    words = [word for word in fold(text).replace('"', ' ').split() if word.rstrip('*')]
+    if phrase:
+        return '"' + ' '.join(word.rstrip('*') for word in words) + '"'
+    return ' '.join(f'"{word.rstrip("*")}"' + ('*' if word.endswith('*') else '') for word in words)
+
+
+class SearchIndex:
+    def __init__(self, path=INDEX_PATH):
+        directory = os.path.dirname(path)
+        if directory:
+            os.makedirs(directory, exist_ok=True)
+        self.connection = sqlite3.connect(path)
+        self.connection.executescript(SCHEMA)
+
+    def close(self):
+        self.connection.close()
+
+    def __enter__(self):
+        return self
+
+    def __exit__(self, *exc_info):
+        self.close()
+
+    def remove_file(self, name):
+        self.connection.execute('DELETE FROM segments_fts WHERE rowid IN (SELECT id FROM segments WHERE file = ?)',
+                                (name,))
+        self.connection.execute('DELETE FROM segments WHERE file = ?', (name,))
+        self.connection.execute('DELETE FROM files WHERE name = ?', (name,))
+
+    def update(self, en_dir=EN_DIR, pl_dir=PL_DIR, force=False, workers=None):
+        """
+        Przelicza w indeksie tylko pary plików, które się zmieniły (wszystkie przy force=True), i usuwa pliki,
+        których już nie ma.
+
+        :return: Liczba przeliczonych plików.
+        """
+        pairs = translation_pairs(en_dir, pl_dir)
+        indexed = {} if force else dict(self.connection.execute('SELECT name, digest FROM files'))
+        digests, changed = map_changed_pairs(pairs, file_segments, __file__, indexed, workers)
+
+        with self.connection:
+            for (name,) in self.connection.execute('SELECT name FROM files').fetchall():
+                if name not in digests:
+                    self.remove_file(name)
+            for name, segments in changed.items():
+                self.remove_file(name)
+                first_id = self.connection.execute('SELECT COALESCE(MAX(id), 0) + 1 FROM segments').fetchone()[0]
+                rows = [(row_id, name, name.split('.')[0], path, en, pl)
+                        for row_id, (path, en, pl) in enumerate(segments, first_id)]
+                self.connection.executemany('INSERT INTO segments VALUES (?, ?, ?, ?, ?, ?)', rows)
+                self.connection.executemany('INSERT INTO segments_fts (rowid, en, pl) VALUES (?, ?, ?)',
+                                            [(row[0], fold(row[4]), fold(row[5]) if row[5] else None) for row in rows])
+                self.connection.execute('INSERT INTO files VALUES (?, ?)', (name, digests[name]))
+        return len(changed)
+
+    def search(self, text, language=None, adventure=None, phrase=False, limit=20):
+        """
+        Teksty pasujące do zapytania, od najlepiej pasujących (bm25).
+
+        :param language: 'en' albo 'pl', żeby szukać tylko w jednym języku.
+        :param adventure: Część nazwy pliku lub identyfikatora przygody.
+        :return: Lista słowników {"file", "adventure", "path", "en", "pl"}; teksty mają wyróżnienia
+                 HIGHLIGHT_START/HIGHLIGHT_END.
+        """
+        if not fts_query(text):
+            return []
+        query = fts_query(text, phrase)
+        if language:
+            query = f'{language} : ({query})'
+        sql = (f'SELECT segments.file, segments.adventure, segments.path, segments.en, segments.pl, '
+               f'highlight(segments_fts, 0, ?, ?), highlight(segments_fts, 1, ?, ?) '
+               f'FROM segments_fts JOIN segments ON segments.id = segments_fts.rowid '
+               f'WHERE segments_fts MATCH ?{" AND segments.file LIKE ?" if adventure else ""} '
+               f'ORDER BY rank LIMIT ?')
+        parameters = [HIGHLIGHT_START, HIGHLIGHT_END] * 2 + [query] + ([f'%{adventure}%'] if adventure else [])
+        results = []
+        for file, adventure_name, path, en, pl, en_highlighted, pl_highlighted in \
+                self.connection.execute(sql, (*parameters, limit)):
+            results.append({"file": file, "adventure": adventure_name, "path": path,
+                            "en": restore_highlight(en, en_highlighted),
+                            "pl": restore_highlight(pl, pl_highlighted) if pl else None})
+        return results
+
+
+def main():
+    parser = argparse.ArgumentParser(description='Wyszukiwanie pełnotekstowe w lang/en i lang/pl.')
+    parser.add_argument('--db', default=INDEX_PATH, help='Plik bazy SQLite')
+    parser.add_argument('--en-dir', default=EN_DIR)
+    parser.add_argument('--pl-dir', default=PL_DIR)
+    parser.add_argument('--workers', type=int, default=None, help='Liczba procesów czytających pliki')
+    commands = parser.add_subparsers(dest='command', required=True)
+    build = commands.add_parser('build', help='Uzupełnia indeks o zmienione pliki')
+    build.add_argument('--force', action='store_true', help='Przelicza wszystkie pliki')
+    query = commands.add_parser('query', help='Szuka tekstu w obu językach')
+    query.add_argument('text', help="Słowa do znalezienia (wszystkie); 'słowo*' pasuje jako przedrostek")
+    query.add_argument('--lang', choices=LANGUAGES, help='Szuka tylko w tekstach w jednym języku')
+    query.add_argument('--adventure', help='Tylko pliki, których nazwa zawiera ten tekst')
+    query.add_argument('--phrase', action='store_true', help='Słowa muszą wystąpić obok siebie, w tej kolejności')
+    query.add_argument('--limit', type=int, default=20)
+    query.add_argument('--full', action='store_true', help='Wypisuje całe teksty zamiast fragmentów')
+    args = parser.parse_args()
+
+    with SearchIndex(args.db) as index:
+        start = time.perf_counter()
+        updated = index.update(args.en_dir, args.pl_dir, force=getattr(args, 'force', False), workers=args.workers)
+        if updated or args.command == 'build':
+            count = index.connection.execute('SELECT COUNT(*) FROM segments').fetchone()[0]
+            print(f'Indeks: {count} tekstów, przeliczono {updated} plików w {time.perf_counter() - start:.2f} s')
+
+        if args.command == 'query':
+            start = time.perf_counter()
+            results = index.search(args.text, args.lang, args.adventure, args.phrase, args.limit)
+            elapsed = time.perf_counter() - start
+            for result in results:
+                print(f'{result["file"]} {result["path"]}')
+                for language in LANGUAGES:
+                    text = result[language]
+                    if text is None:
+                        text = '(brak tłumaczenia)'
+                    elif args.full:
+                        text = text.replace(HIGHLIGHT_START, '[[').replace(HIGHLIGHT_END, ']]')
+                    else:
+                        text = excerpt(text)
+                    print(f'    {language}: {text}')
+            print(f'Wyniki: {len(results)} ({elapsed * 1000:.1f} ms)')
+
+
+if __name__ == '__main__':
+    main()
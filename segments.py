@@ -0,0 +1,162 @@
+"""
+Powtarzające się teksty w plikach tłumaczeń.
+
+Te same opisy ataków, czarów i ekwipunku są kopiowane do każdego aktora, który je ma, więc w dużych przygodach
+jeden tekst występuje w pliku dziesiątki razy. StringTable pozwala trzymać w pamięci jedną kopię każdego tekstu
+i liczy powtórzenia, a deduplicate przenosi powtarzające się długie teksty do sekcji 'segments', zostawiając
+w ich miejscu odwołanie '@segment:<id>'. Tłumacz tłumaczy taki tekst raz, a build_release.py rozwija odwołania
+z powrotem (expand), zanim pliki trafią do Babele.
+
+Uruchomienie z katalogu repozytorium:
+    python segments.py stats lang/en/pf2e-abomination-vaults.av.json
+    python segments.py dedup plik.json [--output plik.dedup.json]
+    python segments.py expand plik.dedup.json [--output plik.json]
+"""
+import argparse
+import hashlib
+
+from model import Record, tree_items
+from translations import STRUCTURAL_SECTIONS, iter_leaves, map_leaves, read_translation, write_translation
+
+SEGMENTS_KEY = 'segments'
+REFERENCE_PREFIX = '@segment:'
+# Krótsze teksty (nazwy, pojedyncze zdania) zostają na miejscu, bo odwołanie niewiele by oszczędziło
+SEGMENT_MIN_LENGTH = 80
+# Sekcje plików, które nie zawierają tekstu do tłumaczenia albo nie mogą zawierać odwołań
+SKIPPED_SECTIONS = ('label', *STRUCTURAL_SECTIONS, SEGMENTS_KEY)
+
+
+class StringTable:
+    """
+    Tabela tekstów jednego pakietu. intern zwraca wspólną kopię tekstu i liczy jego wystąpienia; bez keep
+    zapamiętywany jest tylko skrót tekstu (tryb strumieniowy, w którym wpisy i tak nie zostają w pamięci).
+    """
+    def __init__(self, keep=True):
+        self.keep = keep
+        self.strings = {}
+        self.texts = 0
+        self.repeated = 0
+        self.repeated_bytes = 0
+
+    def intern(self, value):
+        if not isinstance(value, str) or not value:
+            return value
+        self.texts += 1
+        key = value if self.keep else hashlib.blake2b(value.encode('utf-8'), digest_size=16).digest()
+        known = self.strings.get(key)
+        if known is None:
+            self.strings[key] = value if self.keep else True
+            return value
+        self.repeated += 1
+        self.repeated_bytes += len(value.encode('utf-8'))
+        return known if self.keep else value
+
+    def intern_tree(self, tree):
+        """
+        Zastępuje w drzewie (na miejscu) każdy tekst jego wspólną kopią.
+        """
+        for key, value in tree_items(tree):
+            if isinstance(value, (dict, Record)):
+                self.intern_tree(value)
+            else:
+                tree[key] = self.intern(value)
+
+    def stats(self):
+        return {"texts": self.texts, "unique": len(self.strings), "repeated": self.repeated,
+                "repeated_bytes": self.repeated_bytes}
+
+
+def segment_id(text):
+    return hashlib.blake2b(text.encode('utf-8'), digest_size=8).hexdigest()
+
+
+def is_segment_reference(value):
+    return isinstance(value, str) and value.startswith(REFERENCE_PREFIX)
+
+
+def deduplicate(tree, min_length=SEGMENT_MIN_LENGTH):
+    """
+    Przenosi teksty występujące w pliku co najmniej dwa razy i nie krótsze niż min_length do sekcji 'segments'.
+    Identyfikator segmentu to skrót tekstu angielskiego, więc po zmianie tekstu powstaje nowy segment,
+    a merge.py przenosi tłumaczenie starego do kwarantanny jak każdy usunięty klucz.
+
+    :return: Krotka (nowe drzewo, liczba segmentów, liczba zastąpionych wystąpień).
+    """
+    counts = {}
+    for path, value in iter_leaves(tree):
+        if path[0] not in SKIPPED_SECTIONS and isinstance(value, str) and len(value) >= min_length:
+            counts[value] = counts.get(value, 0) + 1
+
+    segments = dict(tree.get(SEGMENTS_KEY, {}))
+    replaced = 0
+
+    def replace(path, value):
+        nonlocal replaced
+        if counts.get(value, 0) < 2:
+            return value
+        identifier = segment_id(value)
+        segments[identifier] = value
+        replaced += 1
+        return REFERENCE_PREFIX + identifier
+
+    deduplicated = {key: map_leaves(value, replace) if key not in SKIPPED_SECTIONS and isinstance(value, dict)
+                    else value for key, value in tree.items() if key != SEGMENTS_KEY}
+    if segments:
+        deduplicated[SEGMENTS_KEY] = dict(sorted(segments.items()))
+    return deduplicated, len(segments), replaced
+
+
+def expand(tree):
+    """
+    Odwrotność deduplicate: drzewo bez sekcji 'segments', z odwołaniami zastąpionymi tekstami segmentów.
+    """
+    segments = tree.get(SEGMENTS_KEY)
+    if not segments:
+        return tree
+
+    def resolve(path, value):
+        if not is_segment_reference(value):
+            return value
+        try:
+            return segments[value[len(REFERENCE_PREFIX):]]
+        except KeyError:
+            raise ValueError(f'Brak segmentu {value} użytego w {"/".join(path)}') from None
+
+    return {key: map_leaves(value, resolve) if key not in SKIPPED_SECTIONS and isinstance(value, dict) else value
+            for key, value in tree.items() if key != SEGMENTS_KEY}
+
+
+def main():
+    parser = argparse.ArgumentParser(description='Powtarzające się teksty w plikach tłumaczeń.')
+    commands = parser.add_subparsers(dest='command', required=True)
+    stats = commands.add_parser('stats', help='Liczy powtarzające się teksty')
+    stats.add_argument('files', nargs='+')
+    dedup = commands.add_parser('dedup', help='Przenosi powtarzające się teksty do sekcji segments')
+    dedup.add_argument('file')
+    dedup.add_argument('--output', help='Plik wynikowy (domyślnie nadpisuje plik)')
+    dedup.add_argument('--min-length', type=int, default=SEGMENT_MIN_LENGTH)
+    expand_parser = commands.add_parser('expand', help='Rozwija odwołania do segmentów')
+    expand_parser.add_argument('file')
+    expand_parser.add_argument('--output', help='Plik wynikowy (domyślnie nadpisuje plik)')
+    args = parser.parse_args()
+
+    if args.command == 'stats':
+        for path in args.files:
+            table = StringTable()
+            tree = expand(read_translation(path))
+            for key, value in tree.items():
+                if key not in SKIPPED_SECTIONS and isinstance(value, dict):
+                    table.intern_tree(value)
+            counts = table.stats()
+            print(f'{path}: {counts["texts"]} tekstów, {counts["unique"]} różnych, {counts["repeated"]} powtórzeń '
+                  f'({counts["repeated_bytes"] / 1024:.0f} KB)')
+    elif args.command == 'dedup':
+        tree, segment_count, replaced = deduplicate(read_translation(args.file), args.min_length)
+        write_translation(args.output or args.file, tree)
+        print(f'{segment_count} segmentów zamiast {replaced} wystąpień')
+    else:
+        write_translation(args.output or args.file, expand(read_translation(args.file)))
+
+
+if __name__ == '__main__':
+    main()
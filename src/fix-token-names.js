@@ -1,43 +1,72 @@
+const TOKEN_NAMES_PATH = "modules/lang-pf2e-adventures/lang/token-names.json";
+
+let tokenNamesPromise;
+
+// Tabela angielska nazwa -> polska nazwa dla każdej przygody, budowana przez build_release.py
+function loadTokenNames() {
+  tokenNamesPromise ??= fetch(foundry.utils.getRoute(TOKEN_NAMES_PATH))
+    .then((response) => (response.ok ? response.json() : {}))
+    .catch(() => ({}));
+  return tokenNamesPromise;
+}
+
 async function fixTokenNames() {
   console.log("Rozpoczynam synchronizację nazw tokenów...");
 
-  // Iterujemy po wszystkich scenach w grze
+  const adventures = await loadTokenNames();
+  const tables = new Map(Object.entries(adventures).map(([id, names]) => [id, new Map(Object.entries(names))]));
+  // Wspólna tabela dla scen, których przygody nie da się ustalić
+  const allNames = new Map();
+  for (const names of tables.values()) {
+    for (const [source, target] of names) {
+      if (!allNames.has(source)) allNames.set(source, target);
+    }
+  }
+
+  let checked = 0;
+  let updated = 0;
+  let scenesUpdated = 0;
+  let missingActors = 0;
+
   for (const scene of game.scenes.contents) {
+    const adventureId = scene._stats?.compendiumSource?.split(".")[1];
+    const names = tables.get(adventureId) ?? allNames;
     const updates = [];
-    console.log(`Sprawdzam scenę: ${scene.name}`);
 
-    // Iteracja po wszystkich tokenach w scenie
     for (const token of scene.tokens) {
-      const actor = game.actors.get(token.actorId);
-
-      if (!actor) {
-        console.log(`Brak aktora dla tokena ${token.name} (token ID: ${token.id}) na scenie ${scene.name}`);
-        continue;
+      checked++;
+      let correctName;
+      if (allNames.size > 0) {
+        // Zmieniamy tylko tokeny, które nadal mają angielską nazwę z tabeli
+        correctName = names.get(token.name) ?? allNames.get(token.name);
+      } else {
+        // Bez tabeli (wersja deweloperska modułu) nazwa tokena to nazwa aktora
+        const actor = game.actors.get(token.actorId);
+        if (!actor) {
+          missingActors++;
+          continue;
+        }
+        correctName = actor.name;
       }
 
-      // Ustawiamy oczekiwaną nazwę tokena na nazwę aktora
-      const correctName = actor.name;
-
-      // Logowanie nazw i porównanie
-      console.log(`Token: ${token.name} | Aktor: ${actor.name} | Oczekiwana nazwa: ${correctName}`);
-
-      // Jeśli nazwa tokena różni się od oczekiwanej nazwy, aktualizujemy
-      if (token.name !== correctName) {
-        console.log(`Aktualizuję token ${token.name} na nazwę: ${correctName}`);
+      if (correctName && token.name !== correctName) {
         updates.push({ _id: token.id, name: correctName });
       }
     }
 
-    // Jeśli są jakieś tokeny do zaktualizowania, wykonaj aktualizację
     if (updates.length > 0) {
-      console.log(`Aktualizuję ${updates.length} tokenów w scenie "${scene.name}"`);
       await scene.updateEmbeddedDocuments("Token", updates);
-    } else {
-      console.log(`Brak zmian w tokenach na scenie ${scene.name}`);
+      updated += updates.length;
+      scenesUpdated++;
     }
   }
 
-  console.log("Synchronizacja nazw tokenów zakończona.");
+  console.log(
+    `Synchronizacja nazw tokenów zakończona: zaktualizowano ${updated} z ${checked} tokenów ` +
+      `na ${scenesUpdated} scenach` +
+      (missingActors > 0 ? `, ${missingActors} tokenów bez aktora.` : ".")
+  );
+  return updated;
 }
 
 Hooks.on("renderCompendiumDirectory", (app, html) => {
@@ -50,10 +79,9 @@ Hooks.on("renderCompendiumDirectory", (app, html) => {
   button.innerHTML = `<i class="fas fa-sync-alt"></i> Popraw nazwy tokenów`;
   button.addEventListener("click", async () => {
     ui.notifications.info("Aktualizuję nazwy tokenów...");
-    await fixTokenNames(); // <-- Twoja funkcja
-    ui.notifications.info("Nazwy tokenów zaktualizowane.");
+    const updated = await fixTokenNames(); // <-- Twoja funkcja
+    ui.notifications.info(`Nazwy tokenów zaktualizowane (${updated}).`);
   });
 
   footer.appendChild(button);
 });
-
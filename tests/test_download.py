@@ -0,0 +1,164 @@
+"""
+main.cached_download na lokalnym serwerze HTTP (http.server w osobnym wątku) obsługującym ETag, If-None-Match,
+Range i If-Range.
+"""
+import gzip
+import hashlib
+import json
+import os
+import threading
+from http.server import BaseHTTPRequestHandler, ThreadingHTTPServer
+
+import pytest
+import requests
+
+from main import cached_download
+
+CONTENT = bytes(range(256)) * 400
+
+
+def md5_etag(content):
+    return f'"{hashlib.md5(content).hexdigest()}"'
+
+
+class StandInHandler(BaseHTTPRequestHandler):
+    def do_GET(self):
+        server = self.server
+        server.requests.append(dict(self.headers))
+        content, etag = server.content, server.etag
+        if self.headers.get('If-None-Match') == etag:
+            self.send_response(304)
+            self.send_header('ETag', etag)
+            self.end_headers()
+            return
+
+        start = 0
+        range_header = self.headers.get('Range')
+        if range_header and self.headers.get('If-Range', etag) == etag:
+            start = int(range_header.removeprefix('bytes=').rstrip('-'))
+            if start >= len(content):
+                self.send_response(416)
+                self.send_header('Content-Range', f'bytes */{len(content)}')
+                self.send_header('Content-Length', '0')
+                self.end_headers()
+                return
+            self.send_response(206)
+            self.send_header('Content-Range', f'bytes {start}-{len(content) - 1}/{len(content)}')
+        else:
+            self.send_response(200)
+        body = content[start:]
+        if server.gzip and 'gzip' in self.headers.get('Accept-Encoding', ''):
+            # Jak CDN kompresujący odpowiedzi: Content-Length liczy bajty skompresowane
+            body = gzip.compress(body)
+            self.send_header('Content-Encoding', 'gzip')
+        self.send_header('ETag', etag)
+        self.send_header('Content-Length', str(len(body)))
+        self.end_headers()
+        if server.truncate:
+            # Połączenie zrywane w połowie treści
+            body = body[:len(body) // 2]
+            self.close_connection = True
+        self.wfile.write(body)
+
+    def log_message(self, *args):
+        pass
+
+
+@pytest.fixture
+def server():
+    http_server = ThreadingHTTPServer(('127.0.0.1', 0), StandInHandler)
+    http_server.content = CONTENT
+    http_server.etag = md5_etag(CONTENT)
+    http_server.truncate = False
+    http_server.gzip = False
+    http_server.requests = []
+    http_server.url = f'http://127.0.0.1:{http_server.server_port}/module.zip'
+    thread = threading.Thread(target=http_server.serve_forever, daemon=True)
+    thread.start()
+    yield http_server
+    http_server.shutdown()
+    http_server.server_close()
+
+
+def download(server, cache_dir):
+    with requests.Session() as session:
+        path, changed = cached_download(server.url, cache_dir=str(cache_dir), chunk_size=4096, session=session)
+    with open(path, 'rb') as body_file:
+        return body_file.read(), changed
+
+
+def part_paths(server, cache_dir):
+    cache_key = hashlib.sha1(server.url.encode('utf-8')).hexdigest()
+    return os.path.join(cache_dir, f'{cache_key}.part'), os.path.join(cache_dir, f'{cache_key}.part.json')
+
+
+def write_part(server, cache_dir, content, etag):
+    part_path, part_meta_path = part_paths(server, cache_dir)
+    with open(part_path, 'wb') as part_file:
+        part_file.write(content)
+    with open(part_meta_path, 'w', encoding='utf-8') as meta_file:
+        json.dump({'etag': etag, 'last_modified': None}, meta_file)
+
+
+def test_unchanged_file_is_not_downloaded_again(server, tmp_path):
+    assert download(server, tmp_path) == (CONTENT, True)
+    assert download(server, tmp_path) == (CONTENT, False)
+    assert server.requests[-1]['If-None-Match'] == server.etag
+
+
+def test_changed_etag_refreshes_cache(server, tmp_path):
+    download(server, tmp_path)
+    server.content = CONTENT[::-1]
+    server.etag = md5_etag(server.content)
+    assert download(server, tmp_path) == (server.content, True)
+
+
+def test_interrupted_download_resumes_with_range(server, tmp_path):
+    write_part(server, tmp_path, CONTENT[:1000], server.etag)
+    assert download(server, tmp_path) == (CONTENT, True)
+    assert server.requests[-1]['Range'] == 'bytes=1000-'
+    assert server.requests[-1]['If-Range'] == server.etag
+    assert not any(os.path.exists(path) for path in part_paths(server, tmp_path))
+
+
+def test_part_of_old_version_is_replaced(server, tmp_path):
+    write_part(server, tmp_path, b'x' * 1000, md5_etag(b'old'))
+    assert download(server, tmp_path) == (CONTENT, True)
+
+
+def test_truncated_body_raises_and_resumes_later(server, tmp_path):
+    server.truncate = True
+    with pytest.raises(IOError):
+        download(server, tmp_path)
+    part_path, part_meta_path = part_paths(server, tmp_path)
+    assert os.path.getsize(part_path) < len(CONTENT)
+    assert os.path.exists(part_meta_path)
+
+    server.truncate = False
+    assert download(server, tmp_path) == (CONTENT, True)
+    assert server.requests[-1]['Range'].startswith('bytes=')
+
+
+def test_complete_part_is_used_after_416(server, tmp_path):
+    write_part(server, tmp_path, CONTENT, server.etag)
+    assert download(server, tmp_path) == (CONTENT, True)
+    assert len(server.requests) == 1
+    assert server.requests[0]['Range'] == f'bytes={len(CONTENT)}-'
+    assert download(server, tmp_path) == (CONTENT, False)
+
+
+def test_corrupted_complete_part_is_downloaded_again_after_416(server, tmp_path):
+    write_part(server, tmp_path, bytes(len(CONTENT)), server.etag)
+    assert download(server, tmp_path) == (CONTENT, True)
+    assert server.requests[0]['Range'] == f'bytes={len(CONTENT)}-'
+    assert 'Range' not in server.requests[-1]
+
+
+def test_compressing_server_sends_plain_content(server, tmp_path):
+    server.gzip = True
+    assert download(server, tmp_path / 'full') == (CONTENT, True)
+    assert server.requests[-1]['Accept-Encoding'] == 'identity'
+
+    write_part(server, tmp_path, CONTENT[:1000], server.etag)
+    assert download(server, tmp_path) == (CONTENT, True)
+    assert server.requests[-1]['Range'] == 'bytes=1000-'
@@ -0,0 +1,81 @@
+"""
+Eksport do XLIFF i PO i import z powrotem muszą odtwarzać pliki tłumaczeń bajt w bajt: wszystkie pliki lang/en,
+pary lang/en + lang/pl oraz spreparowane teksty z trudnymi znakami.
+"""
+import os
+
+import pytest
+
+from exchange import FORMATS, EXTENSIONS, export_file, import_file
+from translations import EN_DIR, PL_DIR, dump_translation, translation_pairs, write_translation
+
+REPOSITORY = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+PAIRS = translation_pairs(os.path.join(REPOSITORY, EN_DIR), os.path.join(REPOSITORY, PL_DIR))
+EDGE_CASES = {
+    "label": "Edge cases",
+    "entries": {
+        "newlines": "first\nsecond\n",
+        "leading newline": "\nstarts with a newline",
+        "only newline": "\n",
+        "quotes": 'He said "hi" and left',
+        "backslashes": 'C:\\path\\ and \\n that is not a newline, ends with \\',
+        "obsolete": '#~ msgid "old"\n#~ msgstr "stary"',
+        "po keywords": 'msgctxt "x"\nmsgid "y"\nmsgstr "z"\n#, fuzzy',
+        "cdata": "<![CDATA[ text ]]> and ]]> alone",
+        "entities": "Tom &amp; Jerry & <b>bold</b> &lt;tag&gt; &#13;",
+        "control": "bell \x07 and unit separator \x1f",
+        "carriage return": "windows\r\nline\ttab",
+        "invalid xml": "noncharacter \ufffe here",
+        "spaces": "   ",
+        "empty": "",
+        "number": 5,
+        "float": 1.5,
+        "null": None,
+        "boolean": True,
+        "list": ["a", "b"],
+        "empty dict": {},
+        "segment": "@segment:0123456789abcdef",
+        "pointer/~keys": "slash and tilde in the key",
+        "polish": "Zażółć gęślą jaźń",
+        "nested": {"text": "<p>@UUID[Compendium.pf2e.spells.Item.abc]{Fireball}</p>", "name": "Fireball"},
+    },
+    "mapping": {"name": "name", "description": "system.description.value"},
+}
+
+
+def translated(value):
+    if isinstance(value, dict):
+        return {key: translated(item) for key, item in value.items()}
+    if isinstance(value, str) and value:
+        return value + ' — przetłumaczone "pl" \\ \n]]> &amp;'
+    return value
+
+
+def round_trip(source_path, target_path, file_format, directory):
+    exchange_path = os.path.join(directory, 'exchange' + EXTENSIONS[file_format])
+    export_file(source_path, exchange_path, target_path, file_format)
+    return dump_translation(import_file(exchange_path))
+
+
+def read_text(path):
+    with open(path, 'r', encoding='utf-8') as json_file:
+        return json_file.read()
+
+
+@pytest.mark.parametrize('file_format', FORMATS)
+@pytest.mark.parametrize('name,en_path,pl_path', PAIRS, ids=[name for name, _, _ in PAIRS])
+def test_shipped_files_round_trip(name, en_path, pl_path, file_format, tmp_path):
+    assert round_trip(en_path, None, file_format, tmp_path) == read_text(en_path)
+    if pl_path:
+        assert round_trip(en_path, pl_path, file_format, tmp_path) == read_text(pl_path)
+
+
+@pytest.mark.parametrize('file_format', FORMATS)
+def test_edge_cases_round_trip(file_format, tmp_path):
+    source_path = os.path.join(tmp_path, 'source.json')
+    target_path = os.path.join(tmp_path, 'target.json')
+    write_translation(source_path, EDGE_CASES)
+    write_translation(target_path, translated(EDGE_CASES))
+
+    assert round_trip(source_path, None, file_format, tmp_path) == read_text(source_path)
+    assert round_trip(source_path, target_path, file_format, tmp_path) == read_text(target_path)
@@ -0,0 +1,56 @@
+"""
+main.write_transifex_dict zapisuje plik tłumaczenia wprost ze słowników i wpisów modelu; wynik musi być bajt w bajt
+taki sam jak json.dump(postprocess_transifex_dict(...), indent=4).
+"""
+import glob
+import io
+import json
+import os
+
+import pytest
+
+from main import postprocess_transifex_dict, write_transifex_dict
+from model import Actor, Item, Journal, Page
+from translations import EN_DIR, PL_DIR
+
+REPOSITORY = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+TRANSLATION_PATHS = sorted(glob.glob(os.path.join(REPOSITORY, EN_DIR, '*.json'))
+                           + glob.glob(os.path.join(REPOSITORY, PL_DIR, '*.json')))
+EDGE_CASES = [
+    {},
+    {"label": "Empty", "entries": {}, "mapping": {}},
+    {"name": "Removed with empty pages", "pages": {}, "entries": {"b": {"entries": {"z": 1, "a": 2}}}},
+    {"label": "Dicts", "folders": {"a": "a"}, "entries": {
+        "b": {"name": "Journal\n", "pages": {}},
+        "a": {"name": "", "list": [1, "a\nb", {"c": "d\te"}], "zero": 0, "float": 1.5, "flag": False, "empty": {}},
+        "c": "plain text",
+    }, "other": {2: {"pages": 0, "name": "n", "key": "value"}, True: "t", 1.5: [], "pages": 0}},
+    {"label": "Records", "entries": {
+        "z": Journal(name="Journal", pages={"Page": Page(name="Page", text="<p>@UUID[Compendium.pf2e.x.Item.y]{Label}\n"
+                                                                          "</p>")}),
+        "a": Actor(name="Actor", items={"Sword": Item(name="Sword", description="")}, publicNotes=""),
+        "m": Journal(name="Only name", pages={}),
+    }, "mapping": {"actors": {"publicNotes": "system.details.publicNotes"}}},
+]
+
+
+def cleaned_text(tree):
+    return json.dumps(postprocess_transifex_dict(tree), ensure_ascii=False, indent=4)
+
+
+def written_text(tree):
+    output = io.StringIO()
+    write_transifex_dict(tree, output)
+    return output.getvalue()
+
+
+@pytest.mark.parametrize('path', TRANSLATION_PATHS, ids=os.path.basename)
+def test_translation_files(path):
+    with open(path, 'r', encoding='utf-8') as json_file:
+        tree = json.load(json_file)
+    assert written_text(tree) == cleaned_text(tree)
+
+
+@pytest.mark.parametrize('tree', EDGE_CASES)
+def test_edge_cases(tree):
+    assert written_text(tree) == cleaned_text(tree)
@@ -0,0 +1,222 @@
+"""
+Pamięć tłumaczeń budowana ze wszystkich par lang/en - lang/pl, zapisana w SQLite.
+
+Te same teksty (opisy przedmiotów, zdolności potworów) powtarzają się w wielu przygodach, więc raz
+przetłumaczony tekst można podstawić w nowym pliku. Dokładne dopasowanie szuka po skrócie tekstu
+z ujednoliconymi białymi znakami, a podobne teksty są wybierane przez indeks słów i oceniane difflib.
+
+Uruchomienie z katalogu repozytorium:
+    python translation_memory.py build
+    python translation_memory.py lookup "Tekst angielski" [--fuzzy]
+    python translation_memory.py prefill pf2e-rusthenge.adventures.json
+"""
+import argparse
+import difflib
+import hashlib
+import os
+import re
+import sqlite3
+import time
+
+from segments import is_segment_reference
+from translations import (EN_DIR, PL_DIR, STRUCTURAL_SECTIONS, file_digest, iter_leaves, json_pointer, map_leaves,
+                          read_translation, translation_pairs, write_translation)
+
+MEMORY_PATH = '.cache/translation-memory.sqlite'
+TAG_PATTERN = re.compile(r'<[^>]+>|@\w+\[[^\]]*\]')
+WORD_PATTERN = re.compile(r'\w{3,}')
+FUZZY_CANDIDATES = 25
+
+SCHEMA = '''
+CREATE TABLE IF NOT EXISTS files (name TEXT PRIMARY KEY, digest TEXT NOT NULL);
+CREATE TABLE IF NOT EXISTS sources (id INTEGER PRIMARY KEY, hash TEXT NOT NULL UNIQUE, text TEXT NOT NULL);
+CREATE TABLE IF NOT EXISTS translations (
+    source_id INTEGER NOT NULL REFERENCES sources(id),
+    target TEXT NOT NULL,
+    file TEXT NOT NULL,
+    path TEXT NOT NULL
+);
+CREATE INDEX IF NOT EXISTS translations_source ON translations(source_id);
+CREATE TABLE IF NOT EXISTS tokens (
+    token TEXT NOT NULL,
+    source_id INTEGER NOT NULL,
+    PRIMARY KEY (token, source_id)
+) WITHOUT ROWID;
+'''
+
+
+def normalize(text):
+    return ' '.join(text.split())
+
+
+def text_hash(text):
+    return hashlib.blake2b(normalize(text).encode('utf-8'), digest_size=16).hexdigest()
+
+
+def tokenize(text):
+    return set(WORD_PATTERN.findall(TAG_PATTERN.sub(' ', text).lower()))
+
+
+def translated_segments(en, pl):
+    """
+    Pary (ścieżka kluczy, tekst angielski, tłumaczenie) dla liści, które faktycznie przetłumaczono.
+    """
+    pl_leaves = dict(iter_leaves(pl))
+    for path, source in iter_leaves(en):
+        target = pl_leaves.get(path)
+        if path[0] in STRUCTURAL_SECTIONS or not isinstance(source, str) or not isinstance(target, str):
+            continue
+        normalized = normalize(source)
+        if normalized and normalized != normalize(target):
+            yield path, source, target
+
+
+class TranslationMemory:
+    def __init__(self, path=MEMORY_PATH):
+        directory = os.path.dirname(path)
+        if directory:
+            os.makedirs(directory, exist_ok=True)
+        self.path = path
+        self.connection = sqlite3.connect(path)
+        self.connection.executescript(SCHEMA)
+
+    def close(self):
+        self.connection.close()
+
+    def __enter__(self):
+        return self
+
+    def __exit__(self, *exc_info):
+        self.close()
+
+    def build(self, en_dir=EN_DIR, pl_dir=PL_DIR, force=False):
+        """
+        Buduje pamięć od nowa, jeśli zmienił się którykolwiek plik tłumaczenia (albo gdy force=True).
+
+        :return: True, jeśli pamięć została przebudowana.
+        """
+        pairs = [(name, en_path, pl_path) for name, en_path, pl_path in translation_pairs(en_dir, pl_dir) if pl_path]
+        digests = {name: file_digest(en_path, pl_path) for name, en_path, pl_path in pairs}
+        if not force and dict(self.connection.execute('SELECT name, digest FROM files')) == digests:
+            return False
+
+        with self.connection:
+            for table in ('files', 'sources', 'translations', 'tokens'):
+                self.connection.execute(f'DELETE FROM {table}')
+            source_ids = {}
+            sources = []
+            translations = []
+            tokens = []
+            for name, en_path, pl_path in pairs:
+                for path, source, target in translated_segments(read_translation(en_path), read_translation(pl_path)):
+                    digest = text_hash(source)
+                    source_id = source_ids.get(digest)
+                    if source_id is None:
+                        source_id = source_ids[digest] = len(source_ids) + 1
+                        sources.append((source_id, digest, normalize(source)))
+                        tokens.extend((token, source_id) for token in tokenize(source))
+                    translations.append((source_id, target, name, json_pointer(path)))
+            self.connection.executemany('INSERT INTO sources VALUES (?, ?, ?)', sources)
+            self.connection.executemany('INSERT INTO translations VALUES (?, ?, ?, ?)', translations)
+            self.connection.executemany('INSERT INTO tokens VALUES (?, ?)', tokens)
+            self.connection.executemany('INSERT INTO files VALUES (?, ?)', digests.items())
+        return True
+
+    def lookup(self, text):
+        """
+        Dokładne dopasowanie: najczęściej używane tłumaczenie tekstu albo None.
+        """
+        row = self.connection.execute(
+            'SELECT target FROM translations WHERE source_id = (SELECT id FROM sources WHERE hash = ?) '
+            'GROUP BY target ORDER BY COUNT(*) DESC, MIN(rowid) LIMIT 1', (text_hash(text),)).fetchone()
+        return row[0] if row else None
+
+    def fuzzy(self, text, threshold=0.75, limit=5):
+        """
+        Podobne teksty: kandydaci z największą liczbą wspólnych słów, oceniani difflib.SequenceMatcher.
+
+        :return: Lista krotek (podobieństwo, tekst angielski, tłumaczenie), od najlepszej.
+        """
+        words = tokenize(text)
+        if not words:
+            return []
+        placeholders = ','.join('?' * len(words))
+        candidates = self.connection.execute(
+            f'SELECT sources.id, sources.text FROM tokens JOIN sources ON sources.id = tokens.source_id '
+            f'WHERE token IN ({placeholders}) GROUP BY sources.id ORDER BY COUNT(*) DESC LIMIT ?',
+            (*words, FUZZY_CANDIDATES)).fetchall()
+
+        normalized = normalize(text)
+        matches = []
+        for source_id, source in candidates:
+            matcher = difflib.SequenceMatcher(None, normalized, source, autojunk=False)
+            if matcher.real_quick_ratio() < threshold or matcher.quick_ratio() < threshold:
+                continue
+            ratio = matcher.ratio()
+            if ratio >= threshold:
+                target = self.connection.execute(
+                    'SELECT target FROM translations WHERE source_id = ? GROUP BY target '
+                    'ORDER BY COUNT(*) DESC, MIN(rowid) LIMIT 1', (source_id,)).fetchone()[0]
+                matches.append((ratio, source, target))
+        return sorted(matches, key=lambda match: match[0], reverse=True)[:limit]
+
+    def prefill(self, tree):
+        """
+        Kopia pliku angielskiego z tłumaczeniami podstawionymi z pamięci (tylko dokładne dopasowania).
+
+        :return: Krotka (drzewo, liczba podstawionych tekstów, liczba wszystkich tekstów).
+        """
+        counts = [0, 0]
+
+        def translate(path, value):
+            if path[0] in STRUCTURAL_SECTIONS or not isinstance(value, str) or not normalize(value) or \
+                    is_segment_reference(value):
+                return value
+            counts[1] += 1
+            target = self.lookup(value)
+            if target is None:
+                return value
+            counts[0] += 1
+            return target
+
+        return map_leaves(tree, translate), counts[0], counts[1]
+
+
+def main():
+    parser = argparse.ArgumentParser(description='Pamięć tłumaczeń z plików lang/en i lang/pl.')
+    parser.add_argument('--db', default=MEMORY_PATH, help='Plik bazy SQLite')
+    commands = parser.add_subparsers(dest='command', required=True)
+    build = commands.add_parser('build', help='Buduje pamięć z lang/en i lang/pl')
+    build.add_argument('--force', action='store_true', help='Przebudowuje nawet bez zmian w plikach')
+    lookup = commands.add_parser('lookup', help='Szuka tłumaczenia tekstu')
+    lookup.add_argument('text')
+    lookup.add_argument('--fuzzy', action='store_true', help='Pokazuje też podobne teksty')
+    prefill = commands.add_parser('prefill', help='Wstawia znane tłumaczenia do pliku z process_files')
+    prefill.add_argument('files', nargs='+')
+    args = parser.parse_args()
+
+    with TranslationMemory(args.db) as memory:
+        start = time.perf_counter()
+        rebuilt = memory.build(force=getattr(args, 'force', False))
+        if rebuilt or args.command == 'build':
+            sources, translations = memory.connection.execute(
+                'SELECT (SELECT COUNT(*) FROM sources), (SELECT COUNT(*) FROM translations)').fetchone()
+            print(f'Pamięć tłumaczeń: {sources} tekstów, {translations} tłumaczeń '
+                  f'({"przebudowana" if rebuilt else "bez zmian"}, {time.perf_counter() - start:.2f} s)')
+
+        if args.command == 'lookup':
+            print(memory.lookup(args.text))
+            if args.fuzzy:
+                for ratio, source, target in memory.fuzzy(args.text):
+                    print(f'{ratio:.2f}  {source}\n      {target}')
+
+        elif args.command == 'prefill':
+            for path in args.files:
+                output_path = f'{os.path.splitext(path)[0]}.pl.json'
+                tree, filled, total = memory.prefill(read_translation(path))
+                write_translation(output_path, tree)
+                print(f'{output_path}: przetłumaczono {filled} z {total} tekstów')
+
+
+if __name__ == '__main__':
+    main()
@@ -0,0 +1,177 @@
+"""
+Wspólne funkcje do plików tłumaczeń Babele (lang/en, lang/pl): odczyt i zapis w formacie repozytorium
+oraz przechodzenie po liściach drzewa według ścieżek kluczy.
+"""
+import contextlib
+import hashlib
+import json
+import os
+from concurrent.futures import ProcessPoolExecutor
+
+EN_DIR = 'lang/en'
+PL_DIR = 'lang/pl'
+# Sekcje najwyższego poziomu opisujące strukturę pliku, a nie tekst do tłumaczenia; każde narzędzie przenosi je
+# bez zmian i nie liczy ich jako tekstów
+STRUCTURAL_SECTIONS = ('mapping',)
+
+
+def read_translation(path):
+    with open(path, 'r', encoding='utf-8') as json_file:
+        return json.load(json_file)
+
+
+def dump_translation(data):
+    """
+    Tekst pliku tłumaczenia tak jak w lang/en i lang/pl (wcięcie 4 spacje, bez nowej linii na końcu).
+    """
+    return json.dumps(data, ensure_ascii=False, indent=4)
+
+
+@contextlib.contextmanager
+def atomic_write(path, mode='w', encoding='utf-8'):
+    """
+    Otwiera do zapisu plik tymczasowy obok path i po udanym zapisie podmienia nim path (os.replace). Pod docelową
+    nazwą jest zawsze poprzednia albo cała nowa zawartość, nigdy plik przerwany w połowie; po błędzie plik
+    tymczasowy jest usuwany.
+    """
+    temporary = f'{path}.{os.getpid()}.tmp'
+    try:
+        with open(temporary, mode, encoding=None if 'b' in mode else encoding) as file:
+            yield file
+        os.replace(temporary, path)
+    except BaseException:
+        with contextlib.suppress(FileNotFoundError):
+            os.remove(temporary)
+        raise
+
+
+def write_translation(path, data):
+    directory = os.path.dirname(path)
+    if directory:
+        os.makedirs(directory, exist_ok=True)
+    with atomic_write(path) as json_file:
+        json_file.write(dump_translation(data))
+
+
+def iter_leaves(tree, path=()):
+    """
+    Przechodzi po drzewie w kolejności pliku.
+
+    :return: Generator par (ścieżka kluczy jako krotka, wartość) dla liści (wartości innych niż słownik).
+    """
+    for key, value in tree.items():
+        if isinstance(value, dict):
+            yield from iter_leaves(value, path + (key,))
+        else:
+            yield path + (key,), value
+
+
+def leaf_index(tree):
+    """
+    Słownik ścieżka kluczy -> wartość dla wszystkich liści drzewa.
+    """
+    return dict(iter_leaves(tree))
+
+
+def map_leaves(tree, function, path=()):
+    """
+    Kopia drzewa, w której każdy liść zastąpiono wynikiem function(ścieżka kluczy, wartość).
+    """
+    return {key: map_leaves(value, function, path + (key,)) if isinstance(value, dict)
+            else function(path + (key,), value)
+            for key, value in tree.items()}
+
+
+def set_path(tree, path, value):
+    for key in path[:-1]:
+        tree = tree.setdefault(key, {})
+    tree[path[-1]] = value
+
+
+def json_pointer(path):
+    """
+    Ścieżka kluczy zapisana jako JSON Pointer (RFC 6901), np. ('entries', 'A/B', 'name') -> '/entries/A~1B/name'.
+    """
+    return ''.join('/' + key.replace('~', '~0').replace('/', '~1') for key in path)
+
+
+def parse_json_pointer(pointer):
+    if not pointer:
+        return ()
+    return tuple(key.replace('~1', '/').replace('~0', '~') for key in pointer[1:].split('/'))
+
+
+def file_digest(*paths):
+    """
+    Wspólny skrót zawartości plików (brakujący plik liczy się jako pusty).
+    """
+    digest = hashlib.blake2b(digest_size=16)
+    for path in paths:
+        if path and os.path.exists(path):
+            with open(path, 'rb') as file:
+                digest.update(file.read())
+        digest.update(b'\0')
+    return digest.hexdigest()
+
+
+def translation_pairs(en_dir=EN_DIR, pl_dir=PL_DIR):
+    """
+    Pary plików angielskich i polskich o tej samej nazwie.
+
+    :return: Lista krotek (nazwa pliku, ścieżka en, ścieżka pl albo None, jeśli nie ma jeszcze tłumaczenia).
+    """
+    pairs = []
+    for name in sorted(os.listdir(en_dir)):
+        if name.endswith('.json'):
+            pl_path = os.path.join(pl_dir, name)
+            pairs.append((name, os.path.join(en_dir, name), pl_path if os.path.exists(pl_path) else None))
+    return pairs
+
+
+def map_changed_pairs(pairs, worker, script, known_digests, workers=None):
+    """
+    Przelicza pary plików, których skrót zmienił się od ostatniego razu; kilka zmienionych par jest liczonych
+    równolegle w osobnych procesach.
+
+    :param pairs: Lista krotek (nazwa, ścieżka, ...) jak z translation_pairs; brakująca ścieżka to None.
+    :param worker: Funkcja modułu (dająca się przekazać do procesu) wywoływana ze ścieżkami pary.
+    :param script: Plik skryptu wliczany do skrótu, żeby zmiana sposobu liczenia unieważniała wyniki.
+    :param known_digests: Słownik nazwa -> skrót z poprzedniego przeliczenia.
+    :param workers: Liczba procesów (domyślnie liczba rdzeni, 1 liczy w tym procesie).
+    :return: Krotka (skróty wszystkich par, słownik nazwa -> wynik dla zmienionych par w kolejności pairs).
+    """
+    digests = {name: file_digest(*paths, script) for name, *paths in pairs}
+    changed = [(name, *paths) for name, *paths in pairs if known_digests.get(name) != digests[name]]
+    if len(changed) > 1 and workers != 1:
+        with ProcessPoolExecutor(max_workers=workers) as executor:
+            results = list(executor.map(worker, *zip(*(paths for _, *paths in changed))))
+    else:
+        results = [worker(*paths) for _, *paths in changed]
+    return digests, {name: result for (name, *_), result in zip(changed, results)}
+
+
+def cached_pair_results(pairs, cache_path, worker, script, workers=None):
+    """
+    Wyniki worker dla par plików z pamięcią podręczną w pliku JSON (cache_path), w której przeliczane są tylko
+    zmienione pary (map_changed_pairs). Pamięć jest zapisywana przez atomic_write.
+
+    :return: Krotka (słownik nazwa -> wynik w kolejności pairs, liczba przeliczonych par).
+    """
+    try:
+        with open(cache_path, 'r', encoding='utf-8') as cache_file:
+            cache = json.load(cache_file)
+    except (FileNotFoundError, json.JSONDecodeError):
+        cache = {}
+
+    known_digests = {name: entry.get("digest") for name, entry in cache.items()
+                     if isinstance(entry, dict) and "result" in entry}
+    digests, changed = map_changed_pairs(pairs, worker, script, known_digests, workers)
+    entries = {name: {"digest": digests[name], "result": changed[name] if name in changed else cache[name]["result"]}
+               for name, *_ in pairs}
+
+    directory = os.path.dirname(cache_path)
+    if directory:
+        os.makedirs(directory, exist_ok=True)
+    with atomic_write(cache_path) as cache_file:
+        json.dump(entries, cache_file, ensure_ascii=False)
+    return {name: entry["result"] for name, entry in entries.items()}, len(changed)
@@ -0,0 +1,231 @@
+"""
+Sprawdza, czy pliki lang/pl zgadzają się z lang/en na tyle, żeby Foundry wyświetlił je poprawnie:
+    missing-key   - klucza z pliku angielskiego nie ma w polskim
+    extra-key     - klucza z pliku polskiego nie ma w angielskim
+    type          - inny typ wartości (np. tekst zamiast słownika)
+    mapping       - zmieniona sekcja mapping (nie jest tłumaczona)
+    tags          - niezamknięty albo nadmiarowy znacznik HTML, którego nie ma w tekście angielskim
+    enrichers     - inne @UUID[...], @Check[...], @Damage[...] itd. niż w tekście angielskim
+    rolls         - inne rzuty w tekście [[/r ...]], [[/br ...]], [[/gmr ...]] niż w tekście angielskim
+    placeholders  - inne wstawki {{...}} niż w tekście angielskim
+Etykiety w nawiasach klamrowych po wzbogaceniu (@UUID[...]{etykieta}) i opisy rzutów (#opis) są tłumaczone, więc
+nie są porównywane.
+
+Tekst jest dzielony na znaczniki i wzbogacenia kilkoma skompilowanymi wyrażeniami regularnymi, bez parsera HTML,
+a tylko liście zawierające znaczniki są w ogóle przeglądane. Pary plików są sprawdzane równolegle, a wyniki
+zapamiętywane w .cache według skrótu obu plików (translations.cached_pair_results).
+
+Uruchomienie z katalogu repozytorium:
+    python validate.py [--json validation.json] [--workers 1]
+"""
+import argparse
+import json
+import os
+import re
+import sys
+import time
+from collections import Counter
+
+from segments import is_segment_reference
+from translations import (EN_DIR, PL_DIR, STRUCTURAL_SECTIONS, cached_pair_results, iter_leaves, json_pointer,
+                          read_translation, translation_pairs)
+
+CACHE_PATH = '.cache/validation.json'
+CATEGORIES = ('missing-key', 'extra-key', 'type', 'mapping', 'tags', 'enrichers', 'rolls', 'placeholders')
+# Znaczniki HTML bez znacznika zamykającego
+VOID_TAGS = frozenset(('area', 'base', 'br', 'col', 'embed', 'hr', 'img', 'input', 'link', 'meta', 'source', 'track',
+                       'wbr'))
+# Komentarz albo znacznik: grupa 1 - '/' znacznika zamykającego, 2 - nazwa, 3 - '/' znacznika samozamykającego
+TAG_PATTERN = re.compile(r'<!--.*?-->|<(/?)([a-zA-Z][a-zA-Z0-9-]*)(?:\s[^>]*?)?\s*(/?)>', re.DOTALL)
+# Argumenty mogą zawierać jeden poziom nawiasów, np. @Damage[(2d6+4)[fire]]
+ENRICHER_PATTERN = re.compile(r'@([A-Za-z]+)\[((?:[^\[\]]|\[[^\[\]]*\])*)\]')
+ROLL_PATTERN = re.compile(r'\[\[(/[a-z]+)\s*((?:[^\[\]]|\[[^\[\]]*\])*?)\]\]')
+PLACEHOLDER_PATTERN = re.compile(r'\{\{.*?\}\}')
+MARKUP_CHARACTERS = ('<', '@', '[[', '{{')
+# Wzbogacenia z argumentami nazwa:wartość i argumenty, które są tłumaczone
+KEYED_ENRICHERS = ('Check', 'Template')
+TRANSLATED_ARGUMENTS = ('name',)
+
+
+def tag_problems(text):
+    """
+    Sprawdza zagnieżdżenie znaczników.
+
+    :return: Lista opisów problemów (niezamknięte i nadmiarowe znaczniki).
+    """
+    stack = []
+    problems = []
+    for match in TAG_PATTERN.finditer(text):
+        closing, name, self_closing = match.groups()
+        if name is None or self_closing:
+            continue
+        name = name.lower()
+        if name in VOID_TAGS:
+            continue
+        if not closing:
+            stack.append(name)
+        elif name in stack:
+            while stack[-1] != name:
+                problems.append(f'niezamknięty <{stack.pop()}>')
+            stack.pop()
+        else:
+            problems.append(f'nadmiarowy </{name}>')
+    problems.extend(f'niezamknięty <{name}>' for name in stack)
+    return problems
+
+
+def enricher_arguments(arguments):
+    """
+    Argumenty @Check[...] i @Template[...] w jednej postaci: pierwszy argument bez nazwy to type
+    (reflex -> type:reflex), pozostałe bez wartości to flagi (basic -> basic:true), kolejność nie ma znaczenia.
+    Pomija części tłumaczone: nazwy akcji (name:...) i nazwy wiedzy, które tłumaczenie zapisuje po polsku
+    (willowshore-lore -> wiedza-o-willowshore-lore).
+    """
+    parts = []
+    for position, part in enumerate(arguments.split('|')):
+        key, separator, value = (part.strip().partition(':'))
+        if not separator:
+            key, value = ('type', key) if position == 0 else (key, 'true')
+        if key in TRANSLATED_ARGUMENTS:
+            continue
+        if key == 'type' and value.endswith('-lore'):
+            value = '*-lore'
+        parts.append(f'{key}:{value}')
+    return '|'.join(sorted(parts))
+
+
+def enrichers(text):
+    return Counter(f'@{kind}[{enricher_arguments(arguments) if kind in KEYED_ENRICHERS else arguments}]'
+                   for kind, arguments in ENRICHER_PATTERN.findall(text))
+
+
+def rolls(text):
+    # Opis po '#' jest tłumaczony
+    return Counter(f'[[{command} {formula.split("#")[0].strip()}]]' for command, formula in ROLL_PATTERN.findall(text))
+
+
+def placeholders(text):
+    return Counter(PLACEHOLDER_PATTERN.findall(text))
+
+
+def describe_difference(source, target):
+    """
+    :return: Opis różnicy dwóch zbiorów z powtórzeniami (czego brakuje i co jest nadmiarowe w tłumaczeniu).
+    """
+    parts = []
+    missing = source - target
+    extra = target - source
+    if missing:
+        parts.append('brak ' + ', '.join(sorted(missing.elements())))
+    if extra:
+        parts.append('nadmiarowe ' + ', '.join(sorted(extra.elements())))
+    return '; '.join(parts)
+
+
+def markup_problems(source, target):
+    """
+    :return: Lista krotek (kategoria, opis) dla przetłumaczonego tekstu.
+    """
+    problems = []
+    if '<' in target:
+        extra = Counter(tag_problems(target)) - Counter(tag_problems(source))
+        if extra:
+            problems.append(('tags', ', '.join(sorted(extra.elements()))))
+    for category, extract in (('enrichers', enrichers), ('rolls', rolls), ('placeholders', placeholders)):
+        difference = describe_difference(extract(source), extract(target))
+        if difference:
+            problems.append((category, difference))
+    return problems
+
+
+def value_type(value):
+    return 'słownik' if isinstance(value, dict) else type(value).__name__
+
+
+def key_prefixes(leaves):
+    """
+    :return: Zbiór ścieżek wszystkich słowników zawierających liście (bez samych liści).
+    """
+    return {path[:length] for path in leaves for length in range(1, len(path))}
+
+
+def validate_pair(en_path, pl_path):
+    """
+    Porównuje plik polski z angielskim.
+
+    :return: Lista problemów {"category", "path", "detail"} w kolejności pliku angielskiego.
+    """
+    en_leaves = dict(iter_leaves(read_translation(en_path)))
+    pl_leaves = dict(iter_leaves(read_translation(pl_path)))
+    en_prefixes = key_prefixes(en_leaves)
+    pl_prefixes = key_prefixes(pl_leaves)
+    problems = []
+    for path, source in en_leaves.items():
+        pointer = json_pointer(path)
+        if path not in pl_leaves:
+            # Liść mógł zostać zamieniony w słownik albo odwrotnie
+            if path in pl_prefixes or any(path[:length] in pl_leaves for length in range(1, len(path))):
+                problems.append({"category": "type", "path": pointer,
+                                 "detail": 'słownik zamiast tekstu lub odwrotnie'})
+            else:
+                problems.append({"category": "missing-key", "path": pointer, "detail": ''})
+            continue
+
+        target = pl_leaves[path]
+        if type(source) is not type(target):
+            problems.append({"category": "type", "path": pointer,
+                             "detail": f'{value_type(target)} zamiast {value_type(source)}'})
+        # Sekcje struktury nie są tłumaczone i muszą być takie same w obu plikach
+        elif path[0] in STRUCTURAL_SECTIONS:
+            if source != target:
+                problems.append({"category": "mapping", "path": pointer, "detail": f'{source!r} -> {target!r}'})
+        elif isinstance(source, str) and source != target and not is_segment_reference(source) and \
+                any(character in source or character in target for character in MARKUP_CHARACTERS):
+            for category, detail in markup_problems(source, target):
+                problems.append({"category": category, "path": pointer, "detail": detail})
+
+    for path in pl_leaves:
+        if path not in en_leaves and path not in en_prefixes and \
+                not any(path[:length] in en_leaves for length in range(1, len(path))):
+            problems.append({"category": "extra-key", "path": json_pointer(path), "detail": ''})
+    return problems
+
+
+def build_report(en_dir=EN_DIR, pl_dir=PL_DIR, cache_path=CACHE_PATH, workers=None):
+    """
+    :return: Krotka (słownik plik -> lista problemów dla przetłumaczonych plików, liczba przeliczonych plików).
+    """
+    pairs = [(name, en_path, pl_path) for name, en_path, pl_path in translation_pairs(en_dir, pl_dir) if pl_path]
+    return cached_pair_results(pairs, cache_path, validate_pair, __file__, workers)
+
+
+def main():
+    parser = argparse.ArgumentParser(description='Sprawdza strukturę kluczy i znaczniki lang/pl względem lang/en.')
+    parser.add_argument('--en-dir', default=EN_DIR)
+    parser.add_argument('--pl-dir', default=PL_DIR)
+    parser.add_argument('--json', help='Zapisuje listę problemów do pliku JSON')
+    parser.add_argument('--workers', type=int, default=None, help='Liczba procesów (domyślnie liczba rdzeni)')
+    args = parser.parse_args()
+
+    start = time.perf_counter()
+    report, scanned = build_report(args.en_dir, args.pl_dir, workers=args.workers)
+    problems = [{"file": os.path.join(args.pl_dir, name), **problem}
+                for name, file_problems in report.items() for problem in file_problems]
+
+    for problem in problems:
+        detail = f'\n              {problem["detail"]}' if problem["detail"] else ''
+        print(f'{problem["category"]:<13} {problem["file"]} {problem["path"]}{detail}')
+    summary = ', '.join(f'{category}: {count}' for category in CATEGORIES
+                        if (count := sum(problem["category"] == category for problem in problems)))
+    print(f'Problemy: {len(problems)}{" (" + summary + ")" if summary else ""}')
+    print(f'Przeliczono {scanned} z {len(report)} plików w {time.perf_counter() - start:.2f} s')
+
+    if args.json:
+        with open(args.json, 'w', encoding='utf-8') as json_file:
+            json.dump(problems, json_file, ensure_ascii=False, indent=4)
+    if problems:
+        sys.exit(1)
+
+
+if __name__ == '__main__':
+    main()
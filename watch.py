@@ -0,0 +1,184 @@
+"""
+Tryb obserwacji: przy zmianie zrzuconego pakietu (pack_adventure/<wersja>/output/*.json) albo reguł wyciągania
+tekstów w main.py przebudowuje tylko pliki do tłumaczenia, których to dotyczy, bez pobierania i zrzucania
+LevelDB. Wczytane pakiety zostają w pamięci między przebudowami, więc zmiana reguł nie wymaga ponownego
+parsowania JSON, a zmieniony pakiet jest wczytywany tylko raz.
+
+Zmiany są wykrywane przez sprawdzanie czasu modyfikacji i rozmiaru plików co --interval sekund (bez
+dodatkowych zależności). Po zmianie main.py moduł jest wczytywany od nowa (importlib.reload); jeśli nowa wersja
+ma błąd, obserwacja trwa dalej ze starą.
+
+Uruchomienie z katalogu repozytorium (tam, gdzie main.py zapisuje pliki wynikowe):
+    python watch.py [--interval 0.2] [--build] [--translation-memory] [--dedup]
+"""
+import argparse
+import glob
+import importlib
+import json
+import os
+import time
+import traceback
+
+import main
+from instrumentation import configure
+from translation_memory import MEMORY_PATH, TranslationMemory
+
+WATCH_PATTERN = 'pack_adventure/*/output'
+FOLDERS_SUFFIX = '_folders.json'
+
+
+def file_signature(path):
+    try:
+        stat = os.stat(path)
+    except FileNotFoundError:
+        return None
+    return stat.st_mtime_ns, stat.st_size
+
+
+class Watcher:
+    """
+    Stan obserwacji: sygnatury plików, wczytane pakiety i otwarta pamięć tłumaczeń.
+    """
+    def __init__(self, folders, memory_path=None, dedup=False):
+        """
+        :param folders: Lista par (katalog z plikami JSON pakietów, identyfikator przygody).
+        :param memory_path: Baza pamięci tłumaczeń do plików .pl.json (opcjonalnie).
+        :param dedup: Jak w main.process_files.
+        """
+        self.folders = folders
+        self.dedup = dedup
+        self.memory = TranslationMemory(memory_path) if memory_path else None
+        self.signatures = {}
+        self.packs = {}
+        self.config_signature = file_signature(main.__file__)
+
+    def close(self):
+        if self.memory:
+            self.memory.close()
+
+    def scan(self):
+        return {path: file_signature(path) for folder, _ in self.folders
+                for path in glob.glob(os.path.join(folder, '*.json'))}
+
+    def load(self, path):
+        with open(path, 'r', encoding='utf-8') as json_file:
+            self.packs[path] = json.load(json_file)
+
+    def rebuild(self, path):
+        folder = os.path.dirname(path)
+        version = next(version for watched, version in self.folders if os.path.samefile(watched, folder))
+        start = time.perf_counter()
+        try:
+            main.process_pack(folder, os.path.basename(path), version, self.memory, dedup=self.dedup,
+                              data=self.packs[path])
+        except Exception:
+            print(f'Błąd przebudowy {path}:')
+            traceback.print_exc()
+            return
+        print(f'Przebudowano {version}.{os.path.basename(path).split(".")[0]}.json '
+              f'w {(time.perf_counter() - start) * 1000:.0f} ms')
+
+    def reload_config(self):
+        """
+        :return: True, jeśli main.py wczytał się bez błędu.
+        """
+        try:
+            importlib.reload(main)
+        except Exception:
+            print('Błąd w main.py, zostają poprzednie reguły:')
+            traceback.print_exc()
+            return False
+        print('Wczytano nowe reguły z main.py')
+        return True
+
+    def poll(self, build_all=False):
+        """
+        Jeden przebieg: wczytuje zmienione pakiety i przebudowuje pliki, których dotyczą zmiany.
+
+        :param build_all: Przebudowuje wszystkie pakiety (np. przy starcie).
+        :return: Liczba przebudowanych pakietów.
+        """
+        current = self.scan()
+        changed = {path for path, signature in current.items() if self.signatures.get(path) != signature}
+        for path in set(self.packs) - set(current):
+            del self.packs[path]
+
+        config_signature = file_signature(main.__file__)
+        if config_signature != self.config_signature:
+            self.config_signature = config_signature
+            build_all = self.reload_config() or build_all
+
+        affected = set(current) if build_all else set(changed)
+        for path in changed:
+            # Foldery pakietu są wejściem także dla samego pakietu
+            if path.endswith(FOLDERS_SUFFIX):
+                affected.add(path[:-len(FOLDERS_SUFFIX)] + '.json')
+
+        rebuilt = 0
+        for path in sorted(affected & set(current)):
+            if path in changed or path not in self.packs:
+                try:
+                    self.load(path)
+                except (json.JSONDecodeError, UnicodeDecodeError, FileNotFoundError):
+                    # Plik jest jeszcze zapisywany; spróbujemy przy następnym przebiegu
+                    current[path] = None
+                    continue
+            self.rebuild(path)
+            rebuilt += 1
+        self.signatures = current
+        return rebuilt
+
+    def run(self, interval=0.2, build_all=False):
+        print(f'Obserwuję {len(self.folders)} katalogów pakietów i {main.__file__} (Ctrl+C kończy)')
+        self.signatures = {} if build_all else self.scan()
+        for path in self.signatures:
+            self.load(path)
+        while True:
+            self.poll()
+            time.sleep(interval)
+
+
+def watched_folders(patterns):
+    """
+    Katalogi z plikami pakietów i identyfikatory przygód, np. 'pack_adventure/pf2e-rusthenge/output'
+    -> 'pf2e-rusthenge' (jak w main.json_files).
+    """
+    folders = []
+    for pattern in patterns:
+        for folder in sorted(glob.glob(pattern)):
+            if os.path.isdir(folder):
+                folders.append((folder, os.path.basename(os.path.dirname(os.path.abspath(folder)))))
+    return folders
+
+
+def run():
+    parser = argparse.ArgumentParser(description='Przebudowuje pliki do tłumaczenia po zmianie pakietów lub reguł.')
+    parser.add_argument('folders', nargs='*', default=[WATCH_PATTERN],
+                        help=f'Katalogi (lub wzorce) z plikami JSON pakietów (domyślnie {WATCH_PATTERN})')
+    parser.add_argument('--interval', type=float, default=0.2, help='Odstęp sprawdzania plików w sekundach')
+    parser.add_argument('--build', action='store_true', help='Przebudowuje wszystkie pakiety przy starcie')
+    parser.add_argument('--translation-memory', nargs='?', const=MEMORY_PATH, metavar='PLIK',
+                        help='Tworzy też pliki <wersja>.<pakiet>.pl.json z pamięci tłumaczeń')
+    parser.add_argument('--dedup', action='store_true', help='Jak main.py --dedup')
+    parser.add_argument('--verbose', action='store_true', help='Wypisuje nazwy przetwarzanych dokumentów')
+    args = parser.parse_args()
+    configure(quiet=not args.verbose)
+
+    folders = watched_folders(args.folders)
+    if not folders:
+        parser.error('Brak katalogów pakietów do obserwacji')
+    if args.translation_memory:
+        with TranslationMemory(args.translation_memory) as memory:
+            memory.build()
+
+    watcher = Watcher(folders, args.translation_memory, args.dedup)
+    try:
+        watcher.run(args.interval, args.build)
+    except KeyboardInterrupt:
+        pass
+    finally:
+        watcher.close()
+
+
+if __name__ == '__main__':
+    run()